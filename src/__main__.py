@@ -1,68 +1,548 @@
 #!/usr/bin/env python3
 """LoudScan - Batch audio loudness analysis and comparison via ffmpeg loudnorm."""
 
+import argparse
 import os
 import sys
+import time
 
 # Add script directory to path so relative imports work when run directly
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lib.ui import test_command_exists, select_folder
-from lib.ffmpeg_utils import get_loudness_from_file
-from lib.report import new_sound_report_data, write_sound_report_outputs
+# Only what the argument parser needs is imported here; the analysis engine, the
+# report writers and NumPy are imported when they are used (tkinter only when the
+# folder picker opens), so a scripted run reaches its first ffmpeg launch quickly.
+from lib.cache import MeasurementCache, get_default_cache_path
+from lib.dedup import DEDUP_MODES
+from lib.discovery import SUPPORTED_EXTS, scan_media_files
+from lib.ffmpeg_utils import (
+    BACKENDS, DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_TIMEOUT_FACTOR, get_analysis_settings, get_ffmpeg_version,
+)
+from lib.pairs import DEFAULT_PAIR_SELECTION, parse_pair_selection
+from lib.formats import CSV_LAYOUTS, EXPORT_FORMATS, get_export_dependency_error
+from lib.profiling import StageProfiler, get_stage_context
+from lib.sampling import DEFAULT_SAMPLE_SECONDS, DEFAULT_SAMPLE_WINDOWS, MIN_SAMPLE_SECONDS, SAMPLE_MIN_RATIO
+from lib.ui import select_folder, test_command_exists
 
-SUPPORTED_EXTS = {".mp3", ".mp4", ".m4a", ".wav", ".flac", ".ogg", ".mkv", ".mov", ".m4v"}
+REPORT_FORMATS = ("html", "csv") + EXPORT_FORMATS
+DEFAULT_REPORT_FORMATS = "html,csv"
 
-if not test_command_exists("ffmpeg"):
-    print("ERROR: ffmpeg not found in PATH.", file=sys.stderr)
-    sys.exit(1)
+# --watch rewrites one report in place instead of a new timestamped one per refresh.
+WATCH_REPORT_NAME = "sound_report_live"
 
-folder = select_folder()
-print(f"Folder: {folder}")
+# Set to 1 to print start-up milestones (wall-clock time) on stderr, see
+# tools/benchmarks/bench_startup.py.
+STARTUP_TRACE_ENV = "LOUDSCAN_STARTUP_TRACE"
 
-# Collect supported files recursively
-files = []
-for root, _, filenames in os.walk(folder):
-    for name in filenames:
-        ext = os.path.splitext(name)[1].lower()
-        if ext in SUPPORTED_EXTS:
-            files.append(os.path.join(root, name))
 
-files.sort()
+def _trace(event: str):
+    if os.environ.get(STARTUP_TRACE_ENV) == "1":
+        print(f"startup-trace {event} {time.time():.6f}", file=sys.stderr, flush=True)
 
-if not files:
-    print(f"ERROR: No supported files found in {folder}", file=sys.stderr)
-    sys.exit(1)
 
-total = len(files)
-print(f"Analysing loudness of {total} file(s)...")
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="loudscan", description=__doc__)
+    parser.add_argument(
+        "folders", nargs="*", metavar="FOLDER",
+        help="folder(s) to scan recursively; without one, a folder picker opens",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", metavar="DIR",
+        help="where the reports are written (default: the first FOLDER)",
+    )
+    parser.add_argument(
+        "-f", "--formats", default=DEFAULT_REPORT_FORMATS, metavar="LIST",
+        help=f"comma-separated outputs among {', '.join(REPORT_FORMATS)}; 'npz' needs "
+             f"numpy and 'parquet' pyarrow (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--include", action="append", metavar="GLOB",
+        help="only analyse files matching GLOB (repeatable); a pattern with '/' matches the "
+             "path relative to FOLDER, one without the file name",
+    )
+    parser.add_argument(
+        "--exclude", action="append", metavar="GLOB",
+        help="skip files and folders matching GLOB (repeatable), e.g. --exclude .Trash "
+             "--exclude 'proxies' --exclude '*/render_cache/*'",
+    )
+    parser.add_argument(
+        "--max-depth", type=int, metavar="N",
+        help="scan at most N folder levels below FOLDER (0 = FOLDER only; default: no limit)",
+    )
+    parser.add_argument(
+        "--scan-jobs", type=int, default=1, metavar="N",
+        help="list up to N folders concurrently; helps on network shares (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int,
+        help="number of files analysed in parallel (default: CPU count)",
+    )
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="ffmpeg",
+        help="measurement engine: ffmpeg's ebur128/volumedetect filters, or BS.1770 "
+             "computed with NumPy on decoded PCM (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sample", type=int, nargs="?", const=DEFAULT_SAMPLE_WINDOWS, metavar="N",
+        help=f"fast approximate mode: measure only N evenly spaced windows of each file "
+             f"at least {SAMPLE_MIN_RATIO:g}x as long as the sampled audio (default N: %(const)s); "
+             f"results are flagged approximate with a 95%% bound on LUFS_I",
+    )
+    parser.add_argument(
+        "--sample-window", type=float, default=DEFAULT_SAMPLE_SECONDS, metavar="SECONDS",
+        help="with --sample, length of each window (default: %(default)g)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=DEFAULT_TIMEOUT, metavar="SECONDS",
+        help="give up on a file after SECONDS plus --timeout-factor seconds per second of media "
+             "(0 = no limit; default: %(default)g)",
+    )
+    parser.add_argument(
+        "--timeout-factor", type=float, default=DEFAULT_TIMEOUT_FACTOR, metavar="X",
+        help="seconds added to --timeout per second of media (default: %(default)g)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=DEFAULT_RETRIES, metavar="N",
+        help="retry a file up to N times after a transient I/O error, e.g. a network share "
+             "dropping out (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted run: reuse the results in the output folder's job journal "
+             "for files that have not changed since",
+    )
+    parser.add_argument(
+        "--coordinator", metavar="[HOST:]PORT",
+        help="hand the files to remote workers (--worker) connecting to this address instead "
+             "of analysing them here (HOST default: all interfaces)",
+    )
+    parser.add_argument(
+        "--worker", metavar="HOST:PORT",
+        help="run as an analysis worker for the coordinator at HOST:PORT, --jobs files at a "
+             "time, until stopped with Ctrl+C (no FOLDER)",
+    )
+    parser.add_argument(
+        "--serve", metavar="[HOST:]PORT",
+        help="run as an HTTP service measuring the files and folders POSTed to /jobs, with the "
+             "cache and worker processes kept warm between jobs (HOST default: 127.0.0.1; no FOLDER)",
+    )
+    parser.add_argument(
+        "--token", metavar="SECRET",
+        help="shared secret workers must present to the coordinator, and HTTP clients to --serve "
+             "as 'Authorization: Bearer SECRET' (default: $LOUDSCAN_TOKEN)",
+    )
+    parser.add_argument(
+        "--path-map", action="append", metavar="FROM=TO",
+        help="with --worker, read the coordinator's paths under FROM at TO, for shares mounted "
+             "elsewhere on this machine (repeatable)",
+    )
+    parser.add_argument(
+        "--cache", metavar="PATH", default=get_default_cache_path(),
+        help="measurement cache file (default: %(default)s)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the measurement cache")
+    parser.add_argument(
+        "--rebuild-cache", action="store_true",
+        help="re-measure every file and overwrite its cache entry",
+    )
+    parser.add_argument(
+        "--cache-vacuum", action="store_true",
+        help="evict stale cache entries, compact the cache file and exit",
+    )
+    parser.add_argument(
+        "--cache-max-age", type=float, metavar="DAYS",
+        help="with --cache-vacuum, also evict entries older than DAYS",
+    )
+    parser.add_argument(
+        "--dedup", choices=DEDUP_MODES, default="bytes",
+        help="analyse identical files once: 'bytes' = same file content, "
+             "'stream' = also the same audio stream in any container. Duplicates keep "
+             "their rows, with the measurement copied and DuplicateGroup / DuplicateOf "
+             "set; 'off' measures every file, as before --dedup existed (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pairs", metavar="SPEC", default=DEFAULT_PAIR_SELECTION,
+        help="pairs listed in the HTML/CSV: 'all', 'none', 'top:K' (largest ΔMax) or "
+             "'min-level:LEVEL' (e.g. min-level:moderate). Summary and histogram always "
+             "cover every pair. The default lists the 1000 largest ΔMax only; 'all' lists "
+             "every pair, as before --pairs existed (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--csv", choices=CSV_LAYOUTS, default="combined", dest="csv_layout",
+        help="'combined' = one CSV with file and pair rows, 'split' = separate "
+             "files and pairs CSVs with their own columns (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running: poll the folder(s), measure only new or modified files and "
+             "rewrite sound_report_live.* after each change (Ctrl+C to stop)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="profile each stage with cProfile and tracemalloc; writes <report>_profile_<stage>.pstats "
+             "and a table of time and peak memory per stage (<report>_profile.txt) next to the report",
+    )
+    parser.add_argument(
+        "--watch-interval", type=float, default=2.0, metavar="SECONDS",
+        help="with --watch, seconds between folder polls (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs is None:
+        args.jobs = os.cpu_count() or 1
+    if args.jobs < 1:
+        parser.error("--jobs must be >= 1")
+    if args.watch_interval <= 0:
+        parser.error("--watch-interval must be > 0")
+    if args.max_depth is not None and args.max_depth < 0:
+        parser.error("--max-depth must be >= 0")
+    if args.scan_jobs < 1:
+        parser.error("--scan-jobs must be >= 1")
+    if args.profile and args.watch:
+        parser.error("--profile cannot be combined with --watch")
+    if args.resume and args.watch:
+        parser.error("--resume cannot be combined with --watch")
+    if args.timeout < 0 or args.timeout_factor < 0:
+        parser.error("--timeout and --timeout-factor must be >= 0")
+    if args.retries < 0:
+        parser.error("--retries must be >= 0")
+    if args.sample is not None:
+        if args.sample < 2:
+            parser.error("--sample needs at least 2 windows")
+        if args.sample_window < MIN_SAMPLE_SECONDS:
+            parser.error(f"--sample-window must be >= {MIN_SAMPLE_SECONDS:g}")
+        if args.backend != "ffmpeg":
+            parser.error("--sample needs --backend ffmpeg")
+    if args.worker and (args.folders or args.coordinator):
+        parser.error("--worker takes neither FOLDER nor --coordinator")
+    if args.path_map and not args.worker:
+        parser.error("--path-map needs --worker")
+    if args.serve and (args.folders or args.worker or args.coordinator or args.watch or args.resume
+                       or args.profile or args.cache_vacuum):
+        parser.error("--serve takes no FOLDER and cannot be combined with --worker, --coordinator, "
+                     "--watch, --resume, --profile or --cache-vacuum")
+    if args.worker or args.coordinator or args.serve:
+        from lib.distributed import TOKEN_ENV, parse_address, parse_path_map
+        try:
+            args.worker = parse_address(args.worker) if args.worker else None
+            args.coordinator = parse_address(args.coordinator, "0.0.0.0") if args.coordinator else None
+            args.serve = parse_address(args.serve, "127.0.0.1") if args.serve else None
+            args.path_map = parse_path_map(args.path_map or [])
+        except ValueError as e:
+            parser.error(str(e))
+        args.token = args.token or os.environ.get(TOKEN_ENV)
+    args.sampling = (args.sample, args.sample_window) if args.sample is not None else None
+    args.settings = get_analysis_settings(args.backend, args.sampling)
+    try:
+        parse_pair_selection(args.pairs)
+    except ValueError as e:
+        parser.error(str(e))
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    if not formats:
+        parser.error("--formats: at least one output format is required")
+    for fmt in formats:
+        if fmt not in REPORT_FORMATS:
+            parser.error(f"--formats: unknown format '{fmt}' (expected: {', '.join(REPORT_FORMATS)})")
+        dep_error = get_export_dependency_error(fmt) if fmt in EXPORT_FORMATS else None
+        if dep_error:
+            parser.error(dep_error)
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            parser.error(f"not a folder: {folder}")
+    _trace("args-parsed")
+
+    if not test_command_exists("ffmpeg"):
+        print("ERROR: ffmpeg not found in PATH.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.worker:
+        _run_worker(args)
+        return
+    if args.serve:
+        _run_service(args)
+        return
+
+    if args.cache_vacuum:
+        if args.no_cache:
+            parser.error("--cache-vacuum cannot be combined with --no-cache")
+        cache = MeasurementCache(args.cache, get_ffmpeg_version(), args.settings)
+        removed = cache.vacuum(args.cache_max_age)
+        cache.close()
+        print(f"Cache: {args.cache} ({removed} stale entr{'y' if removed == 1 else 'ies'} removed)")
+        return
+
+    if args.folders:
+        folders = [os.path.realpath(f) for f in args.folders]
+    else:
+        folders = [select_folder()]
+    output_dir = os.path.realpath(args.output_dir) if args.output_dir else folders[0]
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Folder: {', '.join(folders)}")
+
+    profiler = StageProfiler() if args.profile else None
+    scan_options = {"include": args.include, "exclude": args.exclude,
+                    "max_depth": args.max_depth, "jobs": args.scan_jobs}
+    watcher = None
+    if args.watch:
+        from lib.watch import FolderWatcher
+        watcher = FolderWatcher(folders, SUPPORTED_EXTS, **scan_options)
+        files = watcher.prime()
+        file_stats = watcher.stats
+    else:
+        with get_stage_context(profiler, "discovery"):
+            file_stats = scan_media_files(folders, **scan_options)
+        files = list(file_stats)
+
+    if not files and not args.watch:
+        print(f"ERROR: No supported files found in {', '.join(folders)}", file=sys.stderr)
+        sys.exit(1)
+
+    report_args = (folders, output_dir, args, formats)
+    _trace("first-ffmpeg")  # the cache key or the first measurement launches it
+    cache = None
+    if not args.no_cache:
+        cache = MeasurementCache(args.cache, get_ffmpeg_version(), args.settings)
+
+    measured = {}
+    journal = None
+    coordinator = None
+    try:
+        if args.coordinator:
+            coordinator = _start_coordinator(args)
+        if watcher is None:
+            journal = _open_journal(folders, output_dir, args, measured)
+        t0 = time.perf_counter()
+        with get_stage_context(profiler, "measure"):
+            metrics, groups, metric_stats = _measure_files(
+                files, args, cache, measured, refresh_cache=args.rebuild_cache, stats=file_stats,
+                journal=journal, coordinator=coordinator,
+            )
+        elapsed = time.perf_counter() - t0
+        if watcher is None:
+            _write_reports(metrics, groups, *report_args, elapsed=elapsed, profiler=profiler,
+                           metric_stats=metric_stats)
+            journal.close(remove=True)
+            return
+
+        # Watch mode: keep the results in memory and only measure what changes.
+        if files:
+            _write_reports(metrics, groups, *report_args, basename=WATCH_REPORT_NAME, metric_stats=metric_stats)
+        print(f"Watching {', '.join(folders)} every {args.watch_interval:g} s (Ctrl+C to stop)...", flush=True)
+        while True:
+            time.sleep(args.watch_interval)
+            changed, removed = watcher.poll()
+            if not changed and not removed:
+                continue
+            print(f"{len(changed)} new/modified, {len(removed)} removed file(s).", flush=True)
+            files = watcher.get_files()
+            for path in set(changed) | set(removed):
+                measured.pop(path, None)
+            metrics, groups, metric_stats = _measure_files(files, args, cache, measured, stats=watcher.stats,
+                                                           coordinator=coordinator)
+            if files:
+                _write_reports(metrics, groups, *report_args, basename=WATCH_REPORT_NAME, metric_stats=metric_stats)
+    except KeyboardInterrupt:
+        if watcher is None:
+            raise
+        print("Watch stopped.")
+    finally:
+        if journal is not None:
+            journal.close()
+        if coordinator is not None:
+            coordinator.close()
+        if cache is not None:
+            cache.close()
+        if profiler is not None:
+            profiler.close()
+
+
+def _print_event(message):
+    print(message, flush=True)
+
+
+def _start_coordinator(args):
+    from lib.distributed import Coordinator
+
+    try:
+        coordinator = Coordinator(args.coordinator, get_ffmpeg_version(), args.token, on_event=_print_event)
+    except OSError as e:
+        print(f"ERROR: --coordinator: cannot listen on {args.coordinator[0]}:{args.coordinator[1]}: {e}",
+              file=sys.stderr)
+        sys.exit(1)
+    host, port = coordinator.address
+    print(f"Coordinator listening on {host}:{port}; start workers with --worker <this host>:{port}.")
+    return coordinator
+
+
+def _run_worker(args):
+    import signal
+    from lib.distributed import WorkerRefused, run_worker
+
+    # A service manager stops the worker with SIGTERM: shut the pool down as for Ctrl+C.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    host, port = args.worker
+    print(f"Worker for {host}:{port} with {args.jobs} job(s) (Ctrl+C to stop).", flush=True)
+    try:
+        run_worker(args.worker, args.jobs, get_ffmpeg_version(), args.token, args.path_map, on_event=_print_event)
+    except WorkerRefused as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Worker stopped.")
+
+
+def _run_service(args):
+    import signal
+    from lib.service import AnalysisService, new_service_server
+
+    ffmpeg_version = get_ffmpeg_version()
+
+    def _open_cache():
+        return None if args.no_cache else MeasurementCache(args.cache, ffmpeg_version, args.settings)
+
+    service = AnalysisService(
+        args.jobs, ffmpeg_version, _open_cache, dedup=args.dedup, pair_selection=args.pairs,
+        scan_options={"include": args.include, "exclude": args.exclude,
+                      "max_depth": args.max_depth, "jobs": args.scan_jobs},
+        analysis_options={"backend": args.backend, "timeout": args.timeout, "timeout_factor": args.timeout_factor,
+                          "retries": args.retries, "sample": args.sampling, "refresh_cache": args.rebuild_cache},
+        on_event=_print_event,
+    )
+    try:
+        server = new_service_server(args.serve, service, args.token)
+    except OSError as e:
+        print(f"ERROR: --serve: cannot listen on {args.serve[0]}:{args.serve[1]}: {e}", file=sys.stderr)
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}/ with {args.jobs} job(s) (Ctrl+C to stop).", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping after the running job...", flush=True)
+    finally:
+        server.server_close()
+        service.close()
+
+
+def _open_journal(folders, output_dir, args, measured):
+    """The run's job journal; with --resume, its results are loaded into `measured` first."""
+    from lib.journal import JobJournal, get_journal_path, new_journal_header, read_journal
+
+    path = get_journal_path(output_dir)
+    header = new_journal_header(args.backend, args.settings, folders)
+    if args.resume:
+        if not os.path.exists(path):
+            print(f"Nothing to resume: no journal in {output_dir}; analysing every file.")
+        else:
+            try:
+                done = read_journal(path, header)
+            except ValueError as e:
+                print(f"ERROR: --resume: {e}", file=sys.stderr)
+                sys.exit(1)
+            measured.update(done)
+            print(f"Resuming: {len(done)} file(s) already analysed ({path}).")
+    elif os.path.exists(path):
+        print(f"Replacing the journal of an unfinished run ({path}); use --resume to continue it instead.")
+    return JobJournal(path, header, resume=args.resume)
+
+
+def _measure_files(files, args, cache, measured, refresh_cache=False, stats=None, journal=None,
+                   coordinator=None):
+    """Metrics rows for `files`, measuring only the ones missing from `measured`.
+
+    `measured` ({path: metrics}) is updated in place, so a later call (watch mode)
+    reuses it; `stats` are the discovery's stat results. Each result is appended
+    to `journal` and fed to the report's MetricStats as it comes in; with a
+    `coordinator`, remote workers measure them. Returns (metrics, duplicate
+    groups, MetricStats).
+    """
+    from lib.dedup import expand_duplicate_metrics, find_duplicate_groups
+    from lib.engine import analyse_files
+    from lib.stats import STATS_METRICS, MetricStats, test_measured
+
+    metric_stats = MetricStats(STATS_METRICS)
+    fed = set()  # paths whose row was pushed
+
+    def _progress(done, total, path, m):
+        print(f"[{done}/{total}] {os.path.basename(path)}", flush=True)
+        if journal is not None:
+            journal.append(path, m, (stats or {}).get(path))
+        if test_measured(m):
+            metric_stats.push(m)
+        fed.add(path)
+
+    groups = find_duplicate_groups(files, mode=args.dedup, jobs=args.jobs, cache=cache, stats=stats)
+    duplicates = {p for g in groups for p in g["Paths"][1:]}
+    representatives = [p for p in files if p not in duplicates]
+    to_analyse = [p for p in representatives if p not in measured]
+    if groups:
+        print(f"Found {len(groups)} duplicate group(s); {len(duplicates)} file(s) will reuse another file's result.")
+
+    total = len(to_analyse)
+    if total and coordinator is not None:
+        print(f"Analysing loudness of {total} file(s) on remote workers...")
+    elif total:
+        print(f"Analysing loudness of {total} file(s) with {min(args.jobs, total)} job(s)...")
+    results = analyse_files(
+        to_analyse, jobs=args.jobs, on_result=_progress,
+        cache=cache, refresh_cache=refresh_cache, backend=args.backend, stats=stats,
+        timeout=args.timeout, timeout_factor=args.timeout_factor, retries=args.retries,
+        sample=args.sampling, coordinator=coordinator,
+    )
+    measured.update(zip(to_analyse, results))
+    for path in set(measured) - set(representatives):
+        del measured[path]
+    if cache is not None:
+        cache.commit()
+
+    metrics = expand_duplicate_metrics(files, groups, measured, stats)
+    # Rows not seen by _progress: earlier results (resumed journal, watch mode) and duplicates.
+    for path, m in zip(files, metrics):
+        if path not in fed and test_measured(m):
+            metric_stats.push(m)
+    return metrics, groups, metric_stats
+
+
+def _write_reports(metrics, groups, folders, output_dir, args, formats, basename=None, elapsed=None,
+                   profiler=None, metric_stats=None):
+    from lib.report import new_sound_report_data, write_sound_report_outputs
 
-metrics = []
-for i, path in enumerate(files):
-    name = os.path.basename(path)
-    ext = os.path.splitext(name)[1].lstrip(".")
-    size = os.path.getsize(path)
-    print(f"[{i + 1}/{total}] {name}")
     try:
-        m = get_loudness_from_file(path)
-        metrics.append(m)
-    except Exception as e:
-        metrics.append({
-            "FileName": name,
-            "Path": path,
-            "Ext": ext,
-            "SizeBytes": size,
-            "LUFS_I": None,
-            "TruePeak_dBTP": None,
-            "LRA": None,
-            "Peak_dBFS": None,
-            "RMS_dBFS": None,
-            "Error": str(e),
-        })
-
-report = new_sound_report_data(metrics)
-out = write_sound_report_outputs(folder, report)
-
-print("Done. Reports generated:")
-print(f" - HTML: {out['HtmlPath']}")
-print(f" - CSV : {out['CsvPath']}")
+        with get_stage_context(profiler, "report_data"):
+            report = new_sound_report_data(metrics, groups, pair_selection=args.pairs, elapsed=elapsed,
+                                           metric_stats=metric_stats)
+    except RuntimeError as e:
+        if basename is None:
+            raise
+        print(f"Report not updated: {e}", file=sys.stderr)  # watch mode: wait for better files
+        return
+    out = write_sound_report_outputs(
+        output_dir, report, csv_layout=args.csv_layout, basename=basename,
+        formats=formats, sources=folders, profiler=profiler,
+    )
+
+    print("Done. Reports generated:")
+    if out["HtmlPath"]:
+        print(f" - HTML: {out['HtmlPath']}")
+    for csv_path in out["CsvPaths"]:
+        print(f" - CSV : {csv_path}")
+    for export_path in out["ExportPaths"]:
+        print(f" - Data: {export_path}")
+    summary = report["Summary"]
+    if summary["PairsListed"] < summary["Pairs"]:
+        print(f"Showing {summary['PairsListed']} of {summary['Pairs']} pairs ({summary['PairSelection']}); "
+              f"--pairs all lists every pair.")
+    if profiler is not None:
+        profile_paths = profiler.write(out["BasePath"])
+        print(f" - Profile: {profile_paths[-1]} ({len(profile_paths) - 1} .pstats file(s))")
+        print(profiler.get_table())
+
+
+if __name__ == "__main__":
+    # Worker processes re-import this module; keep the frozen (PyInstaller) build from
+    # re-running the whole app in every child. freeze_support() is a no-op otherwise,
+    # so multiprocessing is not imported at all for a run from source.
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,229 @@
+"""ITU-R BS.1770-4 / EBU R128 loudness maths on float PCM, vectorised with NumPy.
+
+Audio is fed in chunks of any size (`Bs1770Meter.feed`), so a file never has to be
+held in memory: only one 100 ms energy value per block is kept, which is also what
+makes the momentary, short-term, integrated and LRA values exact per block.
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from .curves import CurveRecorder
+
+# K-weighting pre-filter (high shelf) and RLB high-pass, parametrised as in libebur128
+# so the coefficients are exact at any sample rate (they match BS.1770 at 48 kHz).
+_SHELF_F0 = 1681.974450955533
+_SHELF_GAIN_DB = 3.999843853973347
+_SHELF_Q = 0.7071752369554196
+_HP_F0 = 38.13547087602444
+_HP_Q = 0.5003270373238773
+
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+LRA_RELATIVE_GATE_LU = -20.0
+
+# True-peak interpolation filter: windowed sinc, this many taps per polyphase branch.
+_TP_TAPS_PER_PHASE = 48
+
+
+def k_weighting_coefficients(fs: int):
+    """(b, a) of the 4th-order K-weighting filter (shelf followed by RLB high-pass)."""
+    k = math.tan(math.pi * _SHELF_F0 / fs)
+    vh = 10.0 ** (_SHELF_GAIN_DB / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / _SHELF_Q + k * k
+    shelf_b = [(vh + vb * k / _SHELF_Q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / _SHELF_Q + k * k) / a0]
+    shelf_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / _SHELF_Q + k * k) / a0]
+
+    k = math.tan(math.pi * _HP_F0 / fs)
+    a0 = 1.0 + k / _HP_Q + k * k
+    hp_b = [1.0, -2.0, 1.0]
+    hp_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / _HP_Q + k * k) / a0]
+
+    return np.convolve(shelf_b, hp_b), np.convolve(shelf_a, hp_a)
+
+
+@lru_cache(maxsize=8)
+def _k_weighting_impulse_response(fs: int) -> np.ndarray:
+    """K-weighting impulse response, truncated once its tail energy is negligible (< 1e-12)."""
+    b, a = k_weighting_coefficients(fs)
+    n = 1 << 12
+    while True:
+        x = np.zeros(n)
+        x[0] = 1.0
+        y = np.zeros(n)
+        # Direct-form I recursion; a few thousand samples, computed once per sample rate.
+        for i in range(n):
+            acc = 0.0
+            for j in range(len(b)):
+                if i - j >= 0:
+                    acc += b[j] * x[i - j]
+            for j in range(1, len(a)):
+                if i - j >= 0:
+                    acc -= a[j] * y[i - j]
+            y[i] = acc
+        tail = np.cumsum((y ** 2)[::-1])[::-1]
+        cut = np.nonzero(tail > 1e-12 * tail[0])[0]
+        length = int(cut[-1]) + 1 if len(cut) else n
+        if length < n or n >= (1 << 18):
+            return y[:length]
+        n <<= 1
+
+
+@lru_cache(maxsize=8)
+def _true_peak_filter(oversample: int) -> np.ndarray:
+    """Polyphase interpolation filter, shape (oversample, taps): one row per output phase."""
+    taps = _TP_TAPS_PER_PHASE * oversample
+    n = np.arange(taps) - (taps - 1) / 2.0
+    h = np.sinc(n / oversample) * np.kaiser(taps, 8.0)
+    h = h.reshape(_TP_TAPS_PER_PHASE, oversample).T
+    return h / h.sum(axis=1, keepdims=True)
+
+
+def get_channel_weights(channels: int) -> np.ndarray:
+    """BS.1770 channel gains for ffmpeg's default layouts: surrounds 1.41, LFE excluded."""
+    if channels == 6:    # 5.1: FL FR FC LFE BL BR
+        return np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])
+    if channels == 5:    # 5.0: FL FR FC BL BR
+        return np.array([1.0, 1.0, 1.0, 1.41, 1.41])
+    if channels == 8:    # 7.1: FL FR FC LFE BL BR SL SR
+        return np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41, 1.41, 1.41])
+    return np.ones(channels)
+
+
+def _energy_to_lufs(e):
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10.0 * np.log10(e)
+
+
+def _to_db(v: float):
+    return 20.0 * math.log10(v) if v > 0 else None
+
+
+class Bs1770Meter:
+    """Streaming loudness meter: K-weighting by FFT overlap-add, 100 ms block energies,
+    gated integrated loudness, LRA, oversampled true peak, sample peak and RMS."""
+
+    def __init__(self, fs: int, channels: int):
+        self.fs = fs
+        self.channels = channels
+        self.hop = int(round(fs * 0.1))
+        self.weights = get_channel_weights(channels)
+
+        h = _k_weighting_impulse_response(fs)
+        # Overlap-add segments sized so each FFT is a power of two with no padding waste.
+        self._nfft = max(1 << 15, 1 << (4 * len(h) - 1).bit_length())
+        self._seg = self._nfft - len(h) + 1
+        self._H = np.fft.rfft(h, self._nfft)[:, None]
+        self._tail = np.zeros((len(h) - 1, channels))
+        self._pending = np.zeros((0, channels))
+        self._block_energy = []
+
+        self.oversample = 4 if fs < 96000 else (2 if fs < 192000 else 1)
+        self._tp_filter = _true_peak_filter(self.oversample)
+        self._tp_history = np.zeros((self._tp_filter.shape[1] - 1, channels))
+
+        self.samples = 0
+        self._peak = 0.0
+        self._true_peak = 0.0
+        self._sum_squares = 0.0
+
+    def feed(self, x: np.ndarray):
+        """Add a (frames, channels) float block."""
+        if len(x) == 0:
+            return
+        x = np.asarray(x, dtype=np.float64)
+        self.samples += len(x)
+        self._peak = max(self._peak, float(np.max(np.abs(x))))
+        self._sum_squares += float(np.dot(x.ravel(), x.ravel()))
+        self._feed_true_peak(x)
+
+        y = self._k_weight(x)
+        y = np.concatenate([self._pending, y]) if len(self._pending) else y
+        n_blocks = len(y) // self.hop
+        if n_blocks:
+            sq = (y[:n_blocks * self.hop] ** 2).reshape(n_blocks, self.hop, self.channels).sum(axis=1)
+            self._block_energy.append(sq @ self.weights)
+        self._pending = y[n_blocks * self.hop:]
+
+    def _k_weight(self, x: np.ndarray) -> np.ndarray:
+        out = np.empty_like(x)
+        n_tail = len(self._tail)
+        for start in range(0, len(x), self._seg):
+            seg = x[start:start + self._seg]
+            y = np.fft.irfft(np.fft.rfft(seg, self._nfft, axis=0) * self._H, self._nfft, axis=0)
+            y[:n_tail] += self._tail
+            out[start:start + len(seg)] = y[:len(seg)]
+            self._tail = y[len(seg):len(seg) + n_tail]
+        return out
+
+    def _feed_true_peak(self, x: np.ndarray):
+        if self.oversample == 1:
+            self._true_peak = max(self._true_peak, float(np.max(np.abs(x))))
+            return
+        padded = np.concatenate([self._tp_history, x])
+        for ch in range(self.channels):
+            for phase in self._tp_filter:
+                v = np.convolve(padded[:, ch], phase, mode="valid")
+                self._true_peak = max(self._true_peak, float(np.max(np.abs(v))))
+        self._tp_history = padded[-len(self._tp_history):]
+
+    def get_block_energies(self) -> np.ndarray:
+        """Channel-weighted mean square of every complete 100 ms block."""
+        if not self._block_energy:
+            return np.zeros(0)
+        return np.concatenate(self._block_energy) / self.hop
+
+    def get_results(self) -> dict:
+        blocks = self.get_block_energies()
+
+        def _windows(n):
+            if len(blocks) < n:
+                return np.zeros(0)
+            return np.convolve(blocks, np.full(n, 1.0 / n), mode="valid")
+
+        momentary = _windows(4)     # 400 ms, 75 % overlap
+        short_term = _windows(30)   # 3 s, 100 ms hop
+
+        lufs_i = None
+        m_lufs = _energy_to_lufs(momentary)
+        gated = momentary[m_lufs > ABSOLUTE_GATE_LUFS]
+        if len(gated):
+            rel_gate = _energy_to_lufs(gated.mean()) + RELATIVE_GATE_LU
+            gated = gated[_energy_to_lufs(gated) > rel_gate]
+            if len(gated):
+                lufs_i = float(_energy_to_lufs(gated.mean()))
+
+        lra = 0.0
+        s_lufs = _energy_to_lufs(short_term)
+        s_gated = short_term[s_lufs > ABSOLUTE_GATE_LUFS]
+        if len(s_gated):
+            rel_gate = _energy_to_lufs(s_gated.mean()) + LRA_RELATIVE_GATE_LU
+            s_vals = _energy_to_lufs(s_gated)
+            s_vals = s_vals[s_vals > rel_gate]
+            if len(s_vals):
+                lo, hi = np.percentile(s_vals, [10, 95])
+                lra = float(hi - lo)
+
+        finite_m = m_lufs[np.isfinite(m_lufs)]
+        finite_s = s_lufs[np.isfinite(s_lufs)]
+        mean_square = self._sum_squares / (self.samples * self.channels) if self.samples else 0.0
+
+        curves = {}
+        for key, values in (("Curve_M", m_lufs), ("Curve_S", s_lufs)):
+            recorder = CurveRecorder()
+            recorder.extend(np.nan_to_num(values, neginf=ABSOLUTE_GATE_LUFS).tolist())
+            curves[key] = recorder.get_curve()
+
+        return {
+            "LUFS_I": lufs_i,
+            "LUFS_M": float(finite_m.max()) if len(finite_m) else None,
+            "LUFS_S": float(finite_s.max()) if len(finite_s) else None,
+            "TruePeak_dBTP": _to_db(max(self._true_peak, self._peak)),
+            "LRA": lra,
+            "Peak_dBFS": _to_db(self._peak),
+            "RMS_dBFS": 10.0 * math.log10(mean_square) if mean_square > 0 else None,
+            **curves,
+        }
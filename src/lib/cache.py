@@ -0,0 +1,117 @@
+import json
+import os
+import platform
+import sqlite3
+import time
+from typing import Optional
+
+CACHE_FILE_NAME = "measurements.sqlite3"
+
+# Commit every N writes so an interrupted run keeps most of its work.
+_COMMIT_EVERY = 100
+
+
+def get_default_cache_path() -> str:
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, "LoudScan", "Cache", CACHE_FILE_NAME)
+    if system == "Darwin":
+        return os.path.join(os.path.expanduser("~/Library/Caches"), "LoudScan", CACHE_FILE_NAME)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "loudscan", CACHE_FILE_NAME)
+
+
+class MeasurementCache:
+    """Persistent SQLite store of measurement dicts.
+
+    An entry is reused only if path, size, mtime_ns, ffmpeg version and analysis
+    settings all match; anything else counts as a miss and gets re-measured.
+    Only successful measurements are stored, so transient errors are retried.
+    """
+
+    def __init__(self, path: str, ffmpeg_version: str, settings: str):
+        self.path = path
+        self.ffmpeg_version = ffmpeg_version
+        self.settings = settings
+        self._pending = 0
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS measurements ("
+            " path TEXT NOT NULL,"
+            " settings TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " ffmpeg TEXT NOT NULL,"
+            " metrics TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " PRIMARY KEY (path, settings))"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key_path(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path: str, st: os.stat_result, settings: Optional[str] = None) -> Optional[dict]:
+        """Cached dict for `path`, or None. `settings` overrides the cache's analysis
+        settings, letting other per-file results (e.g. hashes) share the file."""
+        row = self._db.execute(
+            "SELECT size, mtime_ns, ffmpeg, metrics FROM measurements WHERE path = ? AND settings = ?",
+            (self._key_path(path), settings or self.settings),
+        ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, ffmpeg, metrics = row
+        if size != st.st_size or mtime_ns != st.st_mtime_ns or ffmpeg != self.ffmpeg_version:
+            return None
+        return json.loads(metrics)
+
+    def put(self, path: str, st: os.stat_result, metrics: dict, settings: Optional[str] = None):
+        if metrics.get("Error"):
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO measurements"
+            " (path, settings, size, mtime_ns, ffmpeg, metrics, stored_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self._key_path(path), settings or self.settings, st.st_size, st.st_mtime_ns,
+                self.ffmpeg_version, json.dumps(metrics, ensure_ascii=False), time.time(),
+            ),
+        )
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self._db.commit()
+        self._pending = 0
+
+    def vacuum(self, max_age_days: Optional[float] = None) -> int:
+        """Evict entries for missing or modified files, from other ffmpeg builds, or
+        older than `max_age_days`; then compact the database. Returns rows removed."""
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        stale = []
+        rows = self._db.execute("SELECT path, settings, size, mtime_ns, ffmpeg, stored_at FROM measurements")
+        for path, settings, size, mtime_ns, ffmpeg, stored_at in rows.fetchall():
+            try:
+                st = os.stat(path)
+                changed = st.st_size != size or st.st_mtime_ns != mtime_ns
+            except OSError:
+                changed = True
+            if changed or ffmpeg != self.ffmpeg_version or (cutoff is not None and stored_at < cutoff):
+                stale.append((path, settings))
+        self._db.executemany("DELETE FROM measurements WHERE path = ? AND settings = ?", stale)
+        self.commit()
+        self._db.execute("VACUUM")
+        return len(stale)
+
+    def close(self):
+        self.commit()
+        self._db.close()
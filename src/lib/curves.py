@@ -0,0 +1,107 @@
+"""Per-file loudness curves: the momentary / short-term series, decimated to CURVE_POINTS.
+
+Values arrive every 100 ms and go into a buffer of at most CURVE_BUFFER points:
+when it fills, neighbouring points are merged (their maximum kept) and each point
+covers twice as many frames, so memory stays bounded whatever the duration. At
+the end, Largest-Triangle-Three-Buckets picks CURVE_POINTS points that keep the
+curve's shape. Curves are stored as base64 float32 (little-endian); one point per
+bucket, meant to be drawn evenly spaced over the file's duration.
+"""
+
+import base64
+import sys
+from array import array
+from typing import List, Optional
+
+CURVE_POINTS = 32
+CURVE_BUFFER = 2048
+
+# LUFS values are clamped to the absolute gate: below it is silence either way.
+CURVE_FLOOR = -70.0
+
+_NAN_BYTES = array("f", [float("nan")]).tobytes()
+
+
+def get_lttb(values, n: int) -> List[float]:
+    """`n` of the evenly spaced `values` picked by Largest-Triangle-Three-Buckets
+    (all of them when there are no more than `n`)."""
+    size = len(values)
+    if n >= size or n < 3:
+        return list(values)
+    out = [values[0]]
+    every = (size - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        # Average of the next bucket (the last point for the last bucket).
+        avg_x = (end + next_end - 1) / 2.0
+        avg_y = sum(values[end:next_end]) / (next_end - end)
+        ay = values[a]
+        best = -1.0
+        pick = start
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - ay) - (a - j) * (avg_y - ay))
+            if area > best:
+                best = area
+                pick = j
+        out.append(values[pick])
+        a = pick
+    out.append(values[-1])
+    return out
+
+
+def encode_curve(values) -> Optional[str]:
+    """Base64 little-endian float32 of `values`, None when empty."""
+    if not len(values):
+        return None
+    buf = array("f", values)
+    if sys.byteorder == "big":
+        buf.byteswap()
+    return base64.b64encode(buf.tobytes()).decode("ascii")
+
+
+def get_curve_block(curves: List[Optional[str]], points: int = CURVE_POINTS) -> bytes:
+    """Encoded curves as one little-endian float32 block of `points` values per curve,
+    NaN-padded (a missing curve is all NaN): row i starts at i * points."""
+    parts = []
+    for encoded in curves:
+        raw = base64.b64decode(encoded)[:4 * points] if encoded else b""
+        parts.append(raw + _NAN_BYTES * (points - len(raw) // 4))
+    return b"".join(parts)
+
+
+class CurveRecorder:
+    """Collects one value per 100 ms frame within CURVE_BUFFER points (see module doc)."""
+
+    def __init__(self):
+        self.values = array("f")
+        self.stride = 1     # frames per buffered point
+        self._pending = None
+        self._pending_count = 0
+
+    def feed(self, value: float):
+        value = max(value, CURVE_FLOOR)
+        self._pending = value if self._pending is None else max(self._pending, value)
+        self._pending_count += 1
+        if self._pending_count < self.stride:
+            return
+        self.values.append(self._pending)
+        self._pending = None
+        self._pending_count = 0
+        if len(self.values) >= CURVE_BUFFER:
+            v = self.values
+            self.values = array("f", (max(v[i], v[i + 1]) for i in range(0, len(v) - 1, 2)))
+            self.stride *= 2
+
+    def extend(self, values):
+        for v in values:
+            self.feed(v)
+
+    def get_curve(self, points: int = CURVE_POINTS) -> Optional[str]:
+        """The decimated curve, encoded (encode_curve); None if nothing was recorded."""
+        values = list(self.values)
+        if self._pending is not None:
+            values.append(self._pending)
+        return encode_curve(get_lttb(values, points))
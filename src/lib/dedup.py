@@ -0,0 +1,204 @@
+import hashlib
+import os
+import re
+import subprocess
+from typing import Dict, List, Optional
+
+from .cache import MeasurementCache
+from .ffmpeg_utils import COST_FIELDS
+
+DEDUP_MODES = ("off", "bytes", "stream")
+
+# Cache settings keys: hashes live in the measurement cache next to, never mixed with, measurements.
+BYTES_HASH_SETTINGS = "hash:bytes:blake2b"
+STREAM_HASH_SETTINGS = "hash:stream:sha256"
+
+_CHUNK = 1024 * 1024
+
+# A stream copy reads the whole file but decodes nothing; past this it is stuck.
+STREAM_HASH_TIMEOUT = 600.0
+
+
+def get_file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_audio_stream_hash(path: str) -> Optional[str]:
+    """SHA-256 of the first audio stream's packets, taken by stream copy (no decoding).
+
+    The same encoded stream muxed into .mp4, .m4a, .mov or .mkv hashes identically.
+    Returns None if the file has no readable audio stream.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-v", "error",
+        "-i", path,
+        "-map", "0:a:0", "-c", "copy",
+        "-f", "hash", "-hash", "sha256", "-",
+    ]
+    try:
+        r = subprocess.run(cmd, capture_output=True, text=True, errors="replace", timeout=STREAM_HASH_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return None
+    m = re.search(r"SHA256=([0-9a-f]+)", r.stdout or "")
+    return m.group(1) if m else None
+
+
+def _hash_all(
+    paths: List[str], compute, settings: str, jobs: int, cache: Optional[MeasurementCache],
+    stats: Dict[str, os.stat_result],
+) -> Dict[str, Optional[str]]:
+    """Hash `paths` on a thread pool, answering unchanged files from the cache.
+
+    The cache is only touched from the calling thread (SQLite connections are not shared).
+    """
+    hashes: Dict[str, Optional[str]] = {}
+    file_stats = {}
+    todo = []
+    for p in paths:
+        try:
+            st = stats.get(p) or os.stat(p)
+        except OSError:
+            hashes[p] = None
+            continue
+        hit = cache.get(p, st, settings) if cache is not None else None
+        if hit is not None:
+            hashes[p] = hit["Hash"]
+        else:
+            file_stats[p] = st
+            todo.append(p)
+
+    def _safe(p):
+        try:
+            return compute(p)
+        except OSError:
+            return None
+
+    from concurrent.futures import ThreadPoolExecutor  # not needed at start-up
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for p, value in zip(todo, pool.map(_safe, todo)):
+            hashes[p] = value
+            if cache is not None and value is not None:
+                cache.put(p, file_stats[p], {"Hash": value}, settings)
+    return hashes
+
+
+def find_duplicate_groups(
+    paths: List[str],
+    mode: str = "bytes",
+    jobs: int = 1,
+    cache: Optional[MeasurementCache] = None,
+    stats: Optional[Dict[str, os.stat_result]] = None,
+) -> List[dict]:
+    """Group `paths` whose audio is known to be identical.
+
+    "bytes" compares whole-file hashes, only for files sharing a size.
+    "stream" additionally hashes the encoded audio packets of every remaining file,
+    catching the same stream in different containers.
+
+    Returns one dict per group of 2+ files: {"Kind": "bytes"|"stream", "Paths": [...]},
+    members in input order, the first member being the one to analyse.
+    `stats` ({path: os.stat_result}) saves stat'ing those files again.
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode: {mode}")
+    if mode == "off" or len(paths) < 2:
+        return []
+    stats = stats or {}
+
+    order = {p: i for i, p in enumerate(paths)}
+    try:
+        # 1) Byte-level: only files with a same-size sibling are worth reading.
+        by_size: Dict[int, List[str]] = {}
+        for p in paths:
+            try:
+                size = stats[p].st_size if p in stats else os.path.getsize(p)
+            except OSError:
+                continue
+            by_size.setdefault(size, []).append(p)
+        candidates = [p for same in by_size.values() if len(same) > 1 for p in same]
+        byte_hashes = _hash_all(candidates, get_file_hash, BYTES_HASH_SETTINGS, jobs, cache, stats)
+
+        groups: List[dict] = []
+        by_hash: Dict[str, List[str]] = {}
+        for p in candidates:
+            if byte_hashes[p] is not None:
+                by_hash.setdefault(byte_hashes[p], []).append(p)
+        grouped = {}
+        for members in by_hash.values():
+            if len(members) > 1:
+                members.sort(key=order.get)
+                groups.append({"Kind": "bytes", "Paths": members})
+                for p in members:
+                    grouped[p] = groups[-1]
+
+        # 2) Stream-level: one representative per byte group plus every ungrouped file.
+        if mode == "stream":
+            reps = [p for p in paths if p not in grouped or grouped[p]["Paths"][0] == p]
+            stream_hashes = _hash_all(reps, get_audio_stream_hash, STREAM_HASH_SETTINGS, jobs, cache, stats)
+            by_stream: Dict[str, List[str]] = {}
+            for p in reps:
+                h = stream_hashes[p]
+                if h is not None:
+                    by_stream.setdefault(h, []).append(p)
+            for members in by_stream.values():
+                if len(members) < 2:
+                    continue
+                merged = []
+                for p in members:
+                    g = grouped.get(p)
+                    if g is not None:
+                        merged.extend(g["Paths"])
+                        groups.remove(g)
+                    else:
+                        merged.append(p)
+                merged.sort(key=order.get)
+                groups.append({"Kind": "stream", "Paths": merged})
+    finally:
+        if cache is not None:
+            cache.commit()
+
+    groups.sort(key=lambda g: order[g["Paths"][0]])
+    return groups
+
+
+def expand_duplicate_metrics(paths: List[str], groups: List[dict], measured: Dict[str, dict],
+                             stats: Optional[Dict[str, os.stat_result]] = None) -> list:
+    """Metrics for every path, copying each group representative's result to its members.
+
+    `measured` maps analysed paths to their metrics. Group members get the
+    representative's measurements under their own file identity, plus
+    DuplicateGroup (1-based) and DuplicateOf (representative path) fields.
+    """
+    member_of = {}
+    for gid, g in enumerate(groups, start=1):
+        for p in g["Paths"]:
+            member_of[p] = (gid, g["Paths"][0])
+
+    metrics = []
+    for p in paths:
+        if p not in member_of:
+            metrics.append(measured[p])
+            continue
+        gid, rep = member_of[p]
+        m = dict(measured[rep])
+        if p != rep:
+            try:
+                size = stats[p].st_size if stats and p in stats else os.path.getsize(p)
+            except OSError:
+                size = m.get("SizeBytes")
+            m.update({
+                "FileName": os.path.basename(p),
+                "Path": p,
+                "Ext": os.path.splitext(p)[1].lower().lstrip("."),
+                "SizeBytes": size,
+                **dict.fromkeys(COST_FIELDS),  # not decoded: it cost nothing
+            })
+        m["DuplicateGroup"] = gid
+        m["DuplicateOf"] = rep if p != rep else None
+        metrics.append(m)
+    return metrics
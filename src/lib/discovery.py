@@ -0,0 +1,137 @@
+"""Media file discovery: which files under the given folders get analysed.
+
+Built on os.scandir: each file is stat'ed once, and that stat result is handed to
+the later stages (dedup, cache lookups, file size) instead of being taken again.
+"""
+
+import fnmatch
+import os
+from typing import Dict, Iterable, Optional
+
+SUPPORTED_EXTS = {".mp3", ".mp4", ".m4a", ".wav", ".flac", ".ogg", ".mkv", ".mov", ".m4v"}
+
+
+def test_glob_match(rel_path: str, patterns: Iterable[str]) -> bool:
+    """True if `rel_path` ("/"-separated, relative to the scanned folder) matches one of
+    `patterns`: a pattern with a "/" is matched against the whole relative path, one
+    without against the last component only (so ".Trash" skips every .Trash folder)."""
+    name = rel_path.rsplit("/", 1)[-1]
+    for pat in patterns:
+        if fnmatch.fnmatch(rel_path if "/" in pat else name, pat):
+            return True
+    return False
+
+
+def _list_dir(path: str, rel: str):
+    """(files [(path, rel, stat)], subdirs [(path, rel, stat, is_link)]) of one directory;
+    unreadable directories and entries (broken links, permissions) are skipped, like os.walk does."""
+    files = []
+    dirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir():
+                        dirs.append((entry.path, entry_rel, entry.stat(), entry.is_symlink()))
+                    elif entry.is_file():
+                        files.append((entry.path, entry_rel, entry.stat()))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def scan_media_files(
+    folders: Iterable[str],
+    exts: Iterable[str] = SUPPORTED_EXTS,
+    include: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+    max_depth: Optional[int] = None,
+    jobs: int = 1,
+) -> Dict[str, os.stat_result]:
+    """{path: stat} of the files under `folders` with a supported extension, by path.
+
+    `include` globs keep only matching files; `exclude` globs drop matching files
+    and prune matching directories (see test_glob_match). `max_depth` 0 scans only
+    the folders themselves, 1 their subfolders too, and so on. Symlinked folders are
+    followed once the real folders are done, and a directory already visited (a loop,
+    or two paths to the same place) is scanned once, under its real path. With `jobs`
+    > 1, sibling directories are listed concurrently, which pays off on network
+    shares where each listing is a round trip.
+    """
+    exts = set(exts)
+    include = list(include or [])
+    exclude = list(exclude or [])
+    found: Dict[str, os.stat_result] = {}
+    visited = set()
+    queue = []  # (path, rel, depth)
+    links = []  # symlinked folders, (path, rel, depth, (st_dev, st_ino))
+
+    for folder in folders:
+        try:
+            st = os.stat(folder)
+        except OSError:
+            continue
+        if (st.st_dev, st.st_ino) not in visited:
+            visited.add((st.st_dev, st.st_ino))
+            queue.append((folder, "", 0))
+
+    def _collect(listing, depth):
+        files, dirs = listing
+        for path, rel, st in files:
+            if os.path.splitext(path)[1].lower() not in exts:
+                continue
+            if exclude and test_glob_match(rel, exclude):
+                continue
+            if include and not test_glob_match(rel, include):
+                continue
+            found.setdefault(path, st)
+        if max_depth is not None and depth >= max_depth:
+            return []
+        subdirs = []
+        for path, rel, st, is_link in dirs:
+            if exclude and test_glob_match(rel, exclude):
+                continue
+            key = (st.st_dev, st.st_ino)
+            if is_link:
+                links.append((path, rel, depth + 1, key))
+            elif key not in visited:
+                visited.add(key)
+                subdirs.append((path, rel, depth + 1))
+        return subdirs
+
+    def _next_links():
+        """Symlinked folders not reached through a real path; called once the queue is empty."""
+        out = []
+        while links:
+            path, rel, depth, key = links.pop(0)
+            if key not in visited:
+                visited.add(key)
+                out.append((path, rel, depth))
+        return out
+
+    if jobs <= 1:
+        while queue:
+            path, rel, depth = queue.pop()
+            queue.extend(_collect(_list_dir(path, rel), depth))
+            if not queue:
+                queue.extend(_next_links())
+        return dict(sorted(found.items()))
+
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    # Listings run on the pool; results are merged (and `visited` updated) here only.
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = {pool.submit(_list_dir, p, r): d for p, r, d in queue}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                depth = pending.pop(fut)
+                for p, r, d in _collect(fut.result(), depth):
+                    pending[pool.submit(_list_dir, p, r)] = d
+            if not pending:
+                for p, r, d in _next_links():
+                    pending[pool.submit(_list_dir, p, r)] = d
+    return dict(sorted(found.items()))
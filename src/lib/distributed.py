@@ -0,0 +1,385 @@
+"""--coordinator / --worker: spread the measurements over several machines.
+
+The coordinator listens on a TCP port; workers (same ffmpeg, same media mounted)
+connect to it and are handed one file at a time per job slot. Messages are JSON
+objects, one per line:
+
+    worker -> coordinator   {"Hello": PROTOCOL_VERSION, "Worker", "Jobs", "Ffmpeg", "Token"}
+    coordinator -> worker   {"Welcome": PROTOCOL_VERSION} or {"Error": reason}
+    coordinator -> worker   {"Job": id, "Path", "Backend", "Size", "Info", "Timeout", "Retries", "Sample"}
+    worker -> coordinator   {"Done": id, "Metrics"}
+    worker -> coordinator   {"Alive": true}, every HEARTBEAT_INTERVAL seconds
+
+A worker that disconnects or stays silent for WORKER_DEAD_AFTER seconds is dropped
+and its files go back to the queue. The token is only compared, not encrypted:
+meant for a trusted network.
+"""
+
+import hmac
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .engine import MAX_POOL_CRASHES, _analyse_one, get_schedule_order
+from .ffmpeg_utils import new_error_metrics
+
+PROTOCOL_VERSION = 1
+TOKEN_ENV = "LOUDSCAN_TOKEN"
+
+HEARTBEAT_INTERVAL = 5.0
+WORKER_DEAD_AFTER = 30.0
+RECONNECT_DELAY = 5.0
+
+# Longest accepted message line (a metrics dict is a few kB).
+MAX_MESSAGE = 1 << 20
+
+Address = Tuple[str, int]
+
+
+class WorkerRefused(RuntimeError):
+    """The coordinator turned the worker away (token, version or ffmpeg mismatch)."""
+
+
+def parse_address(spec: str, default_host: Optional[str] = None) -> Address:
+    """(host, port) from "HOST:PORT", or "PORT" alone when there is a `default_host`."""
+    host, sep, port = spec.rpartition(":")
+    if not sep:
+        host = default_host
+    if not host or not port.isdigit() or not 0 < int(port) < 65536:
+        form = "[HOST:]PORT" if default_host else "HOST:PORT"
+        raise ValueError(f"invalid address '{spec}' (expected {form})")
+    return host, int(port)
+
+
+def parse_path_map(specs: List[str]) -> List[Tuple[str, str]]:
+    """[(coordinator prefix, local prefix)] from "FROM=TO" specs."""
+    out = []
+    for spec in specs:
+        src, sep, dst = spec.partition("=")
+        if not sep or not src or not dst:
+            raise ValueError(f"invalid path map '{spec}' (expected FROM=TO)")
+        out.append((src, dst))
+    return out
+
+
+def get_mapped_path(path: str, path_map: List[Tuple[str, str]]) -> str:
+    """`path` with the first matching coordinator prefix replaced by the local one."""
+    for src, dst in path_map:
+        base = src.rstrip("/\\")
+        if path.startswith(base) and path[len(base):len(base) + 1] in ("", "/", "\\"):
+            return dst.rstrip("/\\") + path[len(base):]
+    return path
+
+
+def _encode(msg: dict) -> bytes:
+    return (json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _read_messages(sock: socket.socket):
+    """Messages from `sock` until it closes; ValueError on a malformed line."""
+    with sock.makefile("rb") as f:
+        while True:
+            line = f.readline(MAX_MESSAGE)
+            if not line:
+                return
+            if not line.endswith(b"\n"):
+                raise ValueError("message too long")
+            msg = json.loads(line)
+            if not isinstance(msg, dict):
+                raise ValueError("not a JSON object")
+            yield msg
+
+
+class _Peer:
+    """A connected worker, as the coordinator sees it."""
+
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.name = f"{address[0]}:{address[1]}"
+        self.slots = 0          # set by its Hello
+        self.jobs: Dict[int, int] = {}  # job id -> file index
+        self.last_seen = time.monotonic()
+        self.closed = False
+
+    def send(self, msg: dict):
+        self.sock.sendall(_encode(msg))
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Coordinator:
+    """Listens for workers at `address` and measures files on them (measure).
+
+    Workers may join or leave at any time, also between two measure calls (watch
+    mode). `ffmpeg_version` (get_ffmpeg_version) and `token` must match the
+    workers'. `on_event(message)` is told about workers joining, leaving or being
+    refused.
+    """
+
+    def __init__(self, address: Address, ffmpeg_version: str, token: Optional[str] = None,
+                 on_event: Optional[Callable[[str], None]] = None):
+        self._server = socket.create_server(address)
+        self.address = self._server.getsockname()[:2]
+        self.ffmpeg_version = ffmpeg_version
+        self.token = token
+        self.on_event = on_event or (lambda message: None)
+        self._events = queue.Queue()  # (kind, peer, message), from the connection threads
+        self._peers: List[_Peer] = []  # welcomed
+        self._next_job = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return  # closed
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            peer = _Peer(sock, address)
+            threading.Thread(target=self._read, args=(peer,), daemon=True).start()
+
+    def _read(self, peer: _Peer):
+        reason = "disconnected"
+        try:
+            for msg in _read_messages(peer.sock):
+                peer.last_seen = time.monotonic()
+                if "Alive" not in msg:
+                    self._events.put(("message", peer, msg))
+        except (OSError, ValueError) as e:
+            reason = f"connection error: {e}"
+        self._events.put(("lost", peer, reason))
+
+    def _welcome(self, peer: _Peer, msg: dict):
+        name = f"{msg.get('Worker') or peer.name}"
+        if msg.get("Hello") != PROTOCOL_VERSION:
+            error = f"protocol version {msg.get('Hello')}, expected {PROTOCOL_VERSION}"
+        elif self.token and not hmac.compare_digest(str(msg.get("Token") or ""), self.token):
+            error = "wrong token"
+        elif msg.get("Ffmpeg") != self.ffmpeg_version:
+            error = f"other ffmpeg build ({msg.get('Ffmpeg')}; coordinator: {self.ffmpeg_version})"
+        elif not isinstance(msg.get("Jobs"), int) or msg["Jobs"] < 1:
+            error = "no job slots"
+        else:
+            error = None
+        try:
+            peer.send({"Error": error} if error else {"Welcome": PROTOCOL_VERSION})
+        except OSError:
+            error = error or "disconnected"
+        if error:
+            peer.close()
+            self.on_event(f"Worker {name} refused: {error}")
+            return
+        peer.name = name
+        peer.slots = msg["Jobs"]
+        self._peers.append(peer)
+        self.on_event(f"Worker {name} joined ({peer.slots} job(s)).")
+
+    def measure(
+        self, paths: List[str], todo: List[int], backend: str,
+        finish: Callable[[int, dict], None], sizes: Optional[Dict[int, int]] = None,
+        infos: Optional[Dict[int, Optional[dict]]] = None,
+        limits: Optional[Dict[int, Optional[float]]] = None, retries: int = 0,
+        sample: Optional[Tuple[int, float]] = None,
+    ):
+        """engine._measure on the workers: `finish(idx, metrics)` for every index in
+        `todo`, longest file first. Returns once every file is done, waiting for
+        workers as long as it takes. A file in flight on a lost worker is handed
+        out again, up to MAX_POOL_CRASHES times before it becomes an Error row."""
+        sizes = sizes or {}
+        infos = infos or {}
+        limits = limits or {}
+        pending = deque(get_schedule_order(todo, infos))
+        losses = dict.fromkeys(todo, 0)
+        left = len(todo)
+        if left and not self._peers:
+            self.on_event(f"Waiting for workers on {self.address[0]}:{self.address[1]}...")
+
+        def _drop(peer: _Peer, reason: str):
+            nonlocal left
+            if peer in self._peers:
+                self._peers.remove(peer)
+            elif peer.closed:
+                return  # already dropped or refused
+            if not peer.closed:
+                peer.close()
+            back = []
+            for idx in peer.jobs.values():
+                losses[idx] += 1
+                if losses[idx] < MAX_POOL_CRASHES:
+                    back.append(idx)
+                else:
+                    left -= 1
+                    finish(idx, new_error_metrics(paths[idx], RuntimeError("Analysis worker lost")))
+            if peer.slots:
+                self.on_event(f"Worker {peer.name} lost ({reason}); {len(back)} file(s) handed out again.")
+            peer.jobs.clear()
+            pending.extendleft(reversed(get_schedule_order(back, infos)))
+
+        while left:
+            for peer in list(self._peers):
+                while pending and len(peer.jobs) < peer.slots:
+                    idx = pending.popleft()
+                    job = self._next_job
+                    self._next_job += 1
+                    peer.jobs[job] = idx
+                    sample_spec = list(sample) if sample else None
+                    try:
+                        peer.send({"Job": job, "Path": paths[idx], "Backend": backend, "Size": sizes.get(idx),
+                                   "Info": infos.get(idx), "Timeout": limits.get(idx), "Retries": retries,
+                                   "Sample": sample_spec})
+                    except OSError as e:
+                        _drop(peer, f"send failed: {e}")
+                        break
+
+            try:
+                kind, peer, msg = self._events.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                kind = None
+            if kind == "lost":
+                _drop(peer, msg)
+            elif kind == "message" and not peer.closed:
+                if "Hello" in msg and not peer.slots:
+                    self._welcome(peer, msg)
+                elif "Done" in msg and msg["Done"] in peer.jobs:
+                    idx = peer.jobs.pop(msg["Done"])
+                    m = msg.get("Metrics")
+                    if not isinstance(m, dict):
+                        m = new_error_metrics(paths[idx], RuntimeError("Malformed worker result"))
+                    # The worker may see the file under another mount point.
+                    m["Path"] = paths[idx]
+                    m["FileName"] = os.path.basename(paths[idx])
+                    left -= 1
+                    finish(idx, m)
+
+            now = time.monotonic()
+            for peer in list(self._peers):
+                if now - peer.last_seen > WORKER_DEAD_AFTER:
+                    _drop(peer, f"silent for {WORKER_DEAD_AFTER:g} s")
+
+    def close(self):
+        self._server.close()
+        for peer in self._peers:
+            peer.close()
+        self._peers = []
+
+
+def run_worker(address: Address, jobs: int, ffmpeg_version: str, token: Optional[str] = None,
+               path_map: Optional[List[Tuple[str, str]]] = None,
+               on_event: Optional[Callable[[str], None]] = None):
+    """Measure files for the coordinator at `address`, `jobs` at a time, until
+    interrupted: when the coordinator goes away (end of its run), connect again
+    every RECONNECT_DELAY seconds. Raises WorkerRefused if it turns us away."""
+    on_event = on_event or (lambda message: None)
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    waiting = False
+    while True:
+        try:
+            sock = socket.create_connection(address, timeout=RECONNECT_DELAY)
+        except OSError:
+            if not waiting:
+                on_event(f"Waiting for the coordinator at {address[0]}:{address[1]}...")
+                waiting = True
+            time.sleep(RECONNECT_DELAY)
+            continue
+        waiting = False
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        hello = {"Hello": PROTOCOL_VERSION, "Worker": name, "Jobs": jobs, "Ffmpeg": ffmpeg_version, "Token": token}
+        try:
+            served = _serve(sock, hello, jobs, path_map or [], on_event)
+        except (OSError, ValueError) as e:
+            on_event(f"Connection to the coordinator lost: {e}")
+        else:
+            on_event(f"Coordinator done; {served} file(s) measured.")
+        finally:
+            sock.close()
+        time.sleep(RECONNECT_DELAY)
+
+
+def _serve(sock: socket.socket, hello: dict, jobs: int, path_map: List[Tuple[str, str]],
+           on_event: Callable[[str], None]) -> int:
+    """One connection of run_worker; returns how many files were measured."""
+    send_lock = threading.Lock()
+
+    def _send(msg: dict):
+        with send_lock:
+            sock.sendall(_encode(msg))
+
+    _send(hello)
+    messages = _read_messages(sock)
+    first = next(messages, None)
+    if first is None:
+        raise OSError("connection closed during the handshake")
+    if "Error" in first:
+        raise WorkerRefused(f"refused by the coordinator: {first['Error']}")
+    on_event(f"Connected to the coordinator ({jobs} job(s)).")
+
+    stop = threading.Event()
+
+    def _heartbeat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                _send({"Alive": True})
+            except OSError:
+                return
+
+    served = 0
+
+    def _reply(job: dict, local: str, fut):
+        nonlocal served
+        try:
+            m = fut.result()
+        except BrokenProcessPool:
+            # Hang up: the coordinator hands our files to other workers.
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+        except Exception as e:
+            m = new_error_metrics(local, e)
+        served += 1
+        try:
+            _send({"Done": job["Job"], "Metrics": m})
+        except OSError:
+            pass  # the read loop sees the connection go
+
+    threading.Thread(target=_heartbeat, daemon=True).start()
+    # Spawned, not forked: a forked child would hold the connection open after
+    # this process dies, and the coordinator would only notice by the silence.
+    pool = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"))
+    futures = set()
+    try:
+        for msg in messages:
+            if "Job" not in msg:
+                continue
+            local = get_mapped_path(msg["Path"], path_map)
+            sample = tuple(msg["Sample"]) if msg.get("Sample") else None
+            try:
+                fut = pool.submit(_analyse_one, local, msg.get("Backend", "ffmpeg"), msg.get("Size"),
+                                  msg.get("Info"), msg.get("Timeout"), msg.get("Retries", 0), sample)
+            except BrokenProcessPool:
+                break
+            futures.add(fut)
+            fut.add_done_callback(futures.discard)
+            fut.add_done_callback(lambda f, job=msg, local=local: _reply(job, local, f))
+    finally:
+        stop.set()
+        for fut in list(futures):
+            fut.cancel()  # queued jobs only; the running ones are waited for
+        pool.shutdown(wait=True)
+    return served
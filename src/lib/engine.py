@@ -0,0 +1,296 @@
+import errno
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cache import MeasurementCache
+from .ffmpeg_utils import (
+    COST_FIELDS, DEFAULT_RETRIES, DEFAULT_TIMEOUT, DEFAULT_TIMEOUT_FACTOR, MEDIA_FIELDS,
+    get_audio_stream_info, get_file_timeout, get_loudness_from_file, new_error_metrics,
+)
+
+# How many times a file may be in flight when the pool dies before we give up on it.
+MAX_POOL_CRASHES = 2
+
+# Cache settings key of the ffprobe results (see probe_files).
+PROBE_SETTINGS = "probe:ffprobe"
+
+# Failed attempts worth repeating (DEFAULT_RETRIES times): a network share or disk
+# hiccup, not bad media.
+RETRY_DELAY = 2.0
+_TRANSIENT_ERRNOS = {
+    getattr(errno, name) for name in ("EIO", "EAGAIN", "ETIMEDOUT", "ECONNRESET", "ESTALE", "EBUSY")
+    if hasattr(errno, name)
+}
+_TRANSIENT_MESSAGES = (
+    "Input/output error", "Connection timed out", "Connection reset",
+    "Stale file handle", "Resource temporarily unavailable", "Device or resource busy",
+)
+
+
+def get_default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def test_transient_error(e: BaseException) -> bool:
+    """True for I/O failures that may pass when tried again."""
+    if isinstance(e, OSError) and e.errno in _TRANSIENT_ERRNOS:
+        return True
+    return isinstance(e, RuntimeError) and any(msg in str(e) for msg in _TRANSIENT_MESSAGES)
+
+
+def get_schedule_order(todo: List[int], infos: Dict[int, Optional[dict]]) -> List[int]:
+    """`todo` longest file first; unknown durations go first: they may be long, and
+    cost little if not."""
+    def _key(idx):
+        info = infos.get(idx)
+        duration = info["Duration"] if info else None
+        return (duration is not None, -(duration or 0.0), idx)
+
+    return sorted(todo, key=_key)
+
+
+class AnalysisPool:
+    """Worker processes kept between analyse_files calls (a long-running service),
+    so each call does not start its own; a pool broken by a crash is replaced."""
+
+    def __init__(self, jobs: int):
+        self.jobs = max(1, jobs)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def get(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+        return self._pool
+
+    def reset(self):
+        """Drop a broken pool; the next get() starts a new one."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def _analyse_one(path: str, backend: str, size: Optional[int], info: Optional[dict],
+                 timeout: Optional[float], retries: int, sample: Optional[Tuple[int, float]] = None) -> dict:
+    """get_loudness_from_file, tried up to `retries` more times on transient errors.
+
+    A file that still fails gets an error row (new_error_metrics) with what the
+    attempts cost: WallSeconds over all of them, and the probed Duration.
+    """
+    t0 = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            return get_loudness_from_file(path, backend, size, info, timeout, sample)
+        except Exception as e:
+            if attempt >= retries or not test_transient_error(e):
+                m = new_error_metrics(path, e)
+                m["WallSeconds"] = time.perf_counter() - t0
+                m["Duration"] = info["Duration"] if info else None
+                return m
+            time.sleep(RETRY_DELAY * (attempt + 1))
+
+
+def probe_files(
+    paths: List[str],
+    jobs: Optional[int] = None,
+    cache: Optional[MeasurementCache] = None,
+    stats: Optional[Dict[str, os.stat_result]] = None,
+) -> Dict[str, Optional[dict]]:
+    """{path: get_audio_stream_info} for every path, None where the probe failed.
+
+    ffprobe only reads the container headers, so the calls run on a thread pool;
+    unchanged files are answered from the cache, which is only touched from the
+    calling thread.
+    """
+    stats = stats or {}
+    infos: Dict[str, Optional[dict]] = {}
+    file_stats = {}
+    todo = []
+    for p in paths:
+        try:
+            st = stats.get(p) or os.stat(p)
+        except OSError:
+            infos[p] = None
+            continue
+        hit = cache.get(p, st, PROBE_SETTINGS) if cache is not None else None
+        if hit is not None:
+            infos[p] = hit
+        else:
+            file_stats[p] = st
+            todo.append(p)
+
+    def _safe(p):
+        try:
+            return get_audio_stream_info(p)
+        except (OSError, RuntimeError):
+            return None  # the measurement reports the error
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs or get_default_jobs())) as pool:
+        for p, info in zip(todo, pool.map(_safe, todo)):
+            infos[p] = info
+            if cache is not None and info is not None:
+                cache.put(p, file_stats[p], info, PROBE_SETTINGS)
+    return infos
+
+
+def analyse_files(
+    paths: List[str],
+    jobs: Optional[int] = None,
+    on_result: Optional[Callable[[int, int, str, dict], None]] = None,
+    cache: Optional[MeasurementCache] = None,
+    refresh_cache: bool = False,
+    backend: str = "ffmpeg",
+    stats: Optional[Dict[str, os.stat_result]] = None,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    timeout_factor: float = DEFAULT_TIMEOUT_FACTOR,
+    retries: int = DEFAULT_RETRIES,
+    sample: Optional[Tuple[int, float]] = None,
+    coordinator=None,
+    pool: Optional[AnalysisPool] = None,
+) -> list:
+    """Measure every path, optionally across a pool of worker processes.
+
+    Results are returned in the same order as `paths`, whatever order the workers
+    finish in. `on_result(done, total, path, metrics)` is called as each file completes.
+    A failing file becomes an Error row instead of aborting the run.
+
+    With a `cache`, unchanged files are answered from it and only the rest are
+    measured; `refresh_cache` skips the lookups but still stores the new results.
+    `backend` is passed to get_loudness_from_file. `stats` ({path: os.stat_result},
+    e.g. from discovery.scan_media_files) saves stat'ing those files again.
+
+    Every file is probed first (probe_files): the worker pool then takes the
+    longest files first, so a long file does not start last and finish alone,
+    and each row gets the probed stream properties and duration.
+
+    A file gets get_file_timeout(duration, `timeout`, `timeout_factor`) seconds
+    before ffmpeg is killed, and up to `retries` more attempts after a transient
+    I/O error (test_transient_error). `sample` = (windows, seconds) estimates
+    long files from sampled windows (lib/sampling.py); the cache must then have
+    been opened with the matching get_analysis_settings.
+
+    With a `coordinator` (distributed.Coordinator), the files are measured by its
+    remote workers instead of a local pool; probing and the cache stay local.
+    A `pool` is used instead of starting worker processes for this call (`jobs`
+    is then the pool's).
+    """
+    total = len(paths)
+    results: List[Optional[dict]] = [None] * total
+    done = 0
+    file_stats = {}
+    stats = stats or {}
+
+    infos = probe_files(paths, jobs, cache, stats)
+
+    def _finish(idx: int, m: dict):
+        nonlocal done
+        info = infos.get(paths[idx])
+        if info:  # error rows and older cache entries lack them
+            for k in MEDIA_FIELDS + ("Duration",):
+                if m.get(k) is None:
+                    m[k] = info[k]
+        results[idx] = m
+        if cache is not None and idx in file_stats:
+            cache.put(paths[idx], file_stats[idx], m)
+        done += 1
+        if on_result:
+            on_result(done, total, paths[idx], m)
+
+    todo = list(range(total))
+    if cache is not None:
+        todo = []
+        for idx, path in enumerate(paths):
+            try:
+                st = stats.get(path) or os.stat(path)
+            except OSError:
+                todo.append(idx)
+                continue
+            hit = None if refresh_cache else cache.get(path, st)
+            if hit is not None:
+                hit.update(dict.fromkeys(COST_FIELDS))  # answered for free this run
+                _finish(idx, hit)
+            else:
+                file_stats[idx] = st
+                todo.append(idx)
+
+    try:
+        known = {i: file_stats.get(i) or stats.get(paths[i]) for i in todo}
+        sizes = {i: st.st_size for i, st in known.items() if st is not None}
+        limits = {}
+        for i in todo:
+            info = infos.get(paths[i])
+            limits[i] = get_file_timeout(info["Duration"] if info else None, timeout, timeout_factor)
+        todo_infos = {i: infos.get(paths[i]) for i in todo}
+        if coordinator is not None:
+            coordinator.measure(paths, todo, backend, _finish, sizes, todo_infos, limits, retries, sample)
+        else:
+            _measure(paths, todo, pool.jobs if pool else jobs, backend, _finish, sizes, todo_infos, limits,
+                     retries, sample, pool)
+    finally:
+        if cache is not None:
+            cache.commit()
+    return results
+
+
+def _measure(
+    paths: List[str], todo: List[int], jobs: Optional[int], backend: str,
+    finish: Callable[[int, dict], None], sizes: Optional[Dict[int, int]] = None,
+    infos: Optional[Dict[int, Optional[dict]]] = None,
+    limits: Optional[Dict[int, Optional[float]]] = None, retries: int = 0,
+    sample: Optional[Tuple[int, float]] = None, pool: Optional[AnalysisPool] = None,
+):
+    sizes = sizes or {}
+    infos = infos or {}
+    limits = limits or {}
+
+    def _args(idx):
+        return paths[idx], backend, sizes.get(idx), infos.get(idx), limits.get(idx), retries, sample
+
+    jobs = max(1, jobs or get_default_jobs())
+
+    if jobs == 1 or len(todo) <= 1:
+        for idx in todo:
+            path = paths[idx]
+            try:
+                m = _analyse_one(*_args(idx))
+            except Exception as e:
+                m = new_error_metrics(path, e)
+            finish(idx, m)
+        return
+
+    pending = get_schedule_order(todo, infos)
+    crashes = {idx: 0 for idx in todo}
+
+    while pending:
+        broken = False
+        context = nullcontext(pool.get()) if pool else ProcessPoolExecutor(max_workers=min(jobs, len(pending)))
+        with context as executor:
+            futures = {executor.submit(_analyse_one, *_args(idx)): idx for idx in pending}
+            pending = []
+            for fut in as_completed(futures):
+                idx = futures[fut]
+                try:
+                    m = fut.result()
+                except BrokenProcessPool:
+                    # A worker died (segfault, OOM kill...). Every job still in flight
+                    # fails with it, so resubmit them to a fresh pool.
+                    broken = True
+                    crashes[idx] += 1
+                    if crashes[idx] < MAX_POOL_CRASHES:
+                        pending.append(idx)
+                        continue
+                    m = new_error_metrics(paths[idx], RuntimeError("Analysis worker crashed"))
+                except Exception as e:
+                    m = new_error_metrics(paths[idx], e)
+                finish(idx, m)
+        if broken and pool:
+            pool.reset()
+        pending = get_schedule_order(pending, infos)
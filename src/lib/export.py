@@ -0,0 +1,163 @@
+"""Columnar exports of the report: one typed array per column, NaN for missing numbers.
+
+`.npz` needs NumPy, Parquet needs pyarrow; both are optional dependencies.
+"""
+
+import math
+import os
+from typing import Iterable, List, Optional
+
+from .curves import CURVE_POINTS, get_curve_block
+from .ffmpeg_utils import CURVE_FIELDS
+from .formats import get_export_dependency_error
+from .records import FileTable
+from .report import FILE_CSV_FIELDS, PAIR_CSV_FIELDS
+
+# Columns that are not float64: text, sizes that are always known and the 0/1 Approximate flag.
+_TEXT_FIELDS = {"FileName", "Ext", "Error", "Path", "DuplicateOf", "Codec",
+                "A_File", "B_File", "A_Ext", "B_Ext", "Similarity"}
+_INT_FIELDS = {"SizeBytes", "Approximate"}
+
+
+def _float(v) -> float:
+    return math.nan if v is None else float(v)
+
+
+def get_columns(rows: Iterable[dict], fields: List[str]) -> dict:
+    """{field: column}: float64 ndarray with NaN for missing values, int64 sizes,
+    and a list of str (None when missing) for text. `rows` is a list of dicts or a
+    FileTable."""
+    import numpy as np
+
+    if isinstance(rows, FileTable):
+        # Columns straight from the table's arrays, no per-row lookups.
+        return {
+            k: rows.get_column(k) if k in _TEXT_FIELDS
+            else np.asarray(rows.get_column(k), dtype=np.int64) if k in _INT_FIELDS
+            else np.array(rows.get_float_array(k), dtype=np.float64)
+            for k in fields
+        }
+
+    rows = list(rows)
+    cols = {}
+    for k in fields:
+        if k in _TEXT_FIELDS:
+            cols[k] = [None if r.get(k) is None else str(r[k]) for r in rows]
+        elif k in _INT_FIELDS:
+            cols[k] = np.fromiter((r.get(k) or 0 for r in rows), dtype=np.int64, count=len(rows))
+        else:
+            cols[k] = np.fromiter((_float(r.get(k)) for r in rows), dtype=np.float64, count=len(rows))
+    return cols
+
+
+def _pack_text(values: List[Optional[str]]):
+    """Arrow-style string column: UTF-8 bytes back to back, n+1 offsets and a
+    validity mask (False for None, which is stored as an empty string).
+
+    Fixed-width unicode arrays would cost 4 bytes x the longest path for every row.
+    """
+    import numpy as np
+
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    valid = np.fromiter((v is not None for v in values), dtype=np.bool_, count=len(values))
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets, valid
+
+
+def read_npz_text(npz, name: str) -> List[Optional[str]]:
+    """Decode a text column written by write_columnar_exports, e.g. read_npz_text(d, "files.Path");
+    None where the value was missing."""
+    data = npz[name + ".utf8"].tobytes()
+    offsets = npz[name + ".offsets"]
+    valid = npz[name + ".valid"].tolist()
+    return [data[a:b].decode("utf-8") if ok else None
+            for a, b, ok in zip(offsets[:-1].tolist(), offsets[1:].tolist(), valid)]
+
+
+def get_curve_columns(files: FileTable) -> dict:
+    """{curve field: float32 array of shape (files, CURVE_POINTS)}, NaN-padded."""
+    import numpy as np
+
+    return {
+        k: np.frombuffer(get_curve_block(files.get_column(k)), dtype="<f4").reshape(-1, CURVE_POINTS)
+        for k in CURVE_FIELDS
+    }
+
+
+def get_summary_columns(report: dict) -> dict:
+    """Pair-level summary over all pairs: the level histogram and headline numbers."""
+    import numpy as np
+
+    summary = report["Summary"]
+    levels = list(summary["LevelCounts"])
+    return {
+        "Levels": np.array(levels, dtype=np.str_),
+        "LevelCounts": np.array([summary["LevelCounts"][l] for l in levels], dtype=np.int64),
+        "Pairs": np.int64(summary["Pairs"]),
+        "MeanDelta": np.float64(summary["MeanDelta"]),
+        "MaxDelta": np.float64(_float(summary["MaxDelta"])),
+        "RatioSlightOrLess": np.float64(summary["RatioSlightOrLess"]),
+    }
+
+
+def write_columnar_exports(base_path: str, report: dict, formats: Iterable[str]) -> List[str]:
+    """Write `base_path` + ".npz" and/or "_files.parquet" / "_pairs.parquet"; returns the paths.
+
+    In the .npz, arrays are named "files.<column>", "pairs.<column>" and "summary.<name>";
+    text columns are stored as "<column>.utf8" + "<column>.offsets" + "<column>.valid"
+    (see read_npz_text), so np.load needs no pickle. Parquet keeps text as strings and
+    stores missing values as null, numbers included (NaN in the .npz).
+    The loudness curves (CURVE_FIELDS) are (files, CURVE_POINTS) float32 arrays in the
+    .npz and fixed-size float lists in Parquet.
+    """
+    formats = list(formats)
+    if not formats:
+        return []
+    for fmt in formats:
+        err = get_export_dependency_error(fmt)
+        if err:
+            raise RuntimeError(err)
+
+    files = get_columns(report["FilesEnriched"], FILE_CSV_FIELDS)
+    files.update(get_curve_columns(report["FilesEnriched"]))
+    pairs = get_columns(report["Pairs"], PAIR_CSV_FIELDS)
+    paths = []
+
+    if "npz" in formats:
+        import numpy as np
+
+        arrays = {}
+        for prefix, cols in (("files", files), ("pairs", pairs)):
+            for k, v in cols.items():
+                if k in _TEXT_FIELDS:
+                    (arrays[f"{prefix}.{k}.utf8"], arrays[f"{prefix}.{k}.offsets"],
+                     arrays[f"{prefix}.{k}.valid"]) = _pack_text(v)
+                else:
+                    arrays[f"{prefix}.{k}"] = v
+        arrays.update({f"summary.{k}": v for k, v in get_summary_columns(report).items()})
+        path = base_path + ".npz"
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)  # uncompressed: loads with plain reads
+        os.replace(path + ".tmp", path)
+        paths.append(path)
+
+    if "parquet" in formats:
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for name, cols in (("files", files), ("pairs", pairs)):
+            path = f"{base_path}_{name}.parquet"
+            table = pa.table({
+                k: pa.FixedSizeListArray.from_arrays(pa.array(v.ravel()), v.shape[1]) if k in CURVE_FIELDS
+                else pa.array(v, type=pa.string()) if k in _TEXT_FIELDS
+                else pa.array(v, mask=np.isnan(v)) if v.dtype.kind == "f"
+                else pa.array(v)
+                for k, v in cols.items()
+            })
+            pq.write_table(table, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            paths.append(path)
+
+    return paths
@@ -1,83 +1,498 @@
+import json
 import os
 import re
+import shutil
 import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
 
+from .curves import CurveRecorder
+from .sampling import WindowLoudness, get_sample_inputs, get_sample_starts, test_within_window
 
-def get_loudness_from_file(path: str) -> dict:
-    """Analyse loudness + volume en un seul passage FFmpeg via filter_complex."""
+# Measurement backends: "ffmpeg" scrapes the ebur128/volumedetect filter logs,
+# "numpy" decodes to float PCM and measures it in Python (lib/bs1770.py).
+BACKENDS = ("ffmpeg", "numpy")
 
-    # Single-pass: split audio stream to ebur128 and volumedetect in parallel.
-    # ebur128=peak=true gives Integrated (I), Momentary (M), Short-Term (S),
-    # Loudness Range (LRA), and True Peak — all per EBU R128 / ITU-R BS.1770.
+# Identifies each backend's measurement recipe; bump it whenever the filter graph or
+# the maths change so cached results from an older recipe are not reused.
+ANALYSIS_SETTINGS = {
+    "ffmpeg": "ebur128=peak=true;volumedetect;v2",
+    "numpy": "bs1770-numpy;v2",
+}
+
+# Recipe of the --sample windows (lib/sampling.py), bumped the same way.
+SAMPLE_SETTINGS = "faded-joins;v2"
+
+
+def get_analysis_settings(backend: str, sample: Optional[Tuple[int, float]] = None) -> str:
+    """ANALYSIS_SETTINGS of `backend`, plus the --sample windows when sampling."""
+    settings = ANALYSIS_SETTINGS[backend]
+    return f"{settings};sample={sample[0]}x{sample[1]:g};{SAMPLE_SETTINGS}" if sample else settings
+
+
+# PCM read size for the numpy backend, in frames.
+_PCM_CHUNK_FRAMES = 1 << 18
+
+# ffprobe only reads headers; a probe still running after this long is stuck.
+PROBE_TIMEOUT = 60.0
+
+# Per-file time limit of a measurement: DEFAULT_TIMEOUT seconds plus DEFAULT_TIMEOUT_FACTOR
+# seconds per second of media (a healthy run is many times faster than realtime); a file
+# of unknown duration is counted as UNKNOWN_DURATION seconds. Transient I/O failures are
+# retried DEFAULT_RETRIES times (see engine.test_transient_error).
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_TIMEOUT_FACTOR = 1.0
+UNKNOWN_DURATION = 3 * 3600.0
+DEFAULT_RETRIES = 1
+
+# Stream properties from the ffprobe probe, added to each metrics row.
+MEDIA_FIELDS = ("Codec", "Channels", "SampleRate")
+
+# What each measurement cost, added to its metrics row: media duration (s), wall time
+# of the whole call (s), CPU time of the ffmpeg child (s), its peak resident memory (MB)
+# and the realtime factor (Duration / WallSeconds). None where the platform or the
+# probe cannot tell (CPU and memory need os.wait4, i.e. not Windows).
+COST_FIELDS = ("WallSeconds", "CpuUserSeconds", "CpuSysSeconds", "PeakRssMB", "RealtimeFactor")
+TELEMETRY_FIELDS = ("Duration",) + COST_FIELDS
+
+# Set on every row: whether it was estimated from sampled windows (--sample, see
+# lib/sampling.py), and then the 95 % bound on its LUFS_I (LU).
+SAMPLE_FIELDS = ("Approximate", "LUFS_I_Bound")
+
+# Momentary and short-term loudness over time, decimated (see lib/curves.py).
+CURVE_FIELDS = ("Curve_M", "Curve_S")
+
+
+class AnalysisTimeout(RuntimeError):
+    """ffmpeg ran past the time allowed for a file and was killed."""
+
+
+class _Watchdog:
+    """Kills `proc` if it is still running `timeout` seconds from now (None = never)."""
+
+    def __init__(self, proc: subprocess.Popen, timeout: Optional[float]):
+        self.expired = False
+        self._timer = None
+        if timeout:
+            self._timer = threading.Timer(timeout, self._kill, (proc,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _kill(self, proc: subprocess.Popen):
+        self.expired = True
+        proc.kill()  # closes its pipes, so the caller's read loop ends
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+def get_file_timeout(duration: Optional[float], timeout: Optional[float],
+                     timeout_factor: float = DEFAULT_TIMEOUT_FACTOR) -> Optional[float]:
+    """Seconds allowed to measure a file of `duration` seconds; None (no limit) without `timeout`."""
+    if not timeout:
+        return None
+    return timeout + timeout_factor * (duration if duration is not None else UNKNOWN_DURATION)
+
+
+def get_ffmpeg_version() -> str:
+    """First line of `ffmpeg -version`, e.g. 'ffmpeg version 7.0.2 ...'."""
+    try:
+        r = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True)
+    except OSError:
+        return "unknown"
+    lines = (r.stdout or "").splitlines()
+    return lines[0].strip() if lines else "unknown"
+
+
+# Per-frame format: "t: 0.40  M: -18.2  S: -21.0  I: -19.1 LUFS ...", every 100 ms;
+# "M:-120.7" (no space) until the window has filled, and for digital silence.
+_RE_FRAME_M = re.compile(r"\sM:\s*([-\d.]+|-inf)")
+_RE_FRAME_S = re.compile(r"\sS:\s*([-\d.]+|-inf)")
+_RE_FRAME_T = re.compile(r"\st:\s*([\d.]+)")
+_NO_SIGNAL_LUFS = -100.0
+# Frames before the momentary (400 ms) and short-term (3 s) windows are full.
+_M_WARMUP_FRAMES = 3
+_S_WARMUP_FRAMES = 29
+_M_BLOCK = 0.4
+_S_BLOCK = 3.0
+# ebur128 summary (printed once, at end of stream)
+_RE_SUM_I    = re.compile(r"I:\s*([-\d.]+)\s*LUFS")
+_RE_SUM_LRA  = re.compile(r"LRA:\s*([\d.]+)\s*LU")
+_RE_SUM_PEAK = re.compile(r"Peak:\s*([-\d.]+)\s*dBFS")
+# volumedetect stats
+_RE_MAX_VOL  = re.compile(r"max_volume:\s*([-\d.]+)\s*dB")
+_RE_MEAN_VOL = re.compile(r"mean_volume:\s*([-\d.]+)\s*dB")
+
+
+def _parse_float(v: str):
+    if v.lower() == "-inf":
+        return None
+    try:
+        return float(v)
+    except ValueError:
+        return None
+
+
+class LoudnessLogParser:
+    """Line-by-line parser for the ebur128 + volumedetect log.
+
+    Keeps only running maxima, the summary values and the bounded loudness curves,
+    so memory stays constant regardless of the media duration. With
+    `window_seconds` (--sample's concatenated windows), the LUFS_M / LUFS_S maxima
+    skip the blocks that straddle two windows.
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None):
+        self.window_seconds = window_seconds
+        self.in_summary = False
+        self.frames = 0
+        self.curve_m = CurveRecorder()
+        self.curve_s = CurveRecorder()
+        self.lufs_i = None
+        self.lra = None
+        self.true_peak = None
+        self.lufs_m = None
+        self.lufs_s = None
+        self.peak_dbfs = None
+        self.rms_dbfs = None
+
+    def feed(self, line: str):
+        if self.in_summary:
+            self._feed_summary(line)
+        elif "Summary:" in line:
+            self.in_summary = True
+            self._feed_summary(line.split("Summary:", 1)[1])
+        elif " M:" in line:
+            self._feed_frame(line)
+
+        if "_volume:" in line:
+            if self.peak_dbfs is None:
+                m = _RE_MAX_VOL.search(line)
+                if m:
+                    self.peak_dbfs = float(m.group(1))
+            if self.rms_dbfs is None:
+                m = _RE_MEAN_VOL.search(line)
+                if m:
+                    self.rms_dbfs = float(m.group(1))
+
+    def _feed_frame(self, line: str):
+        self.frames += 1
+        keep_m = keep_s = True
+        if self.window_seconds:
+            t = _RE_FRAME_T.search(line)
+            end = float(t.group(1)) if t else 0.0
+            keep_m = test_within_window(end, _M_BLOCK, self.window_seconds)
+            keep_s = test_within_window(end, _S_BLOCK, self.window_seconds)
+        m = _RE_FRAME_M.search(line)
+        if m:
+            v = _parse_float(m.group(1))
+            if keep_m and v is not None and v > _NO_SIGNAL_LUFS and (self.lufs_m is None or v > self.lufs_m):
+                self.lufs_m = v
+            if self.frames > _M_WARMUP_FRAMES:
+                self.curve_m.feed(v if v is not None else _NO_SIGNAL_LUFS)
+        m = _RE_FRAME_S.search(line)
+        if m:
+            v = _parse_float(m.group(1))
+            if keep_s and v is not None and v > _NO_SIGNAL_LUFS and (self.lufs_s is None or v > self.lufs_s):
+                self.lufs_s = v
+            if self.frames > _S_WARMUP_FRAMES:
+                self.curve_s.feed(v if v is not None else _NO_SIGNAL_LUFS)
+
+    def _feed_summary(self, line: str):
+        if self.lufs_i is None:
+            m = _RE_SUM_I.search(line)
+            if m:
+                self.lufs_i = float(m.group(1))
+        if self.lra is None:
+            m = _RE_SUM_LRA.search(line)
+            if m:
+                self.lra = float(m.group(1))
+        if self.true_peak is None:
+            m = _RE_SUM_PEAK.search(line)
+            if m:
+                self.true_peak = float(m.group(1))
+
+
+def get_audio_stream_info(path: str) -> Optional[dict]:
+    """Cheap container probe (no decoding) of the first audio stream.
+
+    Returns {"HasAudio", "Codec", "Channels", "SampleRate", "Duration"}, or None when
+    ffprobe is not installed. Raises RuntimeError if the file cannot be opened.
+    """
+    if shutil.which("ffprobe") is None:
+        return None
     cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,channels,sample_rate:format=duration",
+        "-of", "json",
+        path,
+    ]
+    try:
+        r = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True,
+                           encoding="utf-8", errors="replace", timeout=PROBE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise AnalysisTimeout(f"ffprobe timed out after {PROBE_TIMEOUT:.0f} s on: {path}")
+    try:
+        data = json.loads(r.stdout or "{}")
+    except ValueError:
+        data = {}
+    if r.returncode != 0 or "format" not in data:
+        lines = (r.stderr or "").strip().splitlines()
+        raise RuntimeError(f"Cannot open: {lines[-1] if lines else path}")
+
+    streams = data.get("streams") or []
+    stream = streams[0] if streams else {}
+
+    def _num(v, cast):
+        try:
+            return cast(v)
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        "HasAudio": bool(streams),
+        "Codec": stream.get("codec_name"),
+        "Channels": _num(stream.get("channels"), int),
+        "SampleRate": _num(stream.get("sample_rate"), int),
+        "Duration": _num(data["format"].get("duration"), float),
+    }
+
+
+def _wait_with_usage(proc: subprocess.Popen) -> Optional[dict]:
+    """Reap `proc` (its output already read) and return its CPU times and peak RSS.
+
+    Returns None where os.wait4 does not exist; proc.returncode is set either way.
+    """
+    if not hasattr(os, "wait4"):
+        proc.wait()
+        return None
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS.
+    rss_mb = ru.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else ru.ru_maxrss / 1024
+    return {"CpuUserSeconds": ru.ru_utime, "CpuSysSeconds": ru.ru_stime, "PeakRssMB": rss_mb}
+
+
+def new_analysis_command(path: str, sample_starts: Optional[List[float]] = None,
+                         sample_seconds: Optional[float] = None) -> list:
+    """ffmpeg command measuring the first audio stream of `path`.
+
+    Single-pass: split audio stream to ebur128 and volumedetect in parallel.
+    ebur128=peak=true gives Integrated (I), Momentary (M), Short-Term (S),
+    Loudness Range (LRA), and True Peak — all per EBU R128 / ITU-R BS.1770.
+
+    Video, subtitle and data streams are disabled on the input and their packets
+    discarded by the demuxer, so 4K masters are never decoded for an audio measurement.
+    With `sample_starts`, only windows of `sample_seconds` starting there are read
+    and measured back to back (see lib/sampling.py).
+    """
+    skip = ["-vn", "-sn", "-dn", "-discard:v", "all", "-discard:s", "all", "-discard:d", "all"]
+    if sample_starts:
+        inputs, source = get_sample_inputs(path, sample_starts, sample_seconds, skip)
+    else:
+        inputs = skip + ["-i", path]
+        source = "[0:a:0]"
+    return [
         "ffmpeg", "-hide_banner", "-nostats",
-        "-i", path,
+        *inputs,
         "-filter_complex",
-        "[0:a]asplit=2[a1][a2];"
+        f"{source}asplit=2[a1][a2];"
         "[a1]ebur128=peak=true[out1];"
         "[a2]volumedetect[out2]",
         "-map", "[out1]", "-f", "null", "-",
         "-map", "[out2]", "-f", "null", "-",
     ]
 
-    result = subprocess.run(
+
+def _get_loudness_numpy(path: str, info: Optional[dict], timeout: Optional[float] = None
+                        ) -> Tuple[dict, Optional[dict]]:
+    """Decode the first audio stream to float32 PCM and measure it with NumPy.
+
+    Returns (Bs1770Meter.get_results(), the ffmpeg child's resource usage or None,
+    see _wait_with_usage).
+    """
+    try:
+        from .bs1770 import Bs1770Meter
+        import numpy as np
+    except ImportError as e:
+        raise RuntimeError(f"The numpy backend requires NumPy ({e})")
+    if info is None or not info["Channels"] or not info["SampleRate"]:
+        raise RuntimeError(f"The numpy backend needs ffprobe to read the audio format of: {path}")
+
+    channels, fs = info["Channels"], info["SampleRate"]
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-v", "error",
+        "-vn", "-sn", "-dn",
+        "-discard:v", "all", "-discard:s", "all", "-discard:d", "all",
+        "-i", path,
+        "-map", "0:a:0", "-ac", str(channels), "-ar", str(fs),
+        "-f", "f32le", "-c:a", "pcm_f32le", "-",
+    ]
+    meter = Bs1770Meter(fs, channels)
+    frame_bytes = 4 * channels
+    with subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        watchdog = _Watchdog(proc, timeout)
+        leftover = b""
+        while True:
+            buf = proc.stdout.read(_PCM_CHUNK_FRAMES * frame_bytes)
+            if not buf:
+                break
+            buf = leftover + buf
+            usable = len(buf) - len(buf) % frame_bytes
+            leftover = buf[usable:]
+            meter.feed(np.frombuffer(buf[:usable], dtype="<f4").reshape(-1, channels))
+        err = proc.stderr.read().decode("utf-8", "replace").strip()
+        watchdog.cancel()
+        usage = _wait_with_usage(proc)
+
+    if watchdog.expired:
+        raise AnalysisTimeout(f"Analysis timed out after {timeout:g} s: {path}")
+    if proc.returncode != 0 and not meter.samples:
+        raise RuntimeError(f"ffmpeg decode failed for {path}: {err.splitlines()[-1] if err else proc.returncode}")
+    res = meter.get_results()
+    if res["LUFS_I"] is None:
+        raise RuntimeError(f"No measurable audio in: {path}")
+    return res, usage
+
+
+def get_loudness_from_file(path: str, backend: str = "ffmpeg", size: Optional[int] = None,
+                           info: Optional[dict] = None, timeout: Optional[float] = None,
+                           sample: Optional[Tuple[int, float]] = None) -> dict:
+    """Measure one file: loudness (ebur128), peak and RMS (volumedetect) in a single
+    ffmpeg pass, returned as a metrics row.
+
+    `backend` picks how the numbers are computed (see BACKENDS); both return the
+    same dict schema, including the TELEMETRY_FIELDS of the call. `size` is the
+    file size when the caller already stat'ed it, `info` its get_audio_stream_info
+    when already probed (otherwise the file is probed here). ffmpeg is killed and
+    AnalysisTimeout raised after `timeout` seconds. `sample` = (windows, seconds)
+    estimates a long file from that many windows instead (ffmpeg backend only).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if sample and backend != "ffmpeg":
+        raise ValueError("Sampling needs the ffmpeg backend")
+    t0 = time.perf_counter()
+
+    # Files without audio are rejected by the probe instead of a failing full run.
+    if info is None:
+        info = get_audio_stream_info(path)
+    if info is not None and not info["HasAudio"]:
+        raise RuntimeError(f"No audio stream in: {path}")
+
+    if backend == "numpy":
+        res, usage = _get_loudness_numpy(path, info, timeout)
+        return {
+            "FileName": os.path.basename(path),
+            "Path": path,
+            "Ext": os.path.splitext(path)[1].lower().lstrip("."),
+            "SizeBytes": size if size is not None else os.path.getsize(path),
+            **res,
+            **_get_media_fields(info),
+            **_get_telemetry(info, usage, time.perf_counter() - t0),
+            "Approximate": False,
+            "LUFS_I_Bound": None,
+            "Error": None,
+        }
+
+    windows = None
+    starts = None
+    if sample:
+        starts = get_sample_starts(info["Duration"] if info else None, *sample)
+        if starts:
+            windows = WindowLoudness(len(starts), sample[1])
+    cmd = new_analysis_command(path, starts, sample[1] if starts else None)
+
+    # Parse ffmpeg's log as it streams: ebur128 prints a line every 100 ms, so a
+    # multi-hour file would otherwise mean hundreds of MB of buffered text.
+    parser = LoudnessLogParser(sample[1] if starts else None)
+    last_message = ""  # last non-filter line: ffmpeg's error, if it fails
+    with subprocess.Popen(
         cmd,
+        stdin=subprocess.DEVNULL,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         encoding="utf-8",
         errors="replace",
-    )
-
-    output = result.stdout or ""
-
-    # --- ebur128 summary (printed at end of stream) ---
-    summary_m = re.search(r"Summary:(.*)", output, re.DOTALL)
-    summary = summary_m.group(1) if summary_m else ""
-
-    lufs_i_m = re.search(r"I:\s*([-\d.]+)\s*LUFS", summary)
-    lra_m    = re.search(r"LRA:\s*([\d.]+)\s*LU", summary)
-    tp_m     = re.search(r"Peak:\s*([-\d.]+)\s*dBFS", summary)
-
-    if not lufs_i_m:
-        raise RuntimeError(f"No ebur128 output for: {path}")
-
-    lufs_i    = float(lufs_i_m.group(1))
-    lra       = float(lra_m.group(1)) if lra_m else None
-    true_peak = float(tp_m.group(1))  if tp_m  else None
-
-    # --- Max Momentary and Short-Term from per-frame lines ---
-    # Per-frame format: "t: 0.40  M: -18.2  S: -21.0  I: -19.1 LUFS ..."
-    def _max_lufs(pattern: str):
-        raw = re.findall(pattern, output)
-        vals = []
-        for v in raw:
-            if v.lower() != "-inf":
-                try:
-                    vals.append(float(v))
-                except ValueError:
-                    pass
-        return max(vals) if vals else None
-
-    lufs_m = _max_lufs(r"\sM:\s+([-\d.]+|-inf)")
-    lufs_s = _max_lufs(r"\sS:\s+([-\d.]+|-inf)")
-
-    # --- volumedetect stats ---
-    peak_m = re.search(r"max_volume:\s*([-\d.]+)\s*dB", output)
-    rms_m  = re.search(r"mean_volume:\s*([-\d.]+)\s*dB", output)
-    peak_dbfs = float(peak_m.group(1)) if peak_m else None
-    rms_dbfs  = float(rms_m.group(1))  if rms_m  else None
+    ) as proc:
+        watchdog = _Watchdog(proc, timeout)
+        for line in proc.stdout:
+            parser.feed(line)
+            if windows is not None:
+                windows.feed(line)
+            if not line.startswith("[Parsed_") and line.strip():
+                last_message = line.strip()
+        watchdog.cancel()
+        usage = _wait_with_usage(proc)
+    wall = time.perf_counter() - t0
+
+    if watchdog.expired:
+        raise AnalysisTimeout(f"Analysis timed out after {timeout:g} s: {path}")
+    if parser.lufs_i is None:
+        detail = f" ({last_message})" if last_message else ""
+        raise RuntimeError(f"No ebur128 output for: {path}{detail}")
 
     return {
         "FileName": os.path.basename(path),
         "Path": path,
         "Ext": os.path.splitext(path)[1].lower().lstrip("."),
-        "SizeBytes": os.path.getsize(path),
-        "LUFS_I": lufs_i,
-        "LUFS_M": lufs_m,
-        "LUFS_S": lufs_s,
-        "TruePeak_dBTP": true_peak,
-        "LRA": lra,
-        "Peak_dBFS": peak_dbfs,
-        "RMS_dBFS": rms_dbfs,
+        "SizeBytes": size if size is not None else os.path.getsize(path),
+        "LUFS_I": parser.lufs_i,
+        "LUFS_M": parser.lufs_m,
+        "LUFS_S": parser.lufs_s,
+        "TruePeak_dBTP": parser.true_peak,
+        "LRA": parser.lra,
+        "Peak_dBFS": parser.peak_dbfs,
+        "RMS_dBFS": parser.rms_dbfs,
+        **_get_media_fields(info),
+        **_get_telemetry(info, usage, wall),
+        "Approximate": windows is not None,
+        "LUFS_I_Bound": windows.get_bound(info["Duration"]) if windows is not None else None,
+        "Curve_M": parser.curve_m.get_curve(),
+        "Curve_S": parser.curve_s.get_curve(),
         "Error": None,
     }
+
+
+def _get_media_fields(info: Optional[dict]) -> dict:
+    return {k: info[k] if info else None for k in MEDIA_FIELDS}
+
+
+def _get_telemetry(info: Optional[dict], usage: Optional[dict], wall: float) -> dict:
+    duration = info["Duration"] if info else None
+    return {
+        "Duration": duration,
+        "WallSeconds": wall,
+        "CpuUserSeconds": usage["CpuUserSeconds"] if usage else None,
+        "CpuSysSeconds": usage["CpuSysSeconds"] if usage else None,
+        "PeakRssMB": usage["PeakRssMB"] if usage else None,
+        "RealtimeFactor": duration / wall if duration and wall > 0 else None,
+    }
+
+
+def new_error_metrics(path: str, error) -> dict:
+    """Metrics row for a file that could not be measured."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return {
+        "FileName": os.path.basename(path),
+        "Path": path,
+        "Ext": os.path.splitext(path)[1].lower().lstrip("."),
+        "SizeBytes": size,
+        "LUFS_I": None,
+        "TruePeak_dBTP": None,
+        "LRA": None,
+        "Peak_dBFS": None,
+        "RMS_dBFS": None,
+        **dict.fromkeys(MEDIA_FIELDS),
+        **dict.fromkeys(TELEMETRY_FIELDS),
+        **dict.fromkeys(SAMPLE_FIELDS),
+        **dict.fromkeys(CURVE_FIELDS),
+        "Error": str(error),
+    }
@@ -0,0 +1,20 @@
+"""Output format names and checks the argument parser needs, kept apart from the
+report writers (lib.report, lib.export) so the CLI can validate options without
+importing them."""
+
+import importlib.util
+from typing import Optional
+
+CSV_LAYOUTS = ("combined", "split")
+
+# Columnar exports, written by lib.export; numpy and pyarrow are imported by the writers only.
+EXPORT_FORMATS = ("npz", "parquet")
+
+
+def get_export_dependency_error(fmt: str) -> Optional[str]:
+    """Why `fmt` cannot be written in this environment, or None if it can."""
+    if importlib.util.find_spec("numpy") is None:
+        return f"{fmt} export needs numpy (pip install -r requirements-optional.txt)"
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        return "parquet export needs pyarrow (pip install -r requirements-optional.txt)"
+    return None
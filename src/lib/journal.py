@@ -0,0 +1,112 @@
+"""Append-only journal of a run's finished files, so --resume can pick up after a crash.
+
+One JSON object per line: a header first ({"Journal": 1, "Backend", "Settings",
+"Folders", "Started"}), then {"Path", "Size", "MtimeNs", "Metrics"} per analysed
+file. Lines are flushed as they are written and fsync'ed at most every
+SYNC_INTERVAL seconds; a line cut short by a kill is ignored when reading back.
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from .ffmpeg_utils import COST_FIELDS
+
+JOURNAL_VERSION = 1
+JOURNAL_NAME = ".loudscan-journal.jsonl"
+
+# Seconds between fsyncs: a reboot loses at most this much work.
+SYNC_INTERVAL = 2.0
+
+
+def get_journal_path(output_dir: str) -> str:
+    return os.path.join(output_dir, JOURNAL_NAME)
+
+
+def new_journal_header(backend: str, settings: str, folders: List[str]) -> dict:
+    return {"Journal": JOURNAL_VERSION, "Backend": backend, "Settings": settings,
+            "Folders": list(folders), "Started": time.time()}
+
+
+def read_journal(path: str, header: dict) -> Dict[str, dict]:
+    """{path: metrics} of the journal's error-free entries whose file is unchanged.
+
+    Their COST_FIELDS are cleared: they cost nothing this run, like cache hits.
+    Raises ValueError when the journal was written by a run with other analysis
+    settings (backend or recipe), whose results would not be comparable, or over
+    other folders.
+    """
+    done: Dict[str, dict] = {}
+    with open(path, encoding="utf-8") as f:
+        lines = iter(f)
+        try:
+            first = json.loads(next(lines))
+        except (StopIteration, ValueError):
+            return done
+        if first.get("Journal") != JOURNAL_VERSION or first.get("Settings") != header["Settings"]:
+            raise ValueError(f"{path} was written by a run with other analysis settings "
+                             f"(backend {first.get('Backend')}); remove it or rerun without --resume")
+        if sorted(first.get("Folders") or []) != sorted(header["Folders"]):
+            raise ValueError(f"{path} was written by a run over other folders "
+                             f"({', '.join(first.get('Folders') or [])}); remove it or rerun without --resume")
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # cut short by the crash
+            metrics = entry.get("Metrics") or {}
+            if metrics.get("Error"):
+                continue  # failed files are tried again
+            try:
+                st = os.stat(entry["Path"])
+            except (OSError, KeyError):
+                continue
+            if st.st_size == entry.get("Size") and st.st_mtime_ns == entry.get("MtimeNs"):
+                metrics.update(dict.fromkeys(COST_FIELDS))  # measured by the earlier run
+                done[entry["Path"]] = metrics
+    return done
+
+
+def _test_ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class JobJournal:
+    """Writer side: `resume` appends to an existing journal, otherwise it is started over."""
+
+    def __init__(self, path: str, header: dict, resume: bool = False):
+        self.path = path
+        resume = resume and os.path.exists(path)
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self._write(header)
+        elif self._f.tell() and not _test_ends_with_newline(path):
+            self._f.write("\n")  # end the line a kill cut short, not glue the next one to it
+        self._last_sync = time.monotonic()
+
+    def _write(self, obj: dict):
+        self._f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def append(self, path: str, metrics: dict, st: Optional[os.stat_result] = None):
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+        self._write({"Path": path, "Size": st.st_size, "MtimeNs": st.st_mtime_ns, "Metrics": metrics})
+        if time.monotonic() - self._last_sync >= SYNC_INTERVAL:
+            os.fsync(self._f.fileno())
+            self._last_sync = time.monotonic()
+
+    def close(self, remove: bool = False):
+        """Close the journal; `remove` once the run's reports are written."""
+        if self._f.closed:
+            return
+        os.fsync(self._f.fileno())
+        self._f.close()
+        if remove:
+            os.remove(self.path)
@@ -0,0 +1,177 @@
+import heapq
+import math
+from bisect import bisect_right
+from itertools import combinations
+from typing import List, Optional, Tuple
+
+from .stats import DIFF_LEVELS, DIFF_LEVEL_BOUNDS
+
+# Upper bound on pair cells held at once by the NumPy engine (~4 MB per float64 array).
+PAIR_BLOCK_CELLS = 1 << 19
+
+DEFAULT_PAIR_SELECTION = "top:1000"
+
+
+def _import_numpy():
+    """NumPy, or None for the pure-Python fallback. Imported on first use only: it
+    would otherwise add tens of milliseconds to every start-up."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def parse_pair_selection(spec: str) -> Tuple[str, Optional[int]]:
+    """Parse a pair listing spec: "all", "none", "top:K" or "min-level:LEVEL".
+
+    Returns (kind, arg): arg is K for "top" and the level index for "min-level".
+    """
+    spec = (spec or "").strip().lower()
+    if spec in ("all", "none"):
+        return spec, None
+    kind, _, arg = spec.partition(":")
+    if kind == "top":
+        try:
+            k = int(arg)
+        except ValueError:
+            k = -1
+        if k < 0:
+            raise ValueError(f"Invalid pair count in '{spec}' (expected top:K with K >= 0)")
+        return "top", k
+    if kind == "min-level":
+        if arg not in DIFF_LEVELS:
+            raise ValueError(f"Unknown level in '{spec}' (expected one of: {', '.join(DIFF_LEVELS)})")
+        return "min-level", DIFF_LEVELS.index(arg)
+    raise ValueError(f"Invalid pair selection '{spec}' (expected all, none, top:K or min-level:LEVEL)")
+
+
+def get_pair_summary(
+    lufs: List[float], tp: List[float], selection: Tuple[str, Optional[int]] = ("none", None),
+) -> dict:
+    """Statistics over every pair (a, b), a before b, of the measured files.
+
+    ΔLUFS = b - a, ΔTP = b - a and ΔMax = max(|ΔLUFS|, |ΔTP|), as in the pairs table,
+    but computed without building the N² pair list: with NumPy, row blocks of the
+    pair matrix are evaluated at a fixed memory ceiling; without it, one pair at a time.
+
+    `selection` (see parse_pair_selection) picks which pairs are also returned for
+    listing: a bounded heap keeps the top K, a threshold keeps pairs at or above a level.
+
+    Returns {"Pairs", "LevelCounts", "SumDelta", "WorstPair", "Selected"}. WorstPair is
+    (index_a, index_b, dLUFS, dTP, dMaxAbs) of the first pair with the largest ΔMax
+    (in combinations order), or None; Selected is a list of such tuples, in
+    combinations order for "all" (as the original pairs table) and by decreasing
+    ΔMax otherwise.
+    """
+    n = len(lufs)
+    np = _import_numpy() if n > 1 else None
+    if np is not None:
+        return _get_pair_summary_numpy(np, lufs, tp, selection)
+
+    kind, arg = selection
+    min_delta = DIFF_LEVEL_BOUNDS[arg - 1] if kind == "min-level" and arg > 0 else None
+    counts = [0] * len(DIFF_LEVELS)
+    total = 0
+    sum_delta = 0.0
+    worst: Optional[tuple] = None
+    heap = []
+    selected = []
+    for i, j in combinations(range(n), 2):
+        d_lufs = lufs[j] - lufs[i]
+        d_tp = tp[j] - tp[i]
+        d_max = max(abs(d_lufs), abs(d_tp))
+        counts[bisect_right(DIFF_LEVEL_BOUNDS, d_max)] += 1
+        total += 1
+        sum_delta += d_max
+        if worst is None or d_max > worst[4]:
+            worst = (i, j, d_lufs, d_tp, d_max)
+
+        if kind == "top":
+            # Min-heap on (ΔMax, -i, -j): among equal ΔMax the latest pair is evicted first.
+            item = (d_max, -i, -j, d_lufs, d_tp)
+            if len(heap) < arg:
+                heapq.heappush(heap, item)
+            elif arg and item > heap[0]:
+                heapq.heapreplace(heap, item)
+        elif kind == "all" or (kind == "min-level" and (min_delta is None or d_max >= min_delta)):
+            selected.append((i, j, d_lufs, d_tp, d_max))
+
+    if kind == "top":
+        selected = [(-ni, -nj, dl, dt, dm) for dm, ni, nj, dl, dt in heap]
+    if kind != "all":
+        selected.sort(key=lambda p: (-p[4], p[0], p[1]))
+    return {
+        "Pairs": total,
+        "LevelCounts": dict(zip(DIFF_LEVELS, counts)),
+        "SumDelta": sum_delta,
+        "WorstPair": worst,
+        "Selected": selected,
+    }
+
+
+def _get_pair_summary_numpy(np, lufs: List[float], tp: List[float], selection: Tuple[str, Optional[int]]) -> dict:
+    a_lufs = np.asarray(lufs, dtype=np.float64)
+    a_tp = np.asarray(tp, dtype=np.float64)
+    bounds = np.asarray(DIFF_LEVEL_BOUNDS, dtype=np.float64)
+    n = len(a_lufs)
+    cols = np.arange(n)
+    rows_per_block = max(1, PAIR_BLOCK_CELLS // n)
+
+    kind, arg = selection
+    min_delta = DIFF_LEVEL_BOUNDS[arg - 1] if kind == "min-level" and arg > 0 else -1.0
+    counts = np.zeros(len(DIFF_LEVELS), dtype=np.int64)
+    block_sums = []
+    worst = None
+    # Selected pairs as parallel arrays (i, j, dLUFS, dTP, dMax).
+    sel = [np.zeros(0, dtype=np.int64)] * 2 + [np.zeros(0)] * 3
+
+    for i0 in range(0, n - 1, rows_per_block):
+        i1 = min(n - 1, i0 + rows_per_block)
+        rows = np.arange(i0, i1)
+        d_lufs = a_lufs[None, :] - a_lufs[i0:i1, None]
+        d_tp = a_tp[None, :] - a_tp[i0:i1, None]
+        d_max = np.maximum(np.abs(d_lufs), np.abs(d_tp))
+        upper = cols[None, :] > rows[:, None]
+
+        valid = d_max[upper]
+        counts += np.bincount(np.searchsorted(bounds, valid, side="right"), minlength=len(DIFF_LEVELS))
+        block_sums.append(float(valid.sum()))
+
+        # First maximum in row-major order = first in combinations order.
+        flat = np.where(upper, d_max, -1.0).argmax()
+        r, c = divmod(int(flat), n)
+        if worst is None or d_max[r, c] > worst[4]:
+            worst = (i0 + r, c, float(d_lufs[r, c]), float(d_tp[r, c]), float(d_max[r, c]))
+
+        if kind == "none" or (kind == "top" and arg == 0):
+            continue
+        keep = upper & (d_max >= min_delta) if kind != "top" else upper
+        if kind == "top":
+            # Only this block's own top K can make it into the overall top K.
+            cand = np.flatnonzero(keep)
+            if len(cand) > arg:
+                vals = d_max.ravel()[cand]
+                kth = np.partition(vals, len(vals) - arg)[len(vals) - arg]
+                cand = cand[vals >= kth]  # ties at the cut are settled by the lexsort below
+            r_idx, c_idx = np.divmod(cand, n)
+        else:
+            r_idx, c_idx = np.nonzero(keep)
+        block = (r_idx + i0, c_idx, d_lufs[r_idx, c_idx], d_tp[r_idx, c_idx], d_max[r_idx, c_idx])
+        sel = [np.concatenate([a, b]) for a, b in zip(sel, block)]
+        if kind == "top" and len(sel[0]) > arg:
+            order = np.lexsort((sel[1], sel[0], -sel[4]))[:arg]
+            sel = [a[order] for a in sel]
+
+    order = np.lexsort((sel[1], sel[0]) if kind == "all" else (sel[1], sel[0], -sel[4]))
+    selected = [
+        (int(i), int(j), float(dl), float(dt), float(dm))
+        for i, j, dl, dt, dm in zip(*(a[order] for a in sel))
+    ]
+    return {
+        "Pairs": n * (n - 1) // 2,
+        "LevelCounts": dict(zip(DIFF_LEVELS, (int(c) for c in counts))),
+        "SumDelta": math.fsum(block_sums),
+        "WorstPair": worst,
+        "Selected": selected,
+    }
@@ -0,0 +1,87 @@
+"""--profile: cProfile and tracemalloc around each pipeline stage.
+
+Each stage gets its own cProfile (written as <report>_profile_<stage>.pstats, open
+with `python -m pstats` or snakeviz) and its tracemalloc peak; a summary table of
+wall time and peak memory per stage goes to <report>_profile.txt. Only the main
+process is profiled: the measurement workers show up as time spent waiting.
+
+On Python 3.8 (no tracemalloc.reset_peak), a stage that stays below the peak of an
+earlier one reports the memory it still holds at its end instead of its own peak.
+"""
+
+import contextlib
+import os
+import time
+from typing import List, Optional
+
+
+class StageProfiler:
+    """Profiles named stages one after the other (stages must not nest)."""
+
+    def __init__(self):
+        self.stages = []  # [{"Stage", "Seconds", "PeakMB", "Profile"}] in run order
+        self._profiles = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        # Imported here: get_stage_context is used on every run, profiled or not.
+        import cProfile
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+        base_mem, base_peak = tracemalloc.get_traced_memory()
+        prof = cProfile.Profile()
+        t0 = time.perf_counter()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            seconds = time.perf_counter() - t0
+            current, peak = tracemalloc.get_traced_memory()
+            if peak <= base_peak:
+                # Without reset_peak, a peak reached before this stage hides this
+                # stage's own: fall back to what it still holds at its end.
+                peak = max(current, base_mem)
+            self._profiles[name] = prof
+            self.stages.append({
+                "Stage": name,
+                "Seconds": seconds,
+                "PeakMB": max(0, peak - base_mem) / (1024 * 1024),
+                "Profile": None,
+            })
+
+    def get_table(self) -> str:
+        lines = [f"{'stage':<14} {'wall s':>10} {'peak MB':>10}  profile"]
+        for st in self.stages:
+            lines.append(f"{st['Stage']:<14} {st['Seconds']:>10.3f} {st['PeakMB']:>10.1f}  "
+                         f"{os.path.basename(st['Profile']) if st['Profile'] else '-'}")
+        return "\n".join(lines)
+
+    def write(self, base_path: str) -> List[str]:
+        """Write one .pstats per stage and the summary table; returns the paths."""
+        paths = []
+        for st in self.stages:
+            st["Profile"] = f"{base_path}_profile_{st['Stage']}.pstats"
+            self._profiles[st["Stage"]].dump_stats(st["Profile"])
+            paths.append(st["Profile"])
+        table_path = base_path + "_profile.txt"
+        with open(table_path, "w", encoding="utf-8") as f:
+            f.write("Peak MB = peak Python allocations during the stage (tracemalloc), above its start.\n\n")
+            f.write(self.get_table() + "\n")
+        paths.append(table_path)
+        return paths
+
+    def close(self):
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def get_stage_context(profiler: Optional[StageProfiler], name: str):
+    """profiler.stage(name), or a no-op context without a profiler."""
+    return profiler.stage(name) if profiler is not None else contextlib.nullcontext()
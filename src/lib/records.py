@@ -0,0 +1,138 @@
+"""Per-file report rows as a struct-of-arrays table instead of one dict per file.
+
+Measured values live in `array("d")` columns (NaN for missing), sizes and duplicate
+groups in `array("q")`, text (and the base64 loudness curves) in lists that share
+the metrics dicts' strings. The deltas and Z-scores against the session statistics
+are not stored: they are computed when a row or column is read.
+"""
+
+import math
+from array import array
+from typing import Iterator, List, Optional
+
+from .ffmpeg_utils import CURVE_FIELDS, TELEMETRY_FIELDS
+
+TEXT_COLUMNS = ("FileName", "Ext", "Path", "DuplicateOf", "Error", "Codec") + CURVE_FIELDS
+VALUE_COLUMNS = (("Peak_dBFS", "TruePeak_dBTP", "RMS_dBFS", "LUFS_I", "LUFS_M", "LUFS_S", "LRA")
+                 + TELEMETRY_FIELDS + ("LUFS_I_Bound",))
+# Integer columns; 0 reads back as None (missing) for all but _ZERO_KEPT.
+INT_COLUMNS = ("SizeBytes", "DuplicateGroup", "Channels", "SampleRate", "Approximate")
+_ZERO_KEPT = {"SizeBytes", "Approximate"}
+
+# Derived column -> (measured column, statistic): "<prefix>_DeltaMean" = value - mean,
+# "<prefix>_DeltaMedian" = value - median, "<prefix>_Z" = (value - mean) / std.
+DERIVED_COLUMNS = {}
+for _prefix, _source in (("LUFS", "LUFS_I"), ("LUFS_M", "LUFS_M"), ("LUFS_S", "LUFS_S"),
+                         ("TP", "TruePeak_dBTP"), ("LRA", "LRA")):
+    DERIVED_COLUMNS[f"{_prefix}_DeltaMean"] = (_source, "mean")
+    DERIVED_COLUMNS[f"{_prefix}_DeltaMedian"] = (_source, "median")
+    DERIVED_COLUMNS[f"{_prefix}_Z"] = (_source, "z")
+
+# Measured values kept for files that could not be measured (what the attempt cost).
+_KEPT_ON_ERROR = set(TELEMETRY_FIELDS)
+
+_NAN = math.nan
+
+
+class FileTable:
+    """Per-file rows of a report, in insertion order.
+
+    `stats` ({metric: {"mean", "median", "std"}}, see lib.stats.MetricStats) is
+    what the derived columns are computed against; set it once every file is in.
+    """
+
+    def __init__(self, stats: Optional[dict] = None):
+        self.stats = stats or {}
+        self._text = {k: [] for k in TEXT_COLUMNS}
+        self._values = {k: array("d") for k in VALUE_COLUMNS}
+        self._ints = {k: array("q") for k in INT_COLUMNS}
+
+    def append(self, m: dict, ok: bool):
+        """Add a metrics dict; a not-`ok` row keeps only its identity, error and telemetry."""
+        for k, col in self._text.items():
+            col.append(m.get(k))
+        if ok:
+            self._text["Error"][-1] = None
+        for k, col in self._values.items():
+            v = m.get(k) if ok or k in _KEPT_ON_ERROR else None
+            col.append(_NAN if v is None else float(v))
+        for k, col in self._ints.items():
+            col.append(m.get(k) or 0)
+
+    def __len__(self) -> int:
+        return len(self._ints["SizeBytes"])
+
+    def __iter__(self) -> Iterator["FileRecord"]:
+        return (FileRecord(self, i) for i in range(len(self)))
+
+    def __getitem__(self, i: int) -> "FileRecord":
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return FileRecord(self, i % len(self))
+
+    def get_value(self, key: str, i: int):
+        """Value of column `key` for row `i`, None when missing."""
+        if key in self._values:
+            v = self._values[key][i]
+            return None if v != v else v
+        if key in DERIVED_COLUMNS:
+            return self._get_derived(key, i)
+        if key in self._text:
+            return self._text[key][i]
+        if key in _ZERO_KEPT:
+            return self._ints[key][i]
+        if key in self._ints:
+            return self._ints[key][i] or None
+        if key == "Section":
+            return "File"
+        raise KeyError(key)
+
+    def _get_derived(self, key: str, i: int):
+        source, stat = DERIVED_COLUMNS[key]
+        v = self._values[source][i]
+        st = self.stats.get(source)
+        if v != v or not st or st["mean"] is None:
+            return None
+        if stat == "mean":
+            return v - st["mean"]
+        if stat == "median":
+            return v - st["median"]
+        std = st["std"]
+        return (v - st["mean"]) / std if std and std > 1e-9 else 0.0
+
+    def get_column(self, key: str) -> list:
+        """Column `key` as a list, None for missing values."""
+        if key in self._text:
+            return list(self._text[key])
+        return [self.get_value(key, i) for i in range(len(self))]
+
+    def get_float_array(self, key: str) -> array:
+        """Any non-text column as array("d"), NaN for missing values (no copy for
+        measured columns: do not modify it)."""
+        if key in self._values:
+            return self._values[key]
+        values = (self.get_value(key, i) for i in range(len(self)))
+        return array("d", (_NAN if v is None else v for v in values))
+
+
+class FileRecord:
+    """Read-only view of one FileTable row with the dict lookups the writers use."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: FileTable, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str):
+        return self._table.get_value(key, self._index)
+
+    def get(self, key: str, default=None):
+        try:
+            v = self._table.get_value(key, self._index)
+        except KeyError:
+            return default
+        return default if v is None else v
+
+    def keys(self) -> List[str]:
+        return ["Section", *TEXT_COLUMNS, *INT_COLUMNS, *VALUE_COLUMNS, *DERIVED_COLUMNS]
@@ -1,171 +1,122 @@
+import base64
 import csv
+import itertools
 import json
 import os
 import sys
 from datetime import datetime
-from itertools import combinations
-from typing import List, Optional
+from typing import Iterable, List, Optional
+
+from .curves import CURVE_POINTS, get_curve_block
+from .ffmpeg_utils import MEDIA_FIELDS, SAMPLE_FIELDS, TELEMETRY_FIELDS
+from .formats import EXPORT_FORMATS
+from .pairs import DEFAULT_PAIR_SELECTION, get_pair_summary, parse_pair_selection
+from .profiling import StageProfiler, get_stage_context
+from .records import FileTable
+from .stats import (
+    DIFF_LEVELS, STATS_METRICS, MetricStats, get_diff_category, html_escape, format_num, test_measured,
+)
+
+# Per-file columns, shared by the combined CSV and the files CSV.
+_FILE_VALUE_FIELDS = [
+    "Peak_dBFS", "TruePeak_dBTP", "RMS_dBFS", "LUFS_I", "LUFS_M", "LUFS_S", "LRA",
+    "LUFS_DeltaMean", "LUFS_DeltaMedian", "LUFS_Z",
+    "LUFS_M_DeltaMean", "LUFS_M_DeltaMedian", "LUFS_M_Z",
+    "LUFS_S_DeltaMean", "LUFS_S_DeltaMedian", "LUFS_S_Z",
+    "TP_DeltaMean", "TP_DeltaMedian", "TP_Z",
+    "LRA_DeltaMean", "LRA_DeltaMedian", "LRA_Z",
+] + list(MEDIA_FIELDS) + list(TELEMETRY_FIELDS) + list(SAMPLE_FIELDS)
+
+# Slowest files listed in the report's performance section.
+SLOWEST_FILES_SHOWN = 10
+
+# Combined CSV: file rows and pair rows in one schema, told apart by "Section".
+CSV_FIELDS = (
+    ["Section", "FileName", "Ext", "SizeBytes"] + _FILE_VALUE_FIELDS
+    + ["A_File", "B_File", "dLUFS", "dTP", "dMaxAbs", "Similarity",
+       "DuplicateGroup", "DuplicateOf", "Error", "Path"]
+)
+
+FILE_CSV_FIELDS = (
+    ["FileName", "Ext", "SizeBytes"] + _FILE_VALUE_FIELDS
+    + ["DuplicateGroup", "DuplicateOf", "Error", "Path"]
+)
+
+PAIR_CSV_FIELDS = [
+    "A_File", "B_File", "A_Ext", "B_Ext",
+    "A_LUFS_I", "B_LUFS_I", "dLUFS", "A_TP_dBTP", "B_TP_dBTP", "dTP", "dMaxAbs", "Similarity",
+]
+
+
+def get_throughput_summary(metrics: list, elapsed: Optional[float] = None) -> dict:
+    """Cost of the files measured in this run (cache hits and duplicates excluded).
+
+    `elapsed` is the wall time of the whole measurement stage; without it, the
+    per-file wall times are summed (i.e. as if measured one at a time). Failed
+    files count in the time and the slowest files, not in the bytes and audio.
+    """
+    measured = [m for m in metrics if m.get("WallSeconds") is not None]
+    wall_sum = sum(m["WallSeconds"] for m in measured)
+    seconds = elapsed if elapsed is not None else wall_sum
+    size = sum(m.get("SizeBytes") or 0 for m in measured if not m.get("Error"))
+    audio = sum(m.get("Duration") or 0.0 for m in measured if not m.get("Error"))
+    cpu = [m["CpuUserSeconds"] + m["CpuSysSeconds"] for m in measured if m.get("CpuUserSeconds") is not None]
+    slowest = sorted(measured, key=lambda m: m["WallSeconds"], reverse=True)[:SLOWEST_FILES_SHOWN]
+    return {
+        "MeasuredFiles": len(measured),
+        "MeasuredBytes": size,
+        "AudioSeconds": audio,
+        "Elapsed": seconds,
+        "CpuSeconds": sum(cpu) if cpu else None,
+        "MBps": size / 1e6 / seconds if seconds > 0 else None,
+        "AudioHoursPerMinute": audio / 3600.0 / (seconds / 60.0) if seconds > 0 else None,
+        "SlowestFiles": slowest,
+    }
 
-from .stats import get_median, get_stddev, get_diff_category, html_escape, format_num
 
+def new_sound_report_data(metrics: list, duplicate_groups: Optional[list] = None,
+                          pair_selection: str = DEFAULT_PAIR_SELECTION, elapsed: Optional[float] = None,
+                          metric_stats: Optional[MetricStats] = None) -> dict:
+    """`elapsed`: wall time of the measurement stage, for the throughput figures.
 
-def new_sound_report_data(metrics: list) -> dict:
+    `metric_stats`: a MetricStats(STATS_METRICS) already fed with every measured row
+    of `metrics` (test_measured), e.g. as the results came in; built here otherwise.
+    """
     if metrics is None:
         metrics = []
-
-    ok = [m for m in metrics if m.get("LUFS_I") is not None
-          and m.get("TruePeak_dBTP") is not None
-          and m.get("LRA") is not None]
-    err = [m for m in metrics if m.get("LUFS_I") is None
-           or m.get("TruePeak_dBTP") is None
-           or m.get("LRA") is None]
+    if duplicate_groups is None:
+        duplicate_groups = []
+
+    # One pass over the files: OK/error split, running statistics and the per-file
+    # table, without per-metric value lists or one dict per file.
+    ok = []
+    err = []
+    acc = metric_stats if metric_stats is not None else MetricStats(STATS_METRICS)
+    files_table = FileTable()
+    for m in metrics:
+        is_ok = test_measured(m)
+        (ok if is_ok else err).append(m)
+        if is_ok and metric_stats is None:
+            acc.push(m)
+        files_table.append(m, is_ok)
 
     if not ok:
         raise RuntimeError("No usable loudnorm measurements (all failed).")
 
-    lufs_vals  = [float(m["LUFS_I"]) for m in ok]
-    tp_vals    = [float(m["TruePeak_dBTP"]) for m in ok]
-    lra_vals   = [float(m["LRA"]) for m in ok]
-    peak_vals  = [float(m["Peak_dBFS"]) for m in ok if m.get("Peak_dBFS") is not None]
-    rms_vals   = [float(m["RMS_dBFS"])  for m in ok if m.get("RMS_dBFS")  is not None]
-    lufs_m_vals = [float(m["LUFS_M"]) for m in ok if m.get("LUFS_M") is not None]
-    lufs_s_vals = [float(m["LUFS_S"]) for m in ok if m.get("LUFS_S") is not None]
-
-    def _mean(vals):
-        return sum(vals) / len(vals)
-
-    def _safe_stats(vals):
-        if not vals:
-            return {"mean": None, "median": None, "std": None}
-        return {"mean": _mean(vals), "median": get_median(vals), "std": get_stddev(vals)}
-
-    stats = {
-        "LUFS_I": {
-            "mean": _mean(lufs_vals),
-            "median": get_median(lufs_vals),
-            "std": get_stddev(lufs_vals),
-        },
-        "LUFS_M": _safe_stats(lufs_m_vals),
-        "LUFS_S": _safe_stats(lufs_s_vals),
-        "TruePeak_dBTP": {
-            "mean": _mean(tp_vals),
-            "median": get_median(tp_vals),
-            "std": get_stddev(tp_vals),
-        },
-        "LRA": {
-            "mean": _mean(lra_vals),
-            "median": get_median(lra_vals),
-            "std": get_stddev(lra_vals),
-        },
-        "Peak_dBFS": _safe_stats(peak_vals),
-        "RMS_dBFS":  _safe_stats(rms_vals),
-    }
+    stats = acc.get_stats()
+    files_table.stats = stats  # deltas and Z-scores are computed against these on read
 
-    files_enriched = []
-    for m in metrics:
-        is_ok = (m.get("LUFS_I") is not None
-                 and m.get("TruePeak_dBTP") is not None
-                 and m.get("LRA") is not None)
-        if not is_ok:
-            files_enriched.append({
-                "Section": "File",
-                "FileName": m["FileName"],
-                "Ext": m["Ext"],
-                "SizeBytes": m["SizeBytes"],
-                "Path": m["Path"],
-                "LUFS_I": None,
-                "LUFS_M": None,
-                "LUFS_S": None,
-                "TruePeak_dBTP": None,
-                "LRA": None,
-                "Peak_dBFS": None,
-                "RMS_dBFS": None,
-                "LUFS_DeltaMean": None,
-                "LUFS_DeltaMedian": None,
-                "LUFS_Z": None,
-                "LUFS_M_DeltaMean": None,
-                "LUFS_M_DeltaMedian": None,
-                "LUFS_M_Z": None,
-                "LUFS_S_DeltaMean": None,
-                "LUFS_S_DeltaMedian": None,
-                "LUFS_S_Z": None,
-                "TP_DeltaMean": None,
-                "TP_DeltaMedian": None,
-                "TP_Z": None,
-                "LRA_DeltaMean": None,
-                "LRA_DeltaMedian": None,
-                "LRA_Z": None,
-                "Error": m.get("Error"),
-            })
-            continue
-
-        lufs = float(m["LUFS_I"])
-        tp   = float(m["TruePeak_dBTP"])
-        lra  = float(m["LRA"])
-        lufs_mv = m.get("LUFS_M")
-        lufs_sv = m.get("LUFS_S")
-        lufs_m_val = float(lufs_mv) if lufs_mv is not None else None
-        lufs_s_val = float(lufs_sv) if lufs_sv is not None else None
-
-        lufs_std = stats["LUFS_I"]["std"]
-        tp_std   = stats["TruePeak_dBTP"]["std"]
-        lra_std  = stats["LRA"]["std"]
-
-        lufs_z = (lufs - stats["LUFS_I"]["mean"]) / lufs_std if lufs_std and lufs_std > 1e-9 else 0.0
-        tp_z   = (tp   - stats["TruePeak_dBTP"]["mean"]) / tp_std if tp_std and tp_std > 1e-9 else 0.0
-        lra_z  = (lra  - stats["LRA"]["mean"]) / lra_std if lra_std and lra_std > 1e-9 else 0.0
-
-        def _delta(val, key_mean, key_median):
-            if val is None or stats[key_mean]["mean"] is None:
-                return None, None, None
-            mean_v   = stats[key_mean]["mean"]
-            median_v = stats[key_mean]["median"]
-            std_v    = stats[key_mean]["std"]
-            z = (val - mean_v) / std_v if std_v and std_v > 1e-9 else 0.0
-            return val - mean_v, val - median_v, z
-
-        lufs_m_dm, lufs_m_dmed, lufs_m_z = _delta(lufs_m_val, "LUFS_M", "LUFS_M")
-        lufs_s_dm, lufs_s_dmed, lufs_s_z = _delta(lufs_s_val, "LUFS_S", "LUFS_S")
-
-        files_enriched.append({
-            "Section": "File",
-            "FileName": m["FileName"],
-            "Ext": m["Ext"],
-            "SizeBytes": m["SizeBytes"],
-            "Path": m["Path"],
-            "LUFS_I": lufs,
-            "LUFS_M": lufs_m_val,
-            "LUFS_S": lufs_s_val,
-            "TruePeak_dBTP": tp,
-            "LRA": lra,
-            "Peak_dBFS": m.get("Peak_dBFS"),
-            "RMS_dBFS": m.get("RMS_dBFS"),
-            "LUFS_DeltaMean": lufs - stats["LUFS_I"]["mean"],
-            "LUFS_DeltaMedian": lufs - stats["LUFS_I"]["median"],
-            "LUFS_Z": lufs_z,
-            "LUFS_M_DeltaMean": lufs_m_dm,
-            "LUFS_M_DeltaMedian": lufs_m_dmed,
-            "LUFS_M_Z": lufs_m_z,
-            "LUFS_S_DeltaMean": lufs_s_dm,
-            "LUFS_S_DeltaMedian": lufs_s_dmed,
-            "LUFS_S_Z": lufs_s_z,
-            "TP_DeltaMean": tp - stats["TruePeak_dBTP"]["mean"],
-            "TP_DeltaMedian": tp - stats["TruePeak_dBTP"]["median"],
-            "TP_Z": tp_z,
-            "LRA_DeltaMean": lra - stats["LRA"]["mean"],
-            "LRA_DeltaMedian": lra - stats["LRA"]["median"],
-            "LRA_Z": lra_z,
-            "Error": None,
-        })
-
-    # Pairwise comparisons (OK files only)
-    pairs = []
-    for a, b in combinations(ok, 2):
-        d_lufs = float(b["LUFS_I"]) - float(a["LUFS_I"])
-        d_tp = float(b["TruePeak_dBTP"]) - float(a["TruePeak_dBTP"])
-        d_max = max(abs(d_lufs), abs(d_tp))
-        cat = get_diff_category(d_lufs, d_tp)
-        pairs.append({
+    # Pairwise comparisons (OK files only). Statistics cover every pair; only the
+    # pairs picked by `pair_selection` are kept for the CSV/HTML listings.
+    pair_summary = get_pair_summary(
+        [float(m["LUFS_I"]) for m in ok],
+        [float(m["TruePeak_dBTP"]) for m in ok],
+        parse_pair_selection(pair_selection),
+    )
+
+    def _pair_row(i, j, d_lufs, d_tp, d_max):
+        a, b = ok[i], ok[j]
+        return {
             "Section": "Pair",
             "A_File": a["FileName"],
             "B_File": b["FileName"],
@@ -178,31 +129,27 @@ def new_sound_report_data(metrics: list) -> dict:
             "B_TP_dBTP": float(b["TruePeak_dBTP"]),
             "dTP": d_tp,
             "dMaxAbs": d_max,
-            "Similarity": cat,
-        })
+            "Similarity": get_diff_category(d_lufs, d_tp),
+        }
 
-    # Global heuristic
-    levels = ["identical", "negligible", "slight", "moderate", "high", "extreme"]
+    pairs = [_pair_row(*p) for p in pair_summary["Selected"]]
 
-    def level_index(s):
-        try:
-            return levels.index(s)
-        except ValueError:
-            return 999
+    n_pairs = pair_summary["Pairs"]
+    level_counts = pair_summary["LevelCounts"]
 
     ratio_slight_or_less = 1.0
     worst_pair = None
     mean_delta = 0.0
 
-    if pairs:
-        slight_idx = level_index("slight")
-        count_slight = sum(1 for p in pairs if level_index(p["Similarity"]) <= slight_idx)
-        ratio_slight_or_less = count_slight / len(pairs)
-        worst_pair = max(pairs, key=lambda p: p["dMaxAbs"])
-        mean_delta = sum(p["dMaxAbs"] for p in pairs) / len(pairs)
+    if n_pairs:
+        slight_idx = DIFF_LEVELS.index("slight")
+        count_slight = sum(level_counts[l] for l in DIFF_LEVELS[:slight_idx + 1])
+        ratio_slight_or_less = count_slight / n_pairs
+        mean_delta = pair_summary["SumDelta"] / n_pairs
+        worst_pair = _pair_row(*pair_summary["WorstPair"])
 
     global_same = (
-        not pairs
+        not n_pairs
         or (
             worst_pair is not None
             and worst_pair["dMaxAbs"] <= 1.5
@@ -215,150 +162,166 @@ def new_sound_report_data(metrics: list) -> dict:
         "FilesOk": ok,
         "FilesErr": err,
         "Stats": stats,
-        "FilesEnriched": files_enriched,
+        "FilesEnriched": files_table,
         "Pairs": pairs,
+        "DuplicateGroups": duplicate_groups,
         "Summary": {
             "FilesTotal": len(metrics),
             "FilesOk": len(ok),
             "FilesErr": len(err),
-            "Pairs": len(pairs),
+            "Pairs": n_pairs,
+            "PairsListed": len(pairs),
+            "PairSelection": pair_selection,
+            "LevelCounts": level_counts,
             "RatioSlightOrLess": ratio_slight_or_less,
             "MeanDelta": mean_delta,
             "MaxDelta": worst_pair["dMaxAbs"] if worst_pair else None,
             "WorstPair": worst_pair,
             "GlobalSame": global_same,
+            "DuplicateGroups": len(duplicate_groups),
+            "DuplicateFiles": sum(len(g["Paths"]) - 1 for g in duplicate_groups),
+            "FilesApproximate": sum(1 for m in ok if m.get("Approximate")),
+            "Throughput": get_throughput_summary(metrics, elapsed),
         },
     }
 
 
-def write_sound_report_outputs(folder: str, report: dict) -> dict:
-    # Resolve reference_models.json with priority:
-    #  1. Next to the executable (user-editable override)
-    #  2. Bundled inside the PyInstaller archive (_MEIPASS)
-    #  3. res/ subfolder at project root when running from source
-    def _find_json():
-        if getattr(sys, "frozen", False):
-            exe_dir = os.path.dirname(sys.executable)
-            candidate = os.path.join(exe_dir, "reference_models.json")
-            if os.path.exists(candidate):
-                return candidate
-            bundled = os.path.join(sys._MEIPASS, "reference_models.json")
-            return bundled if os.path.exists(bundled) else None
+def write_csv_rows(path: str, fieldnames: List[str], rows: Iterable[dict]):
+    """Write one CSV line per row dict, one at a time; keys missing from a row are left empty."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows([r.get(k) for k in fieldnames] for r in rows)
+    # Readers (e.g. a dashboard polling a --watch report) never see a partial file.
+    os.replace(tmp_path, path)
+
+
+def get_reference_models() -> dict:
+    """Contents of reference_models.json, looked up with priority:
+     1. next to the executable (user-editable override)
+     2. bundled inside the PyInstaller archive (_MEIPASS)
+     3. res/ subfolder at project root when running from source
+    """
+    if getattr(sys, "frozen", False):
+        candidates = [os.path.join(os.path.dirname(sys.executable), "reference_models.json"),
+                      os.path.join(sys._MEIPASS, "reference_models.json")]
+    else:
         root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        candidate = os.path.join(root, "res", "reference_models.json")
-        return candidate if os.path.exists(candidate) else None
-
-    _json_path = _find_json()
-    if _json_path:
-        with open(_json_path, encoding="utf-8") as _f:
-            reference_models = json.load(_f)
+        candidates = [os.path.join(root, "res", "reference_models.json")]
+    for path in candidates:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    return {"version": 1, "presets": []}
+
+
+def write_sound_report_outputs(folder: str, report: dict, csv_layout: str = "combined",
+                               basename: Optional[str] = None, formats: Iterable[str] = ("html", "csv"),
+                               sources: Optional[List[str]] = None,
+                               profiler: Optional[StageProfiler] = None) -> dict:
+    """Write the report in each of `formats` ("html", "csv", "npz", "parquet") into `folder`.
+
+    csv_layout "combined" writes file and pair rows to one wide CSV (a "Section"
+    column tells them apart); "split" writes a files CSV and a pairs CSV, each
+    with its own columns. Files are named `basename` + extension, by default
+    "sound_report_<timestamp>"; existing files are replaced atomically.
+    `sources` are the analysed folders shown in the HTML header (default: `folder`).
+    With a `profiler`, each output is written as a profiled stage.
+
+    Returns {"BasePath", "HtmlPath" (or None), "CsvPaths", "ExportPaths"}.
+    """
+    formats = list(formats)
+    reference_models = get_reference_models()
+
+    if basename is None:
+        basename = f"sound_report_{datetime.now().strftime('%d-%m-%y_%H-%M')}"
+    base_path = os.path.join(folder, basename)
+    html_path = base_path + ".html"
+
+    # CSV: rows are streamed from the report data, never collected in a list
+    csv_paths = []
+    with get_stage_context(profiler, "csv_write"):
+        if "csv" in formats and csv_layout == "split":
+            files_csv_path = base_path + "_files.csv"
+            pairs_csv_path = base_path + "_pairs.csv"
+            write_csv_rows(files_csv_path, FILE_CSV_FIELDS, report["FilesEnriched"])
+            write_csv_rows(pairs_csv_path, PAIR_CSV_FIELDS, report["Pairs"])
+            csv_paths = [files_csv_path, pairs_csv_path]
+        elif "csv" in formats:
+            csv_path = base_path + ".csv"
+            rows = itertools.chain(report["FilesEnriched"], report["Pairs"])
+            write_csv_rows(csv_path, CSV_FIELDS, rows)
+            csv_paths = [csv_path]
+
+    if "html" in formats:
+        source_txt = ", ".join(sources) if sources else folder
+        with get_stage_context(profiler, "html_render"):
+            html_content = new_sound_report_html(source_txt, report, html_path, reference_models)
+            with open(html_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(html_content)
+            os.replace(html_path + ".tmp", html_path)
     else:
-        reference_models = {"version": 1, "presets": []}
-
-    ts = datetime.now().strftime("%d-%m-%y_%H-%M")
-    html_path = os.path.join(folder, f"sound_report_{ts}.html")
-    csv_path = os.path.join(folder, f"sound_report_{ts}.csv")
-
-    # CSV
-    fieldnames = [
-        "Section", "FileName", "Ext", "SizeBytes",
-        "Peak_dBFS", "TruePeak_dBTP", "RMS_dBFS", "LUFS_I", "LUFS_M", "LUFS_S", "LRA",
-        "LUFS_DeltaMean", "LUFS_DeltaMedian", "LUFS_Z",
-        "LUFS_M_DeltaMean", "LUFS_M_DeltaMedian", "LUFS_M_Z",
-        "LUFS_S_DeltaMean", "LUFS_S_DeltaMedian", "LUFS_S_Z",
-        "TP_DeltaMean", "TP_DeltaMedian", "TP_Z",
-        "LRA_DeltaMean", "LRA_DeltaMedian", "LRA_Z",
-        "A_File", "B_File", "dLUFS", "dTP", "dMaxAbs", "Similarity",
-        "Error", "Path",
-    ]
-
-    csv_rows = []
-    for r in report["FilesEnriched"]:
-        csv_rows.append({
-            "Section": "File",
-            "FileName": r["FileName"],
-            "Ext": r["Ext"],
-            "SizeBytes": r["SizeBytes"],
-            "LUFS_I": r["LUFS_I"],
-            "LUFS_M": r.get("LUFS_M"),
-            "LUFS_S": r.get("LUFS_S"),
-            "TruePeak_dBTP": r["TruePeak_dBTP"],
-            "LRA": r["LRA"],
-            "Peak_dBFS": r.get("Peak_dBFS"),
-            "RMS_dBFS": r.get("RMS_dBFS"),
-            "LUFS_DeltaMean": r["LUFS_DeltaMean"],
-            "LUFS_DeltaMedian": r["LUFS_DeltaMedian"],
-            "LUFS_Z": r["LUFS_Z"],
-            "LUFS_M_DeltaMean": r.get("LUFS_M_DeltaMean"),
-            "LUFS_M_DeltaMedian": r.get("LUFS_M_DeltaMedian"),
-            "LUFS_M_Z": r.get("LUFS_M_Z"),
-            "LUFS_S_DeltaMean": r.get("LUFS_S_DeltaMean"),
-            "LUFS_S_DeltaMedian": r.get("LUFS_S_DeltaMedian"),
-            "LUFS_S_Z": r.get("LUFS_S_Z"),
-            "TP_DeltaMean": r["TP_DeltaMean"],
-            "TP_DeltaMedian": r["TP_DeltaMedian"],
-            "TP_Z": r["TP_Z"],
-            "LRA_DeltaMean": r["LRA_DeltaMean"],
-            "LRA_DeltaMedian": r["LRA_DeltaMedian"],
-            "LRA_Z": r["LRA_Z"],
-            "A_File": None,
-            "B_File": None,
-            "dLUFS": None,
-            "dTP": None,
-            "dMaxAbs": None,
-            "Similarity": None,
-            "Error": r["Error"],
-            "Path": r.get("Path", ""),
-        })
-
-    for p in report["Pairs"]:
-        csv_rows.append({
-            "Section": "Pair",
-            "FileName": None,
-            "Ext": None,
-            "SizeBytes": None,
-            "LUFS_I": None,
-            "LUFS_M": None,
-            "LUFS_S": None,
-            "TruePeak_dBTP": None,
-            "LRA": None,
-            "Peak_dBFS": None,
-            "RMS_dBFS": None,
-            "LUFS_DeltaMean": None,
-            "LUFS_DeltaMedian": None,
-            "LUFS_Z": None,
-            "LUFS_M_DeltaMean": None,
-            "LUFS_M_DeltaMedian": None,
-            "LUFS_M_Z": None,
-            "LUFS_S_DeltaMean": None,
-            "LUFS_S_DeltaMedian": None,
-            "LUFS_S_Z": None,
-            "TP_DeltaMean": None,
-            "TP_DeltaMedian": None,
-            "TP_Z": None,
-            "LRA_DeltaMean": None,
-            "LRA_DeltaMedian": None,
-            "LRA_Z": None,
-            "A_File": p["A_File"],
-            "B_File": p["B_File"],
-            "dLUFS": p["dLUFS"],
-            "dTP": p["dTP"],
-            "dMaxAbs": p["dMaxAbs"],
-            "Similarity": p["Similarity"],
-            "Error": None,
-            "Path": None,
-        })
-
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(csv_rows)
-
-    html_content = new_sound_report_html(folder, report, html_path, reference_models)
-    with open(html_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
-
-    return {"HtmlPath": html_path, "CsvPath": csv_path}
+        html_path = None
+
+    export_paths = []
+    export_formats = [f for f in formats if f in EXPORT_FORMATS]
+    if export_formats:
+        from .export import write_columnar_exports  # lib.export imports this module
+        with get_stage_context(profiler, "export"):
+            export_paths = write_columnar_exports(base_path, report, export_formats)
+
+    return {"BasePath": base_path, "HtmlPath": html_path, "CsvPaths": csv_paths, "ExportPaths": export_paths}
+
+
+def _num_or_dash(v, digits: int = 2) -> str:
+    return "\u2014" if v is None else format_num(v, digits)
+
+
+def new_performance_section_html(throughput: dict) -> str:
+    """'Analysis performance' section: run throughput and the slowest files; empty when
+    nothing was measured in this run (everything came from the cache)."""
+    if not throughput["MeasuredFiles"]:
+        return ""
+    rows = "\n".join(
+        f"<tr>\n"
+        f"  <td>{html_escape(m['FileName'])}{' (failed)' if m.get('Error') else ''}</td>\n"
+        f"  <td class='num'>{format_num(m['WallSeconds'])}</td>\n"
+        f"  <td class='num'>{_num_or_dash(m.get('Duration'), 1)}</td>\n"
+        f"  <td class='num'>{_num_or_dash(m.get('RealtimeFactor'), 0)}</td>\n"
+        f"  <td class='num'>{_num_or_dash(m.get('CpuUserSeconds'))}</td>\n"
+        f"  <td class='num'>{_num_or_dash(m.get('CpuSysSeconds'))}</td>\n"
+        f"  <td class='num'>{_num_or_dash(m.get('PeakRssMB'), 1)}</td>\n"
+        f"  <td class='num'>{format_num((m.get('SizeBytes') or 0) / 1e6)}</td>\n"
+        f"  <td class='small' style='color:var(--muted); white-space:nowrap;'>{html_escape(m['Path'])}</td>\n"
+        f"</tr>"
+        for m in throughput["SlowestFiles"]
+    )
+    return f"""
+    <div class="section">
+      <h2>Analysis performance</h2>
+      <div class="kpis">
+        <div class="card"><div class="kpi-title">Files analysed this run</div><div class="kpi-value">{throughput["MeasuredFiles"]}</div></div>
+        <div class="card"><div class="kpi-title">Analysis time</div><div class="kpi-value">{format_num(throughput["Elapsed"], 1)} s</div></div>
+        <div class="card"><div class="kpi-title">Throughput</div><div class="kpi-value">{_num_or_dash(throughput["MBps"], 1)} MB/s</div></div>
+        <div class="card"><div class="kpi-title">Audio per minute</div><div class="kpi-value">{_num_or_dash(throughput["AudioHoursPerMinute"])} h</div></div>
+      </div>
+      <div class="small" style="margin-bottom:10px">
+        Cached and duplicate files are not counted. Realtime = media duration / wall time; CPU and peak memory are the ffmpeg child's.
+      </div>
+      <div class="tablewrap">
+        <table>
+          <thead>
+            <tr><th>Slowest files</th><th class="num">Wall (s)</th><th class="num">Duration (s)</th><th class="num">Realtime (x)</th>
+            <th class="num">CPU user (s)</th><th class="num">CPU sys (s)</th><th class="num">Peak RSS (MB)</th><th class="num">Size (MB)</th><th>Path</th></tr>
+          </thead>
+          <tbody>
+            {rows}
+          </tbody>
+        </table>
+      </div>
+    </div>
+"""
 
 
 def new_sound_report_html(folder: str, report: dict, html_path: str, reference_models: dict = None) -> str:
@@ -368,12 +331,8 @@ def new_sound_report_html(folder: str, report: dict, html_path: str, reference_m
     stats_json = json.dumps(stats, ensure_ascii=False)
     ref_models_json = json.dumps(reference_models, ensure_ascii=False)
 
-    levels = ["identical", "negligible", "slight", "moderate", "high", "extreme"]
-    level_counts = {l: 0 for l in levels}
-    for p in report["Pairs"]:
-        s = p["Similarity"]
-        if s in level_counts:
-            level_counts[s] += 1
+    levels = DIFF_LEVELS
+    level_counts = report["Summary"]["LevelCounts"]
 
     hist_lines = "\n".join(
         f"<div class='badge'><span class='tag {l}'>{l}</span>"
@@ -409,85 +368,49 @@ def new_sound_report_html(folder: str, report: dict, html_path: str, reference_m
     th_lufs_m = th_help("LUFS (Momentary)", "Max momentary loudness (400\u202fms window). Highlights sudden bursts or peaks.")
     th_lufs_s = th_help("LUFS (Short-Term)", "Max short-term loudness (3\u202fs window). Useful for spotting mid-section shifts.")
     th_lra   = th_help("LRA", "Loudness Range (dynamics). Higher = more dynamic.")
+    th_dur   = th_help("Duration", "Media duration from ffprobe (h:mm:ss).")
+    th_codec = th_help("Codec", "Codec of the first audio stream (ffprobe).")
+    th_curve = th_help("Loudness curve", f"Short-term loudness (3\u202fs window) over the file, {CURVE_POINTS} points, "
+                                         "on the same scale for every file. Click for a larger chart.")
     th_path  = th_help("Path", "Chemin complet vers le fichier source sur le disque.")
     th_dmax  = th_help("\u0394Max", "Pair distance: \u0394Max = max(|\u0394LUFS|, |\u0394TruePeak|).")
     th_sim   = th_help("Similarity", "Heuristic categories based on \u0394Max.")
 
-    # Metrics rows
-    metrics_rows_parts = []
-    for m in sorted(report["Metrics"], key=lambda x: x["FileName"]):
-        err_txt = html_escape(m["Error"]) if m.get("Error") else ""
-        status = ("<span class='tag error'>Error</span>" if err_txt
-                  else "<span class='tag identical'>OK</span>")
-        size_mb = f"{m['SizeBytes'] / (1024 * 1024):.2f}"
-
-        if not err_txt:
-            lufs = format_num(float(m["LUFS_I"]))
-            tp   = format_num(float(m["TruePeak_dBTP"]))
-            lra  = format_num(float(m["LRA"]))
-            tp_clip  = " data-clipping='1'" if float(m["TruePeak_dBTP"]) >= 0 else ""
-            lufs_cell  = f"<span class='metricbox' data-metric='LUFS_I' data-value='{lufs}'>{lufs}</span>"
-            tp_cell    = f"<span class='metricbox' data-metric='TruePeak_dBTP' data-value='{tp}'{tp_clip}>{tp}</span>"
-            lra_cell   = f"<span class='metricbox' data-metric='LRA' data-value='{lra}'>{lra}</span>"
-
-            raw_lufs_m = m.get("LUFS_M")
-            raw_lufs_s = m.get("LUFS_S")
-            if raw_lufs_m is not None:
-                lufs_m_str  = format_num(float(raw_lufs_m))
-                lufs_m_cell = f"<span class='metricbox' data-metric='LUFS_M' data-value='{lufs_m_str}'>{lufs_m_str}</span>"
-            else:
-                lufs_m_cell = "<span class='metricbox dim'>\u2014</span>"
-            if raw_lufs_s is not None:
-                lufs_s_str  = format_num(float(raw_lufs_s))
-                lufs_s_cell = f"<span class='metricbox' data-metric='LUFS_S' data-value='{lufs_s_str}'>{lufs_s_str}</span>"
-            else:
-                lufs_s_cell = "<span class='metricbox dim'>\u2014</span>"
-
-            raw_peak = m.get("Peak_dBFS")
-            raw_rms  = m.get("RMS_dBFS")
-            if raw_peak is not None:
-                peak_str  = format_num(float(raw_peak))
-                peak_clip = " data-clipping='1'" if float(raw_peak) >= 0 else ""
-                peak_cell = f"<span class='metricbox' data-metric='Peak_dBFS' data-value='{peak_str}'{peak_clip}>{peak_str}</span>"
-            else:
-                peak_cell = "<span class='metricbox dim'>\u2014</span>"
-            if raw_rms is not None:
-                rms_str  = format_num(float(raw_rms))
-                rms_cell = f"<span class='metricbox' data-metric='RMS_dBFS' data-value='{rms_str}'>{rms_str}</span>"
-            else:
-                rms_cell = "<span class='metricbox dim'>\u2014</span>"
-        else:
-            lufs_cell   = "<span class='metricbox dim'>\u2014</span>"
-            lufs_m_cell = "<span class='metricbox dim'>\u2014</span>"
-            lufs_s_cell = "<span class='metricbox dim'>\u2014</span>"
-            tp_cell     = "<span class='metricbox dim'>\u2014</span>"
-            lra_cell    = "<span class='metricbox dim'>\u2014</span>"
-            peak_cell   = "<span class='metricbox dim'>\u2014</span>"
-            rms_cell    = "<span class='metricbox dim'>\u2014</span>"
-
-        path_txt = html_escape(m.get("Path", ""))
-        metrics_rows_parts.append(
-            f"<tr>\n"
-            f"  <td>{html_escape(m['FileName'])}</td>\n"
-            f"  <td>{html_escape(m['Ext'])}</td>\n"
-            f"  <td class='num'>{size_mb}</td>\n"
-            f"  <td class='num'>{peak_cell}</td>\n"
-            f"  <td class='num'>{tp_cell}</td>\n"
-            f"  <td class='num'>{rms_cell}</td>\n"
-            f"  <td class='num'>{lufs_cell}</td>\n"
-            f"  <td class='num'>{lufs_m_cell}</td>\n"
-            f"  <td class='num'>{lufs_s_cell}</td>\n"
-            f"  <td class='num'>{lra_cell}</td>\n"
-            f"  <td>{status}</td>\n"
-            f"  <td style='max-width:520px; color:#ffb2b2;'>{err_txt}</td>\n"
-            f"  <td class='small' style='color:var(--muted); white-space:nowrap;'>{path_txt}</td>\n"
-            f"</tr>"
-        )
-    metrics_rows = "\n".join(metrics_rows_parts)
+    # Per-file metrics: embedded once as column arrays; the table only renders the
+    # rows in view (see the virtual table script), so huge reports stay responsive.
+    file_metrics = ("Peak_dBFS", "TruePeak_dBTP", "RMS_dBFS", "LUFS_I", "LUFS_M", "LUFS_S", "LRA")
+    files = report["FilesEnriched"]
+    names = files.get_column("FileName")
+    order = sorted(range(len(names)), key=names.__getitem__)
+
+    def _sorted_column(key):
+        col = files.get_column(key)
+        return [col[i] for i in order]
+
+    files_payload = {
+        "FileName": [names[i] for i in order],
+        "Ext": _sorted_column("Ext"),
+        "SizeMB": [round(b / (1024 * 1024), 2) for b in _sorted_column("SizeBytes")],
+        "Duration": [None if v is None else round(v, 2) for v in _sorted_column("Duration")],
+        "Codec": _sorted_column("Codec"),
+        "Channels": _sorted_column("Channels"),
+        "SampleRate": _sorted_column("SampleRate"),
+    }
+    for k in file_metrics:
+        files_payload[k] = [None if v is None else round(v, 2) for v in _sorted_column(k)]
+    files_payload["Approximate"] = _sorted_column("Approximate")
+    files_payload["LUFS_I_Bound"] = [None if v is None else round(v, 2) for v in _sorted_column("LUFS_I_Bound")]
+    files_payload["Error"] = [e or "" for e in _sorted_column("Error")]
+    files_payload["Path"] = [p or "" for p in _sorted_column("Path")]
+    # Short-term curves as one base64 float32 block, CURVE_POINTS values per file in
+    # table order: a fraction of the size of JSON numbers, decoded once by the script.
+    curves_b64 = base64.b64encode(get_curve_block(_sorted_column("Curve_S"))).decode("ascii")
+    # No raw "<" inside the <script> element ("</script>", "<!--").
+    files_json = json.dumps(files_payload, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
 
     # Pairs rows
     pairs_rows_parts = []
-    for p in sorted(report["Pairs"], key=lambda x: -x["dMaxAbs"]):
+    for p in report["Pairs"]:  # already in listing order (see pairs.get_pair_summary)
         sim_cls = p["Similarity"]
         pairs_rows_parts.append(
             f"<tr>\n"
@@ -504,13 +427,77 @@ def new_sound_report_html(folder: str, report: dict, html_path: str, reference_m
             f"</tr>"
         )
 
+    summary = report["Summary"]
     if pairs_rows_parts:
         pairs_rows = "\n".join(pairs_rows_parts)
+    elif summary["Pairs"]:
+        pairs_rows = "<tr><td colspan='10' class='small'>No pair matches the listing filter.</td></tr>"
     else:
         pairs_rows = "<tr><td colspan='10' class='small'>Not enough measured files to generate pairs.</td></tr>"
 
+    if summary["PairsListed"] < summary["Pairs"]:
+        pairs_note = (
+            f"Listing {summary['PairsListed']} of {summary['Pairs']} pairs "
+            f"({html_escape(summary['PairSelection'])}), largest \u0394Max first. "
+            f"The distribution above covers all pairs."
+        )
+    else:
+        pair_order = "in file order" if parse_pair_selection(summary["PairSelection"])[0] == "all" else "largest \u0394Max first"
+        pairs_note = f"All {summary['Pairs']} pairs, {pair_order}."
+
     global_same_txt = "Yes" if report["Summary"]["GlobalSame"] else "No"
 
+    # Duplicate groups (only one member of each was analysed)
+    dup_groups = report.get("DuplicateGroups") or []
+    dup_rows_parts = []
+    for gid, g in enumerate(dup_groups, start=1):
+        kind = "Same file content" if g["Kind"] == "bytes" else "Same audio stream"
+        copies = "<br>".join(html_escape(p) for p in g["Paths"][1:])
+        dup_rows_parts.append(
+            f"<tr>\n"
+            f"  <td class='num'>{gid}</td>\n"
+            f"  <td>{kind}</td>\n"
+            f"  <td class='num'>{len(g['Paths'])}</td>\n"
+            f"  <td class='small' style='white-space:nowrap;'>{html_escape(g['Paths'][0])}</td>\n"
+            f"  <td class='small' style='color:var(--muted); white-space:nowrap;'>{copies}</td>\n"
+            f"</tr>"
+        )
+    if dup_rows_parts:
+        dup_rows = "\n".join(dup_rows_parts)
+        dup_section = f"""
+    <div class="section">
+      <h2>Duplicate groups</h2>
+      <div class="small" style="margin-bottom:10px">
+        {report["Summary"]["DuplicateFiles"]} file(s) were not decoded: their metrics are copied from the analysed file of their group.
+      </div>
+      <div class="tablewrap">
+        <table>
+          <thead>
+            <tr><th class="num">#</th><th>Match</th><th class="num">Files</th><th>Analysed file</th><th>Copies</th></tr>
+          </thead>
+          <tbody>
+            {dup_rows}
+          </tbody>
+        </table>
+      </div>
+    </div>
+"""
+    else:
+        dup_section = ""
+
+    n_approx = report["Summary"]["FilesApproximate"]
+    if n_approx:
+        sample_note = (
+            f"<div class='small' style='margin-bottom:10px'>{n_approx} file(s) were estimated from sampled "
+            f"windows (--sample), marked \u2248 in the Status column with the 95\u202f% bound on their "
+            f"integrated loudness. Their peaks and momentary / short-term maxima only cover the windows "
+            f"(faded at the joins, blocks across a join left out), so they can only under-read.</div>"
+        )
+    else:
+        sample_note = ""
+
+    perf_section = new_performance_section_html(report["Summary"]["Throughput"])
+
     css = """\
 <style>
 :root{
@@ -608,6 +595,19 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
   line-height:1.35;
   z-index:9999;
 }
+.vtable{max-height:70vh; overflow:auto}
+.vtable tbody td{white-space:nowrap; vertical-align:middle}
+.vtable td.ellipsis{max-width:520px; overflow:hidden; text-overflow:ellipsis}
+.vtable tr.vspacer td{padding:0; border:none}
+.vtable tr.vspacer:hover{background:none}
+svg.spark{display:block; cursor:pointer}
+svg.spark polyline, #curveSvg polyline{fill:none; stroke:var(--accent); stroke-width:1.5}
+#curveSvg line{stroke:rgba(255,255,255,.12)}
+#curveSvg line.ref{stroke:#ffd27a; stroke-dasharray:4 3}
+#curveSvg text{fill:var(--muted); font-size:11px}
+.curvepop{position:fixed; left:50%; top:50%; transform:translate(-50%,-50%); width:min(760px,94vw); z-index:9000; background:#10162e; box-shadow:0 12px 40px rgba(0,0,0,.6)}
+.curvepop[hidden]{display:none}
+.curvepop button{margin-left:auto; background:none; border:1px solid var(--border); border-radius:8px; color:var(--text); cursor:pointer; padding:2px 8px}
 .footer{margin-top:18px; color:var(--muted); font-size:12px}
 </style>"""
 
@@ -652,36 +652,65 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
     return {{ bg: 'rgba(100,110,140,0.15)', border: 'rgba(150,160,190,0.30)' }};
   }}
 
-  function clearAllColors(){{
-    document.querySelectorAll(".metricbox[data-metric]").forEach(el => {{
-      el.style.backgroundColor = '';
-      el.style.borderColor = '';
-      el.title = '';
-      el.classList.remove("clip-warn");
-    }});
+  function getRef(method, metric){{
+    if (!stats[metric]) return 0;
+    const v = (method === "median") ? stats[metric].median : stats[metric].mean;
+    return (v != null) ? v : 0;
+  }}
+  function getScale(method, metric){{
+    if (!stats[metric]) return 1;
+    const s = stats[metric].std || 0;
+    if (method === "zscore") return 2.0;
+    const fallback = (metric === "LRA") ? 2.0 : 1.0;
+    return Math.max(2.0 * s, fallback);
+  }}
+  function computeDelta(method, metric, value){{
+    if (!stats[metric]) return 0;
+    const ref = getRef(method, metric);
+    const std = (stats[metric].std != null) ? stats[metric].std : 0;
+    if (method === "zscore"){{
+      if (std <= 1e-9) return 0.0;
+      return (value - ref) / std;
+    }}
+    return (value - ref);
   }}
 
-  function applyAbsoluteColors(presetId){{
-    const preset = refModels.presets ? refModels.presets.find(p => p.id === presetId) : null;
-    document.querySelectorAll(".metricbox[data-metric][data-value]").forEach(el => {{
-      const metric = el.getAttribute("data-metric");
-      const value  = parseFloat(el.getAttribute("data-value"));
+  // Per-file table: rows are rendered from the column arrays, only around the viewport.
+  const files = JSON.parse(document.getElementById("filesData").textContent);
+  const FILE_COLS = ["FileName", "Ext", "SizeMB", "Duration", "Codec", "Channels", "SampleRate",
+                     "Peak_dBFS", "TruePeak_dBTP", "RMS_dBFS", "LUFS_I", "LUFS_M", "LUFS_S", "LRA",
+                     "Curve", "Status", "Error", "Path"];
+  const METRIC_COLS = FILE_COLS.slice(7, 14);
+  const CLIP_METRICS = ["Peak_dBFS", "TruePeak_dBTP"];
+  const OVERSCAN = 15;
+  const nFiles = files.FileName.length;
+  const collator = new Intl.Collator('en');
+  let order = Array.from({{length: nFiles}}, (_, i) => i);
+  let colourMode = 'none';
+  let rowH = 44;
+  let renderQueued = false;
+
+  function esc(v){{
+    return String(v).replace(/[&<>"']/g, ch => ({{'&':'&amp;', '<':'&lt;', '>':'&gt;', '"':'&quot;', "'":'&#39;'}})[ch]);
+  }}
 
-      if (el.getAttribute("data-clipping") === "1") {{
-        el.classList.add("clip-warn");
-        el.title = metric + ': ' + value.toFixed(2) + ' \u26a0 CLIPPING \u2265 0 dB!';
-        return;
-      }}
-      el.classList.remove("clip-warn");
+  // Colour, clipping flag and tooltip of one metric value under the current mode.
+  function metricStyle(metric, value){{
+    const method = colourMode;
+    if (method === 'none') return {{ c: null, clip: false, title: '' }};
+    const clip = CLIP_METRICS.includes(metric) && value >= 0;
 
+    if (method.startsWith('preset:')) {{
+      if (clip) return {{ c: null, clip: true, title: metric + ': ' + value.toFixed(2) + ' \u26a0 CLIPPING \u2265 0 dB!' }};
+      const presetId = method.slice(7);
+      const preset = refModels.presets ? refModels.presets.find(p => p.id === presetId) : null;
       const thresholds = preset && preset.metrics ? preset.metrics[metric] : null;
       if (!thresholds) {{
-        el.style.backgroundColor = 'rgba(100,110,140,0.10)';
-        el.style.borderColor = 'rgba(150,160,190,0.25)';
-        el.title = metric + ': ' + value.toFixed(2) + ' (pas de seuil pour ce preset)';
-        return;
+        return {{
+          c: {{ bg: 'rgba(100,110,140,0.10)', border: 'rgba(150,160,190,0.25)' }}, clip: false,
+          title: metric + ': ' + value.toFixed(2) + ' (pas de seuil pour ce preset)',
+        }};
       }}
-
       const hasMin = thresholds.min != null;
       const hasMax = thresholds.max != null;
       let colorName;
@@ -690,102 +719,210 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
       else if (hasMin || hasMax)                 colorName = 'green';
       else                                        colorName = 'neutral';
 
-      const c = colorForAbsolute(colorName);
-      el.style.backgroundColor = c.bg;
-      el.style.borderColor = c.border;
-
       const tipParts = [metric + ': ' + value.toFixed(2)];
       if (hasMin) tipParts.push('min=' + thresholds.min);
       if (hasMax) tipParts.push('max=' + thresholds.max);
       if (thresholds.target != null) tipParts.push('cible=' + thresholds.target);
       tipParts.push('\u2192 ' + colorName);
-      el.title = tipParts.join(', ');
-    }});
+      return {{ c: colorForAbsolute(colorName), clip: false, title: tipParts.join(', ') }};
+    }}
+
+    if (!stats[metric]) return {{ c: null, clip: clip, title: '' }};
+    const delta = computeDelta(method, metric, value);
+    const ref = getRef(method, metric);
+    const std = stats[metric].std || 0;
+    let title;
+    if (method === "zscore"){{
+      title = metric + ': value=' + value.toFixed(2) + ', mean=' + ref.toFixed(2) + ', std=' + std.toFixed(2) + ', z=' + delta.toFixed(2);
+    }} else {{
+      const refLabel = (method === "median") ? "median" : "mean";
+      title = metric + ': value=' + value.toFixed(2) + ', ' + refLabel + '=' + ref.toFixed(2) + ', \u0394=' + delta.toFixed(2) + ' dB';
+    }}
+    // Absolute clipping: red if >= 0 dB (highest priority, overrides relative colouring)
+    if (clip) title += " \u26a0 CLIPPING \u2265 0 dB!";
+    return {{ c: colorForT(clamp(delta / getScale(method, metric), -1, 1)), clip: clip, title: title }};
   }}
 
-  function getRef(method, metric){{
-    if (!stats[metric]) return 0;
-    const v = (method === "median") ? stats[metric].median : stats[metric].mean;
-    return (v != null) ? v : 0;
+  function metricCell(metric, value){{
+    if (value == null) return "<span class='metricbox dim'>\u2014</span>";
+    const st = metricStyle(metric, value);
+    let attrs = "class='metricbox" + (st.clip ? " clip-warn" : "") + "'";
+    if (st.c) attrs += " style='background-color:" + st.c.bg + "; border-color:" + st.c.border + "'";
+    if (st.title) attrs += " title='" + esc(st.title) + "'";
+    return "<span " + attrs + ">" + value.toFixed(2) + "</span>";
   }}
-  function getScale(method, metric){{
-    if (!stats[metric]) return 1;
-    const s = stats[metric].std || 0;
-    if (method === "zscore") return 2.0;
-    const fallback = (metric === "LRA") ? 2.0 : 1.0;
-    return Math.max(2.0 * s, fallback);
+
+  function fmtDuration(s){{
+    if (s == null) return "\u2014";
+    const t = Math.round(s);
+    const h = Math.floor(t / 3600), m = Math.floor(t / 60) % 60, sec = t % 60;
+    const mm = h ? String(m).padStart(2, "0") : String(m);
+    return (h ? h + ":" : "") + mm + ":" + String(sec).padStart(2, "0");
   }}
-  function computeDelta(method, metric, value){{
-    if (!stats[metric]) return 0;
-    const ref = getRef(method, metric);
-    const std = (stats[metric].std != null) ? stats[metric].std : 0;
-    if (method === "zscore"){{
-      if (std <= 1e-9) return 0.0;
-      return (value - ref) / std;
+
+  // Short-term loudness curves: CURVE_POINTS float32 values per file (NaN past the
+  // end of a short curve), decoded once; file i's curve starts at i * CURVE_POINTS.
+  const CURVE_POINTS = {CURVE_POINTS};
+  const curves = (() => {{
+    const bin = atob(document.getElementById("curvesData").textContent.trim());
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new Float32Array(bytes.buffer);
+  }})();
+  // One scale for every sparkline, so the rows can be compared at a glance.
+  let curveLo = Infinity, curveHi = -Infinity;
+  for (const v of curves) {{
+    if (v < curveLo) curveLo = v;
+    if (v > curveHi) curveHi = v;
+  }}
+
+  function getCurve(i){{
+    const row = curves.subarray(i * CURVE_POINTS, (i + 1) * CURVE_POINTS);
+    let n = 0;
+    while (n < row.length && row[n] === row[n]) n++;
+    return n >= 2 ? row.subarray(0, n) : null;
+  }}
+
+  function curvePath(row, w, h, lo, hi){{
+    const span = Math.max(hi - lo, 1);
+    return Array.from(row, (v, k) => (k / (row.length - 1) * w).toFixed(1) + "," +
+                                     (h - (v - lo) / span * h).toFixed(1)).join(" ");
+  }}
+
+  function sparklineHtml(i){{
+    const row = getCurve(i);
+    if (!row) return "<span class='small'>\u2014</span>";
+    return "<svg class='spark' width='96' height='22' data-file='" + i + "'><polyline points='" +
+           curvePath(row, 96, 22, curveLo, curveHi) + "'/></svg>";
+  }}
+
+  // Larger chart of one curve, on its own scale, with its integrated loudness dashed.
+  function showCurve(i){{
+    const row = getCurve(i);
+    if (!row) return;
+    const W = 700, H = 220, L = 44, B = 20;
+    const lufs = files.LUFS_I[i];
+    let lo = Math.min(...row), hi = Math.max(...row);
+    if (lufs != null) {{ lo = Math.min(lo, lufs); hi = Math.max(hi, lufs); }}
+    lo = Math.floor(lo / 5) * 5 - 5;
+    hi = Math.ceil(hi / 5) * 5;
+    const y = v => (H - B - (v - lo) / (hi - lo) * (H - B - 8)).toFixed(1);
+    const parts = [];
+    for (let v = lo; v <= hi; v += 5) {{
+      parts.push("<line x1='" + L + "' x2='" + W + "' y1='" + y(v) + "' y2='" + y(v) + "'/>");
+      parts.push("<text x='" + (L - 6) + "' y='" + y(v) + "' text-anchor='end' dy='4'>" + v + "</text>");
     }}
-    return (value - ref);
+    if (lufs != null) parts.push("<line class='ref' x1='" + L + "' x2='" + W + "' y1='" + y(lufs) + "' y2='" + y(lufs) + "'/>");
+    const pts = Array.from(row, (v, k) => (L + k / (row.length - 1) * (W - L)).toFixed(1) + "," + y(v)).join(" ");
+    parts.push("<polyline points='" + pts + "'/>");
+    parts.push("<text x='" + L + "' y='" + (H - 4) + "'>0:00</text>");
+    parts.push("<text x='" + W + "' y='" + (H - 4) + "' text-anchor='end'>" + fmtDuration(files.Duration[i]) + "</text>");
+    document.getElementById("curveSvg").innerHTML = parts.join("");
+    document.getElementById("curveTitle").textContent = files.FileName[i];
+    document.getElementById("curveInfo").textContent = "Short-term loudness (LUFS)" +
+      (lufs != null ? ", integrated " + lufs.toFixed(1) + " LUFS (dashed)" : "") +
+      (files.Approximate[i] ? ", sampled windows only" : "");
+    document.getElementById("curvePop").hidden = false;
+  }}
+
+  function statusOf(i){{
+    return files.Error[i] ? 'Error' : (files.Approximate[i] ? 'Approx' : 'OK');
+  }}
+
+  function statusHtml(i){{
+    const status = statusOf(i);
+    if (status === 'Error') return "<span class='tag error'>Error</span>";
+    if (status === 'OK') return "<span class='tag identical'>OK</span>";
+    const bound = files.LUFS_I_Bound[i];
+    return "<span class='tag slight' title='Estimated from sampled windows (--sample)'>\u2248" +
+           (bound == null ? "" : " \u00b1" + bound.toFixed(1)) + "</span>";
+  }}
+
+  function fileRowHtml(i){{
+    const err = files.Error[i];
+    const path = files.Path[i];
+    const cells = [
+      "<td>" + esc(files.FileName[i]) + "</td>",
+      "<td>" + esc(files.Ext[i]) + "</td>",
+      "<td class='num'>" + files.SizeMB[i].toFixed(2) + "</td>",
+      "<td class='num'>" + fmtDuration(files.Duration[i]) + "</td>",
+      "<td>" + esc(files.Codec[i] || "\u2014") + "</td>",
+      "<td class='num'>" + (files.Channels[i] == null ? "\u2014" : files.Channels[i]) + "</td>",
+      "<td class='num'>" + (files.SampleRate[i] == null ? "\u2014" : files.SampleRate[i]) + "</td>",
+    ];
+    METRIC_COLS.forEach(k => cells.push("<td class='num'>" + metricCell(k, files[k][i]) + "</td>"));
+    cells.push("<td>" + sparklineHtml(i) + "</td>");
+    cells.push("<td>" + statusHtml(i) + "</td>");
+    cells.push("<td class='ellipsis' style='color:#ffb2b2;' title='" + esc(err) + "'>" + esc(err) + "</td>");
+    cells.push("<td class='small ellipsis' style='color:var(--muted);' title='" + esc(path) + "'>" + esc(path) + "</td>");
+    return "<tr>" + cells.join("") + "</tr>";
+  }}
+
+  function spacerHtml(height){{
+    return height > 0 ? "<tr class='vspacer'><td colspan='" + FILE_COLS.length + "' style='height:" + height + "px'></td></tr>" : "";
+  }}
+
+  function renderFiles(){{
+    renderQueued = false;
+    const wrap = document.getElementById("filesWrap");
+    const body = document.getElementById("filesBody");
+    const headH = document.querySelector("#filesTable thead").offsetHeight;
+    const first = Math.max(0, Math.floor((wrap.scrollTop - headH) / rowH) - OVERSCAN);
+    const last = Math.min(nFiles, first + Math.ceil(wrap.clientHeight / rowH) + 2 * OVERSCAN);
+    const parts = [spacerHtml(first * rowH)];
+    for (let k = first; k < last; k++) parts.push(fileRowHtml(order[k]));
+    parts.push(spacerHtml((nFiles - last) * rowH));
+    body.innerHTML = parts.join("");
+
+    // Spacer heights assume a fixed row height: take it from the first real row.
+    const row = body.querySelector("tr:not(.vspacer)");
+    const h = row ? row.getBoundingClientRect().height : 0;
+    if (h > 0 && Math.abs(h - rowH) > 0.5) {{
+      rowH = h;
+      renderFiles();
+    }}
+  }}
+  function queueRenderFiles(){{
+    if (renderQueued) return;
+    renderQueued = true;
+    requestAnimationFrame(renderFiles);
+  }}
+
+  function sortFiles(col, dir){{
+    const key = FILE_COLS[col];
+    const sign = dir === 'asc' ? 1 : -1;
+    const vals = (key === 'Status') ? Array.from({{length: nFiles}}, (_, i) => statusOf(i)) : files[key];
+    order.sort((a, b) => {{
+      const x = vals[a], y = vals[b];
+      if (x == null || y == null) return (x == null) - (y == null);  // missing values last
+      if (typeof x === 'number') return sign * (x - y);
+      return sign * collator.compare(x, y);
+    }});
+    renderFiles();
   }}
 
   function applyColors(){{
     const method = document.getElementById("refMode").value;
     const legend = document.getElementById("modeLegend");
+    colourMode = method;
 
     if (method === 'none') {{
-      clearAllColors();
       legend.textContent = 'Colorisation d\u00e9sactiv\u00e9e.';
-      return;
-    }}
-
-    if (method.startsWith('preset:')) {{
+    }} else if (method.startsWith('preset:')) {{
       const presetId = method.slice(7);
       const preset = refModels.presets ? refModels.presets.find(p => p.id === presetId) : null;
-      applyAbsoluteColors(presetId);
       const presetLabel = preset ? preset.label : presetId;
       const presetDesc  = preset && preset.description ? ' \u2014 ' + preset.description : '';
       legend.textContent = 'Standard\u00a0: ' + presetLabel +
         '. Bleu\u00a0=\u00a0en-dessous du seuil, Vert\u00a0=\u00a0dans la plage, Rouge\u00a0=\u00a0au-dessus.' + presetDesc;
-      return;
-    }}
-
-    document.querySelectorAll(".metricbox[data-metric][data-value]").forEach(el => {{
-      const metric = el.getAttribute("data-metric");
-      const value = parseFloat(el.getAttribute("data-value"));
-      const delta = computeDelta(method, metric, value);
-      const scale = getScale(method, metric);
-      const t = clamp(delta / scale, -1, 1);
-      const c = colorForT(t);
-
-      el.style.backgroundColor = c.bg;
-      el.style.borderColor = c.border;
-
-      const ref = getRef(method, metric);
-      const std = stats[metric].std || 0;
-      let tipText;
-      if (method === "zscore"){{
-        tipText = metric + ': value=' + value.toFixed(2) + ', mean=' + ref.toFixed(2) + ', std=' + std.toFixed(2) + ', z=' + delta.toFixed(2);
-      }} else {{
-        const refLabel = (method === "median") ? "median" : "mean";
-        tipText = metric + ': value=' + value.toFixed(2) + ', ' + refLabel + '=' + ref.toFixed(2) + ', \u0394=' + delta.toFixed(2) + ' dB';
-      }}
-      el.title = tipText;
-    }});
-
-    if (method === "zscore"){{
+    }} else if (method === "zscore"){{
       legend.textContent = "Colours (z-score): blue=below average, green=close, red=above (\u2248 \u00b12\u03c3 scale).";
     }} else if (method === "median"){{
       legend.textContent = "Colours (\u0394 vs median): blue=below, green=close, red=above (\u2248 \u00b12\u00d7\u03c3 scale).";
     }} else {{
       legend.textContent = "Colours (\u0394 vs mean): blue=below, green=close, red=above (\u2248 \u00b12\u00d7\u03c3 scale).";
     }}
-
-    // Absolute clipping: red if >= 0 dB (highest priority, overrides relative colouring)
-    document.querySelectorAll(".metricbox[data-clipping='1']").forEach(el => {{
-      el.classList.add("clip-warn");
-      el.title += " \u26a0 CLIPPING \u2265 0 dB!";
-    }});
-    document.querySelectorAll(".metricbox:not([data-clipping='1'])").forEach(el => {{
-      el.classList.remove("clip-warn");
-    }});
+    renderFiles();
   }}
 
   function showTooltip(e, text){{
@@ -835,7 +972,8 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
         th.dataset.sort = dir;
         const ind = th.querySelector('.sort-ind');
         if (ind) ind.textContent = dir === 'asc' ? '\u2191' : '\u2193';
-        sortTable(table, col, dir);
+        if (table.id === 'filesTable') sortFiles(col, dir);
+        else sortTable(table, col, dir);
       }});
     }});
 
@@ -846,6 +984,20 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
       el.addEventListener("mouseleave", hideTooltip);
     }});
 
+    const wrap = document.getElementById("filesWrap");
+    wrap.addEventListener("scroll", queueRenderFiles, {{ passive: true }});
+    document.getElementById("filesBody").addEventListener("click", (e) => {{
+      const spark = e.target.closest("svg.spark");
+      if (spark) showCurve(Number(spark.dataset.file));
+    }});
+    document.getElementById("curveClose").addEventListener("click", () => {{
+      document.getElementById("curvePop").hidden = true;
+    }});
+    document.addEventListener("keydown", (e) => {{
+      if (e.key === "Escape") document.getElementById("curvePop").hidden = true;
+    }});
+    window.addEventListener("resize", queueRenderFiles);
+
     const sel = document.getElementById("refMode");
     sel.addEventListener("change", applyColors);
     applyColors();
@@ -894,6 +1046,7 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
 
     <div class="section">
       <h2>Per-file metrics</h2>
+      {sample_note}
       <div class="card" style="margin-bottom:10px">
         <div class="controls">
           <div class="small"><b>Colouring:</b></div>
@@ -912,13 +1065,17 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
         </div>
       </div>
 
-      <div class="tablewrap">
-        <table>
+      <div class="tablewrap vtable" id="filesWrap">
+        <table id="filesTable">
           <thead>
             <tr>
               <th class="sortable">File <span class="sort-ind">\u2195</span></th>
               <th class="sortable">Type <span class="sort-ind">\u2195</span></th>
               <th class="num sortable">Size (MB) <span class="sort-ind">\u2195</span></th>
+              <th class="num sortable">{th_dur} <span class="sort-ind">\u2195</span></th>
+              <th class="sortable">{th_codec} <span class="sort-ind">\u2195</span></th>
+              <th class="num sortable">Ch <span class="sort-ind">\u2195</span></th>
+              <th class="num sortable">Rate (Hz) <span class="sort-ind">\u2195</span></th>
               <th class="num sortable">{th_peak} <span class="sort-ind">\u2195</span></th>
               <th class="num sortable">{th_tp} <span class="sort-ind">\u2195</span></th>
               <th class="num sortable">{th_rms} <span class="sort-ind">\u2195</span></th>
@@ -926,18 +1083,25 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
               <th class="num sortable">{th_lufs_m} <span class="sort-ind">\u2195</span></th>
               <th class="num sortable">{th_lufs_s} <span class="sort-ind">\u2195</span></th>
               <th class="num sortable">{th_lra} <span class="sort-ind">\u2195</span></th>
+              <th>{th_curve}</th>
               <th class="sortable">Status <span class="sort-ind">\u2195</span></th>
               <th>Error</th>
               <th>{th_path}</th>
             </tr>
           </thead>
-          <tbody>
-            {metrics_rows}
-          </tbody>
+          <tbody id="filesBody"></tbody>
         </table>
       </div>
+      <script type="application/json" id="filesData">{files_json}</script>
+      <script type="application/octet-stream" id="curvesData">{curves_b64}</script>
+      <div class="curvepop card" id="curvePop" hidden>
+        <div class="controls"><b id="curveTitle"></b><span class="small" id="curveInfo"></span><button id="curveClose" aria-label="Close">\u2715</button></div>
+        <svg id="curveSvg" viewBox="0 0 700 220" width="100%"></svg>
+      </div>
     </div>
 
+{dup_section}
+{perf_section}
     <div class="section">
       <h2>Pairwise comparisons</h2>
       <div class="card" style="margin-bottom:10px">
@@ -948,6 +1112,7 @@ th.sortable[data-sort="desc"] .sort-ind{opacity:1; color:var(--accent);}
         <div class="small" style="margin-top:8px">
           "Globally same level" heuristic = max(\u0394Max) \u2264 1.5 dB AND \u226580% of pairs \u2264 "slight".
         </div>
+        <div class="small" style="margin-top:4px">{pairs_note}</div>
       </div>
       <div class="tablewrap">
         <table>
@@ -0,0 +1,129 @@
+"""--sample: estimate a long file's loudness from N evenly spaced windows.
+
+Each window is its own ffmpeg input, seeked before opening (-ss/-t ahead of -i),
+so the audio between windows is skipped by the demuxer and never decoded. The
+windows are concatenated into the usual ebur128 + volumedetect graph: LUFS_I is
+the gated loudness of the sampled audio, with a 95 % bound from the spread
+between windows (LUFS_I_Bound).
+
+Joined as they are, two windows would make a level or phase jump that the true
+peak oversampler reads as overshoot. Each window is therefore faded in and out
+over SAMPLE_FADE seconds, and the momentary and short-term blocks that straddle
+a join are left out of the LUFS_M / LUFS_S maxima (test_within_window). The
+peaks and LUFS_M / LUFS_S maxima are then those of the windows, so they can only
+under-read; LRA also only sees the windows.
+"""
+
+import math
+import re
+from typing import List, Optional
+
+# Windows per file and their length (s); a window shorter than the 3 s short-term
+# block would leave LUFS_S and LRA without data.
+DEFAULT_SAMPLE_WINDOWS = 12
+DEFAULT_SAMPLE_SECONDS = 10.0
+MIN_SAMPLE_SECONDS = 3.0
+
+# Files shorter than this many times the sampled length are measured in full: the
+# few seconds saved do not pay for an approximate result.
+SAMPLE_MIN_RATIO = 4.0
+
+# Decoded and dropped ahead of each window: lossy decoders (AAC, MP3) start with a
+# transient after a seek that would otherwise read as a peak.
+SAMPLE_PREROLL = 0.2
+
+# Fade in and out at each window edge (s), so the joins add no true-peak overshoot.
+# It takes ~0.05 dB off the LUFS_I of 5 s windows, well inside the bound floor.
+SAMPLE_FADE = 0.02
+
+# Two-sided 95 % normal quantile of the bound, and its floor: ebur128 logs
+# loudness to 0.1 LU, so a closer estimate could not be told apart anyway.
+_Z95 = 1.96
+_BOUND_FLOOR = 0.1
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = 0.1  # -10 LU, as an energy ratio
+_M_BLOCK = 0.4  # momentary block length (s)
+_EPS = 0.01     # ebur128 prints t slightly below the 100 ms grid
+
+_RE_FRAME_T = re.compile(r"\st:\s*([\d.]+)")
+_RE_FRAME_M = re.compile(r"\sM:\s*(-?[\d.]+)")
+
+
+def get_sample_starts(duration: Optional[float], windows: int, seconds: float) -> Optional[List[float]]:
+    """Start times (s) of `windows` windows of `seconds`, one centred in each of
+    `windows` equal parts of the file; None when the duration is unknown or too
+    short for sampling (SAMPLE_MIN_RATIO)."""
+    if not duration or duration < SAMPLE_MIN_RATIO * windows * seconds:
+        return None
+    step = duration / windows
+    return [round(step * (k + 0.5) - seconds / 2, 3) for k in range(windows)]
+
+
+def get_sample_inputs(path: str, starts: List[float], seconds: float, input_options: List[str]):
+    """(ffmpeg input arguments, filter graph source) reading the windows at `starts`
+    back to back as one stream, each faded in and out over SAMPLE_FADE seconds;
+    `input_options` go before each -i."""
+    inputs = []
+    labels = []
+    fades = (f"afade=t=in:d={SAMPLE_FADE:g}:curve=hsin,"
+             f"afade=t=out:st={seconds - SAMPLE_FADE:g}:d={SAMPLE_FADE:g}:curve=hsin")
+    for k, start in enumerate(starts):
+        preroll = min(SAMPLE_PREROLL, start)
+        inputs += input_options + ["-ss", f"{start - preroll:.3f}", "-t", f"{seconds + preroll:g}", "-i", path]
+        labels.append(f"[{k}:a:0]atrim=start={preroll:g},asetpts=PTS-STARTPTS,{fades}[w{k}];")
+    source = "".join(labels) + "".join(f"[w{k}]" for k in range(len(starts)))
+    return inputs, f"{source}concat=n={len(starts)}:v=0:a=1,"
+
+
+def test_within_window(end: float, block: float, seconds: float) -> bool:
+    """True if the `block`-second loudness block ending at `end` (s, the ebur128
+    frame time of the concatenated windows of `seconds`) lies inside one window."""
+    k = (end - _EPS) // seconds
+    return end - block >= k * seconds - _EPS
+
+
+class WindowLoudness:
+    """Momentary loudness energies per sampled window, from the ebur128 frame lines.
+
+    Blocks that straddle two windows (the joins of the concatenation) are left out.
+    """
+
+    def __init__(self, windows: int, seconds: float):
+        self.seconds = seconds
+        self.energies = [[] for _ in range(windows)]
+
+    def feed(self, line: str):
+        if " M:" not in line:
+            return
+        t = _RE_FRAME_T.search(line)
+        m = _RE_FRAME_M.search(line)
+        if not t or not m:
+            return
+        end = float(t.group(1))
+        k = int((end - _EPS) // self.seconds)
+        if k >= len(self.energies) or not test_within_window(end, _M_BLOCK, self.seconds):
+            return
+        lufs = float(m.group(1))
+        if lufs > _ABSOLUTE_GATE:
+            self.energies[k].append(10.0 ** ((lufs + 0.691) / 10.0))
+
+    def get_bound(self, duration: float) -> Optional[float]:
+        """Half-width (LU) of a 95 % interval on LUFS_I: ratio-estimator standard error
+        of the mean gated block energy across windows, with the finite-population
+        correction for the share of the file that was sampled, at least _BOUND_FLOOR.
+        None without two audible windows."""
+        n = len(self.energies)
+        audible = [e for window in self.energies for e in window]
+        if n < 2 or not audible:
+            return None
+        gate = _RELATIVE_GATE * sum(audible) / len(audible)
+        sums = [sum(e for e in window if e > gate) for window in self.energies]
+        counts = [sum(1 for e in window if e > gate) for window in self.energies]
+        total = sum(counts)
+        if sum(1 for c in counts if c) < 2:
+            return None
+        ratio = sum(sums) / total
+        resid = sum((y - ratio * c) ** 2 for y, c in zip(sums, counts)) / (n - 1)
+        sampled = min(1.0, n * self.seconds / duration)
+        se = math.sqrt((1.0 - sampled) * resid / n) / (total / n)
+        return round(max(_BOUND_FLOOR, 10.0 / math.log(10.0) * _Z95 * se / ratio), 2)
@@ -0,0 +1,278 @@
+"""--serve: a long-running HTTP service that measures files on request.
+
+Endpoints (JSON in and out, unless noted):
+
+    POST /jobs                {"Paths": [file or folder, ...]} -> 202, the job's status
+    GET  /jobs                status of every job kept, newest first
+    GET  /jobs/<id>           {"Id", "Status", "Paths", "Submitted", "Started", "Finished",
+                               "Done", "Total", "Error"}; Status is queued, running,
+                               done or failed
+    GET  /jobs/<id>/results   {"Id", "Files", "Pairs", "DuplicateGroups", "Summary"}
+                              (409 until the job is done)
+    GET  /jobs/<id>/report    the HTML report (text/html)
+    GET  /health              {"Status", "Queued", "Running", "Ffmpeg", "Cache"}
+
+Jobs run one at a time, in order, on a runner thread that keeps the measurement
+cache open (a SQLite connection belongs to the thread that opened it) and the
+analysis process pool alive between jobs. With a token, every request needs an
+"Authorization: Bearer <token>" header.
+"""
+
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+from .dedup import expand_duplicate_metrics, find_duplicate_groups
+from .discovery import scan_media_files
+from .engine import AnalysisPool, analyse_files
+from .pairs import DEFAULT_PAIR_SELECTION
+from .report import get_reference_models, new_sound_report_data, new_sound_report_html
+
+# Finished jobs kept for their results (the oldest go first), and jobs waiting.
+MAX_JOBS_KEPT = 100
+MAX_QUEUED_JOBS = 100
+
+# Largest accepted request body.
+MAX_REQUEST = 1 << 20
+
+
+class _Job:
+    def __init__(self, paths: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.paths = paths
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = 0
+        self.total = None
+        self.error = None
+        self.report = None  # new_sound_report_data, once done
+
+    def get_status(self) -> dict:
+        return {"Id": self.id, "Status": self.status, "Paths": self.paths, "Submitted": self.submitted,
+                "Started": self.started, "Finished": self.finished, "Done": self.done, "Total": self.total,
+                "Error": self.error}
+
+
+class AnalysisService:
+    """Job queue and runner behind the HTTP endpoints (see module doc).
+
+    `open_cache()` returns the MeasurementCache (called on the runner thread;
+    None for no cache). `scan_options` go to discovery.scan_media_files for
+    folders, `analysis_options` (backend, timeout, sample...) to analyse_files.
+    """
+
+    def __init__(self, jobs: int, ffmpeg_version: str, open_cache: Optional[Callable] = None,
+                 dedup: str = "bytes", pair_selection: str = DEFAULT_PAIR_SELECTION, scan_options: Optional[dict] = None,
+                 analysis_options: Optional[dict] = None, on_event: Optional[Callable[[str], None]] = None):
+        self.jobs = jobs
+        self.ffmpeg_version = ffmpeg_version
+        self.dedup = dedup
+        self.pair_selection = pair_selection
+        self.scan_options = scan_options or {}
+        self.analysis_options = analysis_options or {}
+        self.on_event = on_event or (lambda message: None)
+        self.cache_path = None
+        self._open_cache = open_cache
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closing = threading.Event()
+        self._pool = AnalysisPool(jobs)
+        self._runner = threading.Thread(target=self._run, daemon=True)
+        self._runner.start()
+
+    def submit(self, paths: List[str]) -> _Job:
+        """Queue a job for `paths` (files and folders, which must exist).
+        Raises ValueError for bad paths, OverflowError when the queue is full."""
+        if not isinstance(paths, list) or not paths or not all(isinstance(p, str) and p for p in paths):
+            raise ValueError("'Paths' must be a non-empty list of paths")
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            raise ValueError(f"not found: {', '.join(missing)}")
+        job = _Job([os.path.realpath(p) for p in paths])
+        with self._lock:
+            if sum(1 for j in self._jobs.values() if j.status == "queued") >= MAX_QUEUED_JOBS:
+                raise OverflowError(f"{MAX_QUEUED_JOBS} jobs already queued")
+            self._jobs[job.id] = job
+            finished = [j.id for j in self._jobs.values() if j.finished is not None]
+            for job_id in finished[:max(0, len(finished) - MAX_JOBS_KEPT)]:
+                del self._jobs[job_id]
+        self._queue.put(job)
+        self.on_event(f"Job {job.id} queued: {', '.join(job.paths)}")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[_Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self) -> List[_Job]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def get_health(self) -> dict:
+        jobs = self.get_jobs()
+        return {"Status": "ok", "Queued": sum(1 for j in jobs if j.status == "queued"),
+                "Running": sum(1 for j in jobs if j.status == "running"),
+                "Ffmpeg": self.ffmpeg_version, "Cache": self.cache_path}
+
+    def get_report_html(self, job: _Job) -> str:
+        return new_sound_report_html(", ".join(job.paths), job.report, f"/jobs/{job.id}/report",
+                                     get_reference_models())
+
+    def close(self):
+        """Stop after the running job; queued jobs are dropped."""
+        self._closing.set()
+        self._queue.put(None)
+        self._runner.join()
+
+    def _run(self):
+        cache = self._open_cache() if self._open_cache else None
+        self.cache_path = cache.path if cache is not None else None
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None or self._closing.is_set():
+                    return
+                self._run_job(job, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+            self._pool.close()
+
+    def _run_job(self, job: _Job, cache):
+        job.status = "running"
+        job.started = time.time()
+
+        def _progress(done, total, path, m):
+            job.done = done
+
+        try:
+            stats = {}
+            for p in job.paths:
+                if os.path.isdir(p):
+                    stats.update(scan_media_files([p], **self.scan_options))
+                else:
+                    stats[p] = os.stat(p)
+            files = sorted(stats)
+            if not files:
+                raise RuntimeError("No supported files found")
+            groups = find_duplicate_groups(files, mode=self.dedup, jobs=self.jobs, cache=cache, stats=stats)
+            duplicates = {p for g in groups for p in g["Paths"][1:]}
+            representatives = [p for p in files if p not in duplicates]
+            job.total = len(representatives)
+            t0 = time.perf_counter()
+            results = analyse_files(representatives, jobs=self.jobs, on_result=_progress, cache=cache,
+                                    stats=stats, pool=self._pool, **self.analysis_options)
+            elapsed = time.perf_counter() - t0
+            metrics = expand_duplicate_metrics(files, groups, dict(zip(representatives, results)), stats)
+            job.report = new_sound_report_data(metrics, groups, pair_selection=self.pair_selection,
+                                               elapsed=elapsed)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        job.finished = time.time()
+        took = job.finished - job.started
+        if job.error:
+            self.on_event(f"Job {job.id} failed after {took:.1f} s: {job.error}")
+        else:
+            self.on_event(f"Job {job.id} done: {len(job.report['Metrics'])} file(s) in {took:.1f} s")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "LoudScan"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # job events are reported by the service instead
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, obj):
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {"Error": message})
+
+    def _test_authorized(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        given = self.headers.get("Authorization", "")
+        if hmac.compare_digest(given.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return True
+        self._send_error(HTTPStatus.UNAUTHORIZED, "missing or wrong token")
+        return False
+
+    def do_GET(self):
+        if not self._test_authorized():
+            return
+        service: AnalysisService = self.server.service
+        parts = [p for p in self.path.split("?", 1)[0].split("/") if p]
+        if parts == ["health"]:
+            return self._send_json(HTTPStatus.OK, service.get_health())
+        if parts == ["jobs"]:
+            return self._send_json(HTTPStatus.OK, [j.get_status() for j in service.get_jobs()])
+        job = service.get_job(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+        if job is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, f"no such job or endpoint: {self.path}")
+        if len(parts) == 2:
+            return self._send_json(HTTPStatus.OK, job.get_status())
+        if parts[2] not in ("results", "report"):
+            return self._send_error(HTTPStatus.NOT_FOUND, f"no such endpoint: {self.path}")
+        if job.status != "done":
+            return self._send_error(HTTPStatus.CONFLICT, f"job {job.id} is {job.status}"
+                                    + (f": {job.error}" if job.error else ""))
+        if parts[2] == "report":
+            return self._send(HTTPStatus.OK, service.get_report_html(job).encode("utf-8"), "text/html; charset=utf-8")
+        report = job.report
+        self._send_json(HTTPStatus.OK, {"Id": job.id, "Files": report["Metrics"], "Pairs": report["Pairs"],
+                                        "DuplicateGroups": report["DuplicateGroups"], "Summary": report["Summary"]})
+
+    def do_POST(self):
+        if not self._test_authorized():
+            return
+        if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+            return self._send_error(HTTPStatus.NOT_FOUND, f"no such endpoint: {self.path}")
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # the body, if any, is left unread
+            return self._send_error(HTTPStatus.BAD_REQUEST, "missing or invalid Content-Length")
+        if length > MAX_REQUEST:
+            self.close_connection = True
+            return self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"request over {MAX_REQUEST} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+            job = self.server.service.submit(body.get("Paths") if isinstance(body, dict) else None)
+        except ValueError as e:
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+        except OverflowError as e:
+            return self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        self._send_json(HTTPStatus.ACCEPTED, job.get_status())
+
+
+def new_service_server(address, service: AnalysisService, token: Optional[str] = None) -> ThreadingHTTPServer:
+    """HTTP server for `service` bound to `address` (host, port); call serve_forever()."""
+    server = ThreadingHTTPServer(address, _Handler)
+    server.daemon_threads = True
+    server.service = service
+    server.token = token
+    return server
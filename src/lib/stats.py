@@ -1,42 +1,129 @@
 import html
 import math
+from bisect import bisect_right
 from typing import List, Optional
 
 
-def get_median(values: List[float]) -> Optional[float]:
-    if not values:
-        return None
-    sorted_vals = sorted(values)
-    n = len(sorted_vals)
-    mid = n // 2
-    if n % 2 == 1:
-        return sorted_vals[mid]
-    return (sorted_vals[mid - 1] + sorted_vals[mid]) / 2.0
+class RunningStats:
+    """One-pass count / mean / variance (Welford); O(1) memory."""
 
+    __slots__ = ("count", "mean", "_m2")
 
-def get_stddev(values: List[float]) -> float:
-    n = len(values)
-    if n < 2:
-        return 0.0
-    mean = sum(values) / n
-    variance = sum((x - mean) ** 2 for x in values) / (n - 1)
-    return math.sqrt(variance)
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, x: float):
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self._m2 += d * (x - self.mean)
+
+    def get_stddev(self) -> float:
+        """Sample standard deviation (0.0 below two values)."""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(max(0.0, self._m2 / (self.count - 1)))
+
+
+class StreamingQuantiles:
+    """Median of a stream from a sparse histogram of `resolution`-wide bins.
+
+    Memory grows with the number of distinct bins, not values: dB metrics span a
+    few hundred dB, so at most a few hundred thousand bins at 0.001 dB and usually
+    far fewer. The median is within resolution / 2 of the exact one, and exact
+    for values that are multiples of the resolution (ffmpeg prints 0.1 dB steps).
+    """
+
+    def __init__(self, resolution: float = 0.001):
+        self._scale = round(1.0 / resolution)
+        self._bins = {}
+        self.count = 0
+
+    def push(self, x: float):
+        k = round(x * self._scale)
+        self._bins[k] = self._bins.get(k, 0) + 1
+        self.count += 1
+
+    def _get_ranked(self, ranks: List[int]) -> List[int]:
+        """Bins holding the values of the given 0-based ranks (ascending ranks)."""
+        out = []
+        seen = 0
+        it = iter(ranks)
+        r = next(it, None)
+        for k in sorted(self._bins):
+            seen += self._bins[k]
+            while r is not None and r < seen:
+                out.append(k)
+                r = next(it, None)
+            if r is None:
+                break
+        return out
+
+    def get_median(self) -> Optional[float]:
+        if not self.count:
+            return None
+        n = self.count
+        k_lo, k_hi = self._get_ranked([(n - 1) // 2, n // 2])
+        return (k_lo + k_hi) / (2 * self._scale) if k_lo != k_hi else k_lo / self._scale
+
+
+# Values a file needs to be compared with the others (stats and pairs).
+COMPARED_METRICS = ("LUFS_I", "TruePeak_dBTP", "LRA")
+
+# Metrics summarised in report["Stats"] (mean, median, std over the OK files).
+STATS_METRICS = ["LUFS_I", "LUFS_M", "LUFS_S", "TruePeak_dBTP", "LRA", "Peak_dBFS", "RMS_dBFS"]
+
+
+def test_measured(m: dict) -> bool:
+    """True if `m` has every COMPARED_METRICS value (None and NaN count as missing)."""
+    for k in COMPARED_METRICS:
+        v = m.get(k)
+        if v is None or v != v:
+            return False
+    return True
+
+
+class MetricStats:
+    """Running mean / median / std for several metrics, fed one metrics dict at a time.
+
+    Missing (None or NaN) values are skipped per metric. get_stats() returns the report's
+    {metric: {"mean", "median", "std"}} schema and can be called at any point.
+    """
+
+    def __init__(self, keys: List[str], resolution: float = 0.001):
+        self.keys = list(keys)
+        self._running = {k: RunningStats() for k in self.keys}
+        self._quantiles = {k: StreamingQuantiles(resolution) for k in self.keys}
+
+    def push(self, m: dict):
+        for k in self.keys:
+            v = m.get(k)
+            if v is not None and v == v:
+                v = float(v)
+                self._running[k].push(v)
+                self._quantiles[k].push(v)
+
+    def get_stats(self) -> dict:
+        out = {}
+        for k in self.keys:
+            rs = self._running[k]
+            if not rs.count:
+                out[k] = {"mean": None, "median": None, "std": None}
+            else:
+                out[k] = {"mean": rs.mean, "median": self._quantiles[k].get_median(), "std": rs.get_stddev()}
+        return out
+
+
+# Pair similarity levels, from closest to furthest, and the ΔMax (dB) upper bound of
+# each level but the last.
+DIFF_LEVELS = ["identical", "negligible", "slight", "moderate", "high", "extreme"]
+DIFF_LEVEL_BOUNDS = (0.10, 0.50, 1.50, 3.00, 6.00)
 
 
 def get_diff_category(delta_lufs: float, delta_tp: float) -> str:
-    d = max(abs(delta_lufs), abs(delta_tp))
-    if d < 0.10:
-        return "identical"
-    elif d < 0.50:
-        return "negligible"
-    elif d < 1.50:
-        return "slight"
-    elif d < 3.00:
-        return "moderate"
-    elif d < 6.00:
-        return "high"
-    else:
-        return "extreme"
+    return DIFF_LEVELS[bisect_right(DIFF_LEVEL_BOUNDS, max(abs(delta_lufs), abs(delta_tp)))]
 
 
 def html_escape(s: str) -> str:
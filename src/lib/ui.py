@@ -24,6 +24,8 @@ def _select_folder_via_os_dialog(title: str) -> Tuple[Optional[str], Optional[st
             if not ps:
                 return None, "PowerShell not found"
 
+            ps_title = title.replace("'", "''")
+
             cmd = [
                 ps,
                 "-NoProfile",
@@ -31,7 +33,7 @@ def _select_folder_via_os_dialog(title: str) -> Tuple[Optional[str], Optional[st
                 (
                     "Add-Type -AssemblyName System.Windows.Forms; "
                     "$f = New-Object System.Windows.Forms.FolderBrowserDialog; "
-                    f"$f.Description = '{title.replace("'", "''")}'; "
+                    f"$f.Description = '{ps_title}'; "
                     "$f.ShowNewFolderButton = $false; "
                     "if ($f.ShowDialog() -eq [System.Windows.Forms.DialogResult]::OK) { "
                     "$f.SelectedPath }"
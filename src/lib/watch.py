@@ -0,0 +1,59 @@
+"""Hot-folder polling for --watch: cheap stat-based change detection, no file reads."""
+
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from .discovery import scan_media_files
+
+# (size, mtime_ns): a file whose signature is unchanged is not looked at again.
+Signature = Tuple[int, int]
+
+
+class FolderWatcher:
+    """Tells which files were added, modified or removed since the previous poll.
+
+    A new or modified file is reported only once its size and mtime are the same on
+    two consecutive polls, so a delivery still being copied in is not measured
+    half-written.
+    """
+
+    def __init__(self, folders: Iterable[str], exts: Iterable[str], **scan_options):
+        self.folders = list(folders)
+        self.exts = set(exts)
+        self.scan_options = scan_options  # see discovery.scan_media_files
+        self.known: Dict[str, Signature] = {}
+        self.stats: Dict[str, os.stat_result] = {}  # of the last scan
+        self._pending: Dict[str, Signature] = {}
+
+    def _snapshot(self) -> Dict[str, Signature]:
+        self.stats = scan_media_files(self.folders, self.exts, **self.scan_options)
+        return {p: (st.st_size, st.st_mtime_ns) for p, st in self.stats.items()}
+
+    def prime(self) -> List[str]:
+        """Take the folders as they are now as the starting point; returns their files, sorted."""
+        self.known = self._snapshot()
+        self._pending = {}
+        return sorted(self.known)
+
+    def poll(self) -> Tuple[List[str], List[str]]:
+        """(added or modified and now stable, removed) since the last poll, each sorted."""
+        snapshot = self._snapshot()
+        changed = []
+        pending = {}
+        for path, sig in snapshot.items():
+            if self.known.get(path) == sig:
+                continue
+            if self._pending.get(path) == sig:
+                self.known[path] = sig
+                changed.append(path)
+            else:
+                pending[path] = sig
+        self._pending = pending
+
+        removed = [p for p in self.known if p not in snapshot]
+        for p in removed:
+            del self.known[p]
+        return sorted(changed), sorted(removed)
+
+    def get_files(self) -> List[str]:
+        return sorted(self.known)
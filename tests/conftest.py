@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its modules as `lib.*` from src/ (see src/__main__.py).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
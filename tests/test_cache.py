@@ -0,0 +1,87 @@
+"""Measurement cache (lib/cache.py): what misses it, and --refresh-cache."""
+
+import os
+
+import pytest
+
+from lib import engine
+from lib.cache import MeasurementCache
+
+FFMPEG = "ffmpeg version 6.1"
+SETTINGS = "recipe;v2"
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"\0" * 64)
+    return str(path)
+
+
+def _open(tmp_path, ffmpeg=FFMPEG, settings=SETTINGS) -> MeasurementCache:
+    return MeasurementCache(str(tmp_path / "cache.sqlite3"), ffmpeg, settings)
+
+
+def _store(tmp_path, media):
+    cache = _open(tmp_path)
+    cache.put(media, os.stat(media), {"LUFS_I": -23.0, "Error": None})
+    cache.close()
+
+
+def test_unchanged_file_hits(tmp_path, media):
+    _store(tmp_path, media)
+    cache = _open(tmp_path)
+    try:
+        assert cache.get(media, os.stat(media)) == {"LUFS_I": -23.0, "Error": None}
+    finally:
+        cache.close()
+
+
+def test_changed_size_or_mtime_misses(tmp_path, media):
+    _store(tmp_path, media)
+    cache = _open(tmp_path)
+    try:
+        st = os.stat(media)
+        os.utime(media, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        assert cache.get(media, os.stat(media)) is None
+        os.utime(media, ns=(st.st_atime_ns, st.st_mtime_ns))
+        with open(media, "ab") as f:
+            f.write(b"\0")
+        os.utime(media, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert cache.get(media, os.stat(media)) is None
+    finally:
+        cache.close()
+
+
+@pytest.mark.parametrize("ffmpeg, settings", [("ffmpeg version 7.0", SETTINGS), (FFMPEG, "recipe;v3")])
+def test_other_ffmpeg_or_settings_miss(tmp_path, media, ffmpeg, settings):
+    _store(tmp_path, media)
+    cache = _open(tmp_path, ffmpeg, settings)
+    try:
+        assert cache.get(media, os.stat(media)) is None
+    finally:
+        cache.close()
+
+
+def test_refresh_skips_lookup_but_stores(tmp_path, media, monkeypatch):
+    calls = []
+
+    def _measure(path, *args):
+        calls.append(path)
+        return {"FileName": os.path.basename(path), "Path": path, "LUFS_I": -20.0 - len(calls),
+                "WallSeconds": 1.0, "Error": None}
+
+    monkeypatch.setattr(engine, "get_audio_stream_info", lambda path: None)
+    monkeypatch.setattr(engine, "_analyse_one", _measure)
+    cache = _open(tmp_path)
+    try:
+        assert engine.analyse_files([media], jobs=1, cache=cache)[0]["LUFS_I"] == -21.0
+        hit = engine.analyse_files([media], jobs=1, cache=cache)[0]
+        assert hit["LUFS_I"] == -21.0 and hit["WallSeconds"] is None
+        assert len(calls) == 1
+
+        assert engine.analyse_files([media], jobs=1, cache=cache, refresh_cache=True)[0]["LUFS_I"] == -22.0
+        assert len(calls) == 2
+        assert cache.get(media, os.stat(media))["LUFS_I"] == -22.0
+    finally:
+        cache.close()
@@ -0,0 +1,60 @@
+"""--dedup (lib/dedup.py): which files are grouped as one."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from lib import dedup
+from lib.cache import MeasurementCache
+
+
+def _write(path, data: bytes) -> str:
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_same_size_other_bytes_are_not_grouped(tmp_path):
+    a = _write(tmp_path / "a.wav", b"\1" * 4096)
+    b = _write(tmp_path / "b.wav", b"\2" * 4096)
+    c = _write(tmp_path / "c.wav", b"\1" * 4096)
+    d = _write(tmp_path / "d.wav", b"\1" * 4095)
+    assert dedup.find_duplicate_groups([a, b, c, d], mode="bytes") == [{"Kind": "bytes", "Paths": [a, c]}]
+    assert dedup.find_duplicate_groups([a, b, c, d], mode="off") == []
+
+
+def test_cached_hash_is_reused(tmp_path, monkeypatch):
+    paths = [_write(tmp_path / f"{k}.wav", b"\1" * 4096) for k in "ab"]
+    cache = MeasurementCache(str(tmp_path / "cache.sqlite3"), "test-ffmpeg", "recipe;v2")
+    try:
+        hashed = []
+        real = dedup.get_file_hash
+        monkeypatch.setattr(dedup, "get_file_hash", lambda p: hashed.append(p) or real(p))
+        expected = [{"Kind": "bytes", "Paths": paths}]
+        assert dedup.find_duplicate_groups(paths, cache=cache) == expected
+        assert sorted(hashed) == paths
+
+        hashed.clear()
+        assert dedup.find_duplicate_groups(paths, cache=cache) == expected
+        assert hashed == []
+
+        with open(paths[1], "r+b") as f:  # same size, other content, newer mtime
+            f.write(b"\2")
+        os.utime(paths[1], ns=(os.stat(paths[1]).st_atime_ns, os.stat(paths[0]).st_mtime_ns + 10**9))
+        assert dedup.find_duplicate_groups(paths, cache=cache) == []
+        assert hashed == [paths[1]]
+    finally:
+        cache.close()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+def test_stream_mode_groups_across_containers(tmp_path):
+    m4a, mkv, other = (str(tmp_path / name) for name in ("a.m4a", "a.mkv", "b.m4a"))
+    for path, freq in ((m4a, 1000), (other, 440)):
+        subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"sine=f={freq}:d=2",
+                        "-c:a", "aac", "-b:a", "96k", path], check=True)
+    subprocess.run(["ffmpeg", "-v", "error", "-i", m4a, "-c", "copy", mkv], check=True)
+    paths = [m4a, mkv, other]
+    assert dedup.find_duplicate_groups(paths, mode="bytes") == []
+    assert dedup.find_duplicate_groups(paths, mode="stream") == [{"Kind": "stream", "Paths": [m4a, mkv]}]
@@ -0,0 +1,64 @@
+"""Media file discovery (lib/discovery.py) on a temporary folder tree."""
+
+import os
+
+import pytest
+
+from lib import discovery
+from lib.discovery import scan_media_files
+
+
+def _touch(path, data: bytes = b"\0" * 16) -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_symlink_loop_ends_and_lists_each_file_once(tmp_path, jobs):
+    x = _touch(tmp_path / "a" / "x.wav")
+    y = _touch(tmp_path / "b" / "y.flac")
+    try:
+        os.symlink(tmp_path, tmp_path / "a" / "up")       # a loop back to the root
+        os.symlink(tmp_path / "a", tmp_path / "b" / "a2")  # a second path to a
+        os.symlink(tmp_path / "c", tmp_path / "gone")      # a broken link
+    except (OSError, NotImplementedError):
+        pytest.skip("cannot create symlinks here")
+    assert list(scan_media_files([str(tmp_path)], jobs=jobs)) == [x, y]
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_unreadable_folder_is_skipped(tmp_path, monkeypatch, jobs):
+    ok = _touch(tmp_path / "ok" / "a.wav")
+    locked = tmp_path / "locked"
+    _touch(locked / "b.wav")
+    real = os.scandir
+
+    def _scandir(path):
+        if os.path.samefile(path, locked):
+            raise PermissionError(13, "Permission denied", str(path))
+        return real(path)
+
+    monkeypatch.setattr(discovery.os, "scandir", _scandir)  # chmod 000 does not stop root
+    assert list(scan_media_files([str(tmp_path)], jobs=jobs)) == [ok]
+
+
+def test_extension_filter(tmp_path):
+    kept = [_touch(tmp_path / name) for name in ("a.wav", "b.FLAC", "c.m4a")]
+    for name in ("notes.txt", "d.wav.bak", "wav", "e.mp3/f.txt"):
+        _touch(tmp_path / name)
+    (tmp_path / "g.wav").mkdir()
+    assert list(scan_media_files([str(tmp_path)])) == kept
+    assert list(scan_media_files([str(tmp_path)], exts={".flac"})) == [kept[1]]
+
+
+def test_stat_map_matches_os_stat(tmp_path):
+    paths = [_touch(tmp_path / "x" / f"{k}.wav", b"\0" * (100 * k)) for k in range(1, 4)]
+    os.utime(paths[0], ns=(1_000_000_000, 1_234_567_891_000))
+    found = scan_media_files([str(tmp_path)])
+    assert list(found) == paths
+    for path, st in found.items():
+        real = os.stat(path)
+        assert (st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev) == \
+               (real.st_size, real.st_mtime_ns, real.st_ino, real.st_dev)
@@ -0,0 +1,126 @@
+"""Coordinator and workers (lib/distributed.py) on 127.0.0.1, with a stub measurement.
+
+Each worker runs in its own process group, so that killing it also kills its
+analysis processes, as a machine going down would.
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from lib import distributed
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "killpg"), reason="needs POSIX process groups")
+
+FFMPEG = "test-ffmpeg"
+SLOTS = 2
+
+
+def _stub_measure(path, backend, size, info, timeout, retries, sample=None):
+    """Stands in for engine._analyse_one in the workers' analysis processes."""
+    time.sleep(0.05 if os.path.basename(path) == "fast.wav" else 0.5)
+    return {"FileName": os.path.basename(path), "Path": path, "LUFS_I": -23.0, "TruePeak_dBTP": -1.0,
+            "LRA": 5.0, "Error": None, "Worker": os.getppid()}
+
+
+def _run_stub_worker(address):
+    os.setpgrp()
+    distributed._analyse_one = _stub_measure
+    distributed.run_worker(tuple(address), SLOTS, FFMPEG)
+
+
+def _kill(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+@pytest.fixture
+def cluster():
+    """A Coordinator and two workers whose Hello is waiting for the next measure
+    call: (coordinator, {worker pid: Process})."""
+    coordinator = distributed.Coordinator(("127.0.0.1", 0), FFMPEG)
+    context = multiprocessing.get_context("spawn")
+    workers = {}
+    try:
+        for _ in range(2):
+            proc = context.Process(target=_run_stub_worker, args=(coordinator.address,))
+            proc.start()
+            workers[proc.pid] = proc
+        deadline = time.monotonic() + 30
+        while coordinator._events.qsize() < len(workers):
+            assert time.monotonic() < deadline, "workers did not connect"
+            time.sleep(0.05)
+        yield coordinator, workers
+    finally:
+        for pid, proc in workers.items():
+            _kill(pid)
+            proc.join(10)
+        coordinator.close()
+
+
+def _measure(coordinator, paths, finish):
+    """coordinator.measure on a thread, failing the test instead of hanging."""
+    errors = []
+
+    def _run():
+        try:
+            coordinator.measure(paths, list(range(len(paths))), "ffmpeg", finish)
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive(), "measure did not return"
+    assert not errors, errors
+
+
+def _get_peer_pid(peer) -> int:
+    return int(peer.name.rsplit(":", 1)[1])
+
+
+def test_every_result_is_merged(cluster):
+    coordinator, workers = cluster
+    paths = [f"/media/f{k:02d}.wav" for k in range(12)]
+    results = {}
+    _measure(coordinator, paths, results.__setitem__)
+
+    assert sorted(results) == list(range(len(paths)))
+    for idx, m in results.items():
+        assert m["Error"] is None
+        assert m["Path"] == paths[idx] and m["FileName"] == os.path.basename(paths[idx])
+    assert {m["Worker"] for m in results.values()} == set(workers)
+
+
+def test_lost_worker_jobs_go_to_another(cluster):
+    coordinator, workers = cluster
+    paths = ["/media/fast.wav"] + [f"/media/f{k:02d}.wav" for k in range(11)]
+    results = {}
+    killed = {}
+
+    def _finish(idx, m):
+        results[idx] = m
+        if killed or not m.get("Worker"):
+            return
+        # First result: kill the other worker, its jobs still about 0.45 s from done.
+        victim = next(p for p in coordinator._peers if _get_peer_pid(p) != m["Worker"])
+        killed["Pid"] = _get_peer_pid(victim)
+        killed["InFlight"] = sorted(victim.jobs.values())
+        _kill(killed["Pid"])
+
+    _measure(coordinator, paths, _finish)
+
+    assert killed["InFlight"], "the killed worker had nothing in flight"
+    survivor = next(pid for pid in workers if pid != killed["Pid"])
+    assert sorted(results) == list(range(len(paths)))
+    assert all(m["Error"] is None for m in results.values())
+    for idx in killed["InFlight"]:
+        assert results[idx]["Worker"] == survivor
+    workers[killed["Pid"]].join(10)
+    assert not workers[killed["Pid"]].is_alive()
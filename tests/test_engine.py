@@ -0,0 +1,46 @@
+"""Error rows from the analysis engine (lib/engine.py) keep what the attempt cost."""
+
+import errno
+import time
+
+from lib import engine
+from lib.ffmpeg_utils import AnalysisTimeout
+from lib.report import get_throughput_summary
+
+INFO = {"Duration": 600.0, "HasAudio": True, "Codec": "pcm_s16le", "Channels": 2, "SampleRate": 48000}
+
+
+def test_timed_out_file_keeps_wall_time_and_duration(tmp_path, monkeypatch):
+    path = tmp_path / "stuck.wav"
+    path.write_bytes(b"\0" * 100)
+
+    def _stuck(path, *args):
+        time.sleep(0.05)
+        raise AnalysisTimeout(f"Analysis timed out after 0.05 s: {path}")
+
+    monkeypatch.setattr(engine, "get_loudness_from_file", _stuck)
+    m = engine._analyse_one(str(path), "ffmpeg", None, INFO, 0.05, 0)
+    assert m["Error"].startswith("Analysis timed out")
+    assert m["WallSeconds"] >= 0.05
+    assert m["Duration"] == 600.0
+    assert m["SizeBytes"] == 100
+
+    throughput = get_throughput_summary([m])
+    assert throughput["SlowestFiles"] == [m]
+    assert throughput["MeasuredBytes"] == 0 and throughput["AudioSeconds"] == 0
+
+
+def test_wall_time_covers_every_retry(tmp_path, monkeypatch):
+    calls = []
+
+    def _flaky(path, *args):
+        calls.append(path)
+        time.sleep(0.02)
+        raise OSError(errno.EIO, "Input/output error")
+
+    monkeypatch.setattr(engine, "get_loudness_from_file", _flaky)
+    monkeypatch.setattr(engine, "RETRY_DELAY", 0.0)
+    m = engine._analyse_one(str(tmp_path / "gone.wav"), "ffmpeg", None, None, None, 2)
+    assert len(calls) == 3
+    assert m["WallSeconds"] >= 0.06
+    assert m["Duration"] is None and m["SizeBytes"] == 0
@@ -0,0 +1,38 @@
+"""Columnar exports (lib/export.py): missing values survive the round trip."""
+
+import math
+
+import pytest
+
+from lib.export import read_npz_text, write_columnar_exports
+from lib.report import new_sound_report_data
+
+
+def _new_report():
+    metrics = [{"FileName": f"f{k}.wav", "Path": f"/m/f{k}.wav", "Ext": "wav", "SizeBytes": 1000,
+                "LUFS_I": -20.0 - k, "TruePeak_dBTP": -1.0, "LRA": 5.0, "Error": None,
+                "Codec": "pcm_s16le" if k else None} for k in range(3)]
+    metrics.append({"FileName": "bad.wav", "Path": "/m/bad.wav", "Ext": "wav", "SizeBytes": 10,
+                    "LUFS_I": None, "TruePeak_dBTP": None, "LRA": None, "Error": "boom", "Codec": ""})
+    return new_sound_report_data(metrics, pair_selection="all")
+
+
+def test_npz_keeps_none_apart_from_empty_text(tmp_path):
+    np = pytest.importorskip("numpy")
+    write_columnar_exports(str(tmp_path / "r"), _new_report(), ["npz"])
+    with np.load(tmp_path / "r.npz") as d:
+        by_name = dict(zip(read_npz_text(d, "files.FileName"), zip(read_npz_text(d, "files.Codec"),
+                                                                  read_npz_text(d, "files.Error"))))
+        assert math.isnan(d["files.LUFS_I"][read_npz_text(d, "files.FileName").index("bad.wav")])
+    assert by_name == {"f0.wav": (None, None), "f1.wav": ("pcm_s16le", None),
+                       "f2.wav": ("pcm_s16le", None), "bad.wav": ("", "boom")}
+
+
+def test_parquet_missing_values_are_null(tmp_path):
+    pytest.importorskip("numpy")
+    pq = pytest.importorskip("pyarrow.parquet")
+    write_columnar_exports(str(tmp_path / "r"), _new_report(), ["parquet"])
+    files = pq.read_table(tmp_path / "r_files.parquet").to_pydict()
+    rows = dict(zip(files["FileName"], zip(files["Codec"], files["Error"], files["LUFS_I"])))
+    assert rows["f0.wav"] == (None, None, -20.0)
+    assert rows["bad.wav"] == ("", "boom", None)
@@ -0,0 +1,42 @@
+"""--resume journal (lib/journal.py): what a resumed run takes back."""
+
+import pytest
+
+from lib.ffmpeg_utils import COST_FIELDS
+from lib.journal import JobJournal, new_journal_header, read_journal
+
+
+def _write_journal(tmp_path, folders):
+    media = tmp_path / "a.wav"
+    media.write_bytes(b"\0" * 64)
+    path = str(tmp_path / "journal.jsonl")
+    journal = JobJournal(path, new_journal_header("ffmpeg", "recipe;v2", folders))
+    journal.append(str(media), {"LUFS_I": -23.0, "WallSeconds": 4.0, "CpuUserSeconds": 3.0,
+                                "RealtimeFactor": 50.0, "Duration": 200.0, "Error": None})
+    journal.append(str(tmp_path / "b.wav"), {"LUFS_I": None, "Error": "boom"})
+    journal.close()
+    return path, str(media)
+
+
+def test_resumed_entries_cost_nothing(tmp_path):
+    path, media = _write_journal(tmp_path, ["/music", "/podcasts"])
+    done = read_journal(path, new_journal_header("ffmpeg", "recipe;v2", ["/podcasts", "/music"]))
+    assert list(done) == [media]
+    m = done[media]
+    assert m["LUFS_I"] == -23.0 and m["Duration"] == 200.0
+    assert all(m[k] is None for k in COST_FIELDS)
+
+
+def test_other_folders_or_settings_are_refused(tmp_path):
+    path, _ = _write_journal(tmp_path, ["/music"])
+    with pytest.raises(ValueError, match="other folders"):
+        read_journal(path, new_journal_header("ffmpeg", "recipe;v2", ["/music", "/podcasts"]))
+    with pytest.raises(ValueError, match="other analysis settings"):
+        read_journal(path, new_journal_header("numpy", "other;v1", ["/music"]))
+
+
+def test_changed_file_is_measured_again(tmp_path):
+    path, media = _write_journal(tmp_path, ["/music"])
+    with open(media, "ab") as f:
+        f.write(b"\0")
+    assert read_journal(path, new_journal_header("ffmpeg", "recipe;v2", ["/music"])) == {}
@@ -0,0 +1,138 @@
+"""Pair statistics (lib/pairs.py, both engines) against the original all-pairs loop."""
+
+import math
+import random
+from itertools import combinations
+
+import pytest
+
+from lib import pairs, stats
+from lib.report import new_sound_report_data
+from lib.stats import DIFF_LEVELS, get_diff_category
+
+N_FILES = 61
+
+
+def _new_metrics(seed: int = 7) -> list:
+    """Random rows on a 0.1 dB grid (so ΔMax ties happen), with missing and NaN values."""
+    rnd = random.Random(seed)
+    metrics = []
+    for k in range(N_FILES):
+        m = {
+            "FileName": f"f{k:02d}.wav", "Path": f"/m/f{k:02d}.wav", "Ext": "wav", "SizeBytes": 1000 + k,
+            "LUFS_I": round(rnd.uniform(-30.0, -14.0), 1),
+            "TruePeak_dBTP": round(rnd.uniform(-6.0, 0.5), 1),
+            "LRA": round(rnd.uniform(2.0, 12.0), 1),
+            "Error": None,
+        }
+        if k % 9 == 4:
+            m[rnd.choice(["LUFS_I", "TruePeak_dBTP", "LRA"])] = None
+        elif k % 13 == 6:
+            m[rnd.choice(["LUFS_I", "TruePeak_dBTP", "LRA"])] = math.nan
+        metrics.append(m)
+    # A few exact duplicates of the first row: identical pairs and equal ΔMax.
+    for k in range(3):
+        metrics.append(dict(metrics[0], FileName=f"dup{k}.wav", Path=f"/m/dup{k}.wav"))
+    return metrics
+
+
+def _reference(metrics: list) -> dict:
+    """The report's pair numbers as computed before lib/pairs.py: every pair, in
+    combinations order, of the rows with all three values."""
+    ok = [m for m in metrics if all(m[k] is not None and not math.isnan(m[k])
+                                    for k in ("LUFS_I", "TruePeak_dBTP", "LRA"))]
+    rows = []
+    for a, b in combinations(ok, 2):
+        d_lufs = b["LUFS_I"] - a["LUFS_I"]
+        d_tp = b["TruePeak_dBTP"] - a["TruePeak_dBTP"]
+        d_max = max(abs(d_lufs), abs(d_tp))
+        rows.append({"A_File": a["FileName"], "B_File": b["FileName"], "dLUFS": d_lufs, "dTP": d_tp,
+                     "dMaxAbs": d_max, "Similarity": get_diff_category(d_lufs, d_tp)})
+    slight = DIFF_LEVELS.index("slight")
+    count_slight = sum(1 for p in rows if DIFF_LEVELS.index(p["Similarity"]) <= slight)
+    ratio = count_slight / len(rows)
+    worst = max(rows, key=lambda p: p["dMaxAbs"])
+    return {
+        "Rows": rows,
+        "Summary": {
+            "Pairs": len(rows),
+            "LevelCounts": {lvl: sum(1 for p in rows if p["Similarity"] == lvl) for lvl in DIFF_LEVELS},
+            "RatioSlightOrLess": ratio,
+            "MeanDelta": sum(p["dMaxAbs"] for p in rows) / len(rows),
+            "MaxDelta": worst["dMaxAbs"],
+            "GlobalSame": worst["dMaxAbs"] <= 1.5 and ratio >= 0.80,
+        },
+        "WorstPair": worst,
+    }
+
+
+def _by_delta(rows: list) -> list:
+    """Listing order of the selected pairs: largest ΔMax first, then combinations order."""
+    return [p for _, p in sorted(enumerate(rows), key=lambda e: (-e[1]["dMaxAbs"], e[0]))]
+
+
+def _expected_listing(rows: list, spec: str) -> list:
+    kind, arg = pairs.parse_pair_selection(spec)
+    if kind == "none":
+        return []
+    if kind == "all":
+        return rows
+    if kind == "top":
+        return _by_delta(rows)[:arg]
+    bound = pairs.DIFF_LEVEL_BOUNDS[arg - 1] if arg else -1.0
+    return _by_delta([p for p in rows if p["dMaxAbs"] >= bound])
+
+
+def _key(p: dict) -> tuple:
+    return p["A_File"], p["B_File"], p["dLUFS"], p["dTP"], p["dMaxAbs"], p["Similarity"]
+
+
+@pytest.fixture(params=["python", "numpy-1", "numpy-7", "numpy-last", "numpy-default"])
+def engine(request, monkeypatch):
+    """Each engine; the NumPy one with row blocks of 1 and 7 rows (the last block
+    short), of all rows but the last (which has no pair), and the default size."""
+    if request.param == "python":
+        monkeypatch.setattr(pairs, "_import_numpy", lambda: None)
+        return request.param
+    pytest.importorskip("numpy")
+    n = sum(1 for m in _new_metrics() if stats.test_measured(m))
+    rows = {"numpy-1": 1, "numpy-7": 7, "numpy-last": n - 1}.get(request.param)
+    if rows:
+        monkeypatch.setattr(pairs, "PAIR_BLOCK_CELLS", rows * n)
+    return request.param
+
+
+SELECTIONS = ["all", "none", "top:0", "top:1", "top:17", "top:100000"] + [f"min-level:{lvl}" for lvl in DIFF_LEVELS]
+
+
+@pytest.mark.parametrize("spec", SELECTIONS)
+def test_pair_summary_matches_reference(engine, spec):
+    metrics = _new_metrics()
+    ref = _reference(metrics)
+    report = new_sound_report_data(metrics, pair_selection=spec)
+    summary = report["Summary"]
+
+    for k in ("Pairs", "LevelCounts", "MaxDelta", "GlobalSame"):
+        assert summary[k] == ref["Summary"][k], k
+    assert summary["RatioSlightOrLess"] == pytest.approx(ref["Summary"]["RatioSlightOrLess"])
+    assert summary["MeanDelta"] == pytest.approx(ref["Summary"]["MeanDelta"])
+    assert _key(summary["WorstPair"]) == _key(ref["WorstPair"])
+    assert summary["PairsListed"] == len(report["Pairs"])
+    assert [_key(p) for p in report["Pairs"]] == [_key(p) for p in _expected_listing(ref["Rows"], spec)]
+
+
+def test_missing_and_nan_rows_are_errors():
+    metrics = _new_metrics()
+    report = new_sound_report_data(metrics)
+    bad = [m for m in metrics if any(m[k] is None or math.isnan(m[k]) for k in ("LUFS_I", "TruePeak_dBTP", "LRA"))]
+    assert bad
+    assert report["Summary"]["FilesErr"] == len(bad)
+    assert report["Summary"]["FilesOk"] == len(metrics) - len(bad)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3])
+def test_few_files(engine, n):
+    summary = pairs.get_pair_summary([-20.0 - k for k in range(n)], [-1.0] * n, ("all", None))
+    assert summary["Pairs"] == n * (n - 1) // 2
+    assert len(summary["Selected"]) == summary["Pairs"]
+    assert (summary["WorstPair"] is None) == (n < 2)
@@ -0,0 +1,43 @@
+"""Per-stage peak memory (lib/profiling.py), with and without tracemalloc.reset_peak."""
+
+import tracemalloc
+
+import pytest
+
+from lib.profiling import StageProfiler
+
+MB = 1024 * 1024
+
+
+def _run_stages(profiler):
+    with profiler.stage("big"):
+        block = bytearray(40 * MB)
+        del block
+    with profiler.stage("small"):
+        kept = bytearray(8 * MB)
+    return kept
+
+
+def test_stage_peaks():
+    if not hasattr(tracemalloc, "reset_peak"):
+        pytest.skip("tracemalloc.reset_peak needs Python 3.9+")
+    profiler = StageProfiler()
+    try:
+        _run_stages(profiler)
+    finally:
+        profiler.close()
+    big, small = (st["PeakMB"] for st in profiler.stages)
+    assert 40 <= big < 41
+    assert 8 <= small < 9
+
+
+def test_stage_peaks_without_reset_peak(monkeypatch):
+    monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    profiler = StageProfiler()
+    try:
+        _run_stages(profiler)
+    finally:
+        profiler.close()
+    big, small = (st["PeakMB"] for st in profiler.stages)
+    assert 40 <= big < 41
+    assert 8 <= small < 9  # below the first stage's peak: what it holds at its end
@@ -0,0 +1,52 @@
+"""--sample (lib/sampling.py): the joins between windows add nothing to the peaks and maxima."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from lib.ffmpeg_utils import LoudnessLogParser, get_loudness_from_file
+from lib.sampling import test_within_window as within_window
+
+
+def _frame(t: float, m: float, s: float) -> str:
+    return (f"[Parsed_ebur128_0 @ 0x7f] t: {t - 0.000023:.6f}   TARGET:-23 LUFS    M: {m:.1f} S: {s:.1f}"
+            f"     I: -20.0 LUFS       LRA:   0.0 LU  FTPK: -18.1 dBFS  TPK: -18.1 dBFS\n")
+
+
+@pytest.mark.parametrize("end, block, inside", [
+    (0.4, 0.4, True), (5.0, 0.4, True), (5.1, 0.4, False), (5.3, 0.4, False), (5.4, 0.4, True),
+    (3.0, 3.0, True), (5.0, 3.0, True), (7.9, 3.0, False), (8.0, 3.0, True), (10.0, 3.0, True),
+])
+def test_within_window(end, block, inside):
+    assert within_window(end - 0.000023, block, 5.0) == inside
+
+
+def test_maxima_skip_blocks_across_joins():
+    frames = [_frame(k / 10, -30.0, -32.0) for k in range(1, 101)]
+    frames[52] = _frame(5.3, -10.0, -11.0)  # M and S blocks straddle the 5 s join
+    frames[78] = _frame(7.9, -25.0, -12.0)  # M block inside window 2, S block across the join
+    whole, sampled = LoudnessLogParser(), LoudnessLogParser(5.0)
+    for line in frames:
+        whole.feed(line)
+        sampled.feed(line)
+    assert (whole.lufs_m, whole.lufs_s) == (-10.0, -11.0)
+    assert (sampled.lufs_m, sampled.lufs_s) == (-25.0, -32.0)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+                    reason="needs ffmpeg and ffprobe")
+def test_sampled_peaks_do_not_read_high(tmp_path):
+    # One level step, and a frequency whose phase jumps at every cut: joined as
+    # is, the windows read up to 2 dB of true-peak overshoot.
+    level, freq = "if(lt(t,60),0.1,0.05)", 1234.5
+    path = str(tmp_path / "step.flac")
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i",
+                    f"aevalsrc='{level}*sin(2*PI*{freq}*t)|{level}*sin(2*PI*{freq}*t)':s=48000:d=120", path],
+                   check=True)
+    full = get_loudness_from_file(path)
+    sampled = get_loudness_from_file(path, sample=(4, 5.0))
+    assert sampled["Approximate"]
+    for k in ("TruePeak_dBTP", "Peak_dBFS", "LUFS_M", "LUFS_S"):
+        assert sampled[k] <= full[k], k
+    assert abs(sampled["LUFS_I"] - full["LUFS_I"]) <= sampled["LUFS_I_Bound"] + 0.1
@@ -0,0 +1,109 @@
+"""--serve (lib/service.py): the HTTP endpoints, on 127.0.0.1."""
+
+import http.client
+import json
+import math
+import shutil
+import struct
+import threading
+import time
+import wave
+
+import pytest
+
+from lib.service import MAX_REQUEST, AnalysisService, new_service_server
+
+
+@pytest.fixture
+def server():
+    service = AnalysisService(1, "test-ffmpeg")
+    httpd = new_service_server(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+
+
+def _request(server, method, path, body=None, headers=None):
+    """(status, parsed JSON or text) of one request, failing instead of hanging."""
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    try:
+        conn.request(method, path, body, headers or {})
+        resp = conn.getresponse()
+        data = resp.read().decode("utf-8")
+        is_json = resp.getheader("Content-Type", "").startswith("application/json")
+        return resp.status, json.loads(data) if is_json else data
+    finally:
+        conn.close()
+
+
+def _write_sine(path, level: float, seconds: float = 3.0, rate: int = 48000):
+    """A stereo 1 kHz sine peaking at `level` dBFS (which reads `level` LUFS)."""
+    amp = 32767 * 10.0 ** (level / 20.0)
+    frames = bytearray()
+    for n in range(int(seconds * rate)):
+        s = int(round(amp * math.sin(2 * math.pi * 1000 * n / rate)))
+        frames += struct.pack("<hh", s, s)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(frames))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+                    reason="needs ffmpeg and ffprobe")
+def test_job_round_trip(server, tmp_path):
+    _write_sine(tmp_path / "a.wav", -20.0)
+    _write_sine(tmp_path / "b.wav", -26.0)
+    status, job = _request(server, "POST", "/jobs", json.dumps({"Paths": [str(tmp_path)]}),
+                           {"Content-Type": "application/json"})
+    assert status == 202 and job["Status"] == "queued"
+
+    deadline = time.monotonic() + 60
+    while job["Status"] in ("queued", "running"):
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.1)
+        status, job = _request(server, "GET", f"/jobs/{job['Id']}")
+        assert status == 200
+    assert job["Status"] == "done", job["Error"]
+    assert job["Done"] == job["Total"] == 2
+
+    status, results = _request(server, "GET", f"/jobs/{job['Id']}/results")
+    assert status == 200
+    levels = {m["FileName"]: m["LUFS_I"] for m in results["Files"]}
+    assert levels == {"a.wav": pytest.approx(-20.0, abs=0.2), "b.wav": pytest.approx(-26.0, abs=0.2)}
+    assert len(results["Pairs"]) == 1
+    status, html = _request(server, "GET", f"/jobs/{job['Id']}/report")
+    assert status == 200 and "a.wav" in html
+
+
+def test_oversized_body_is_refused(server):
+    status, body = _request(server, "POST", "/jobs", b"x" * (MAX_REQUEST + 1))
+    assert status == 413 and "Error" in body
+
+
+@pytest.mark.parametrize("length", ["-1", "ten", None])
+def test_bad_content_length_is_refused(server, length):
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    try:
+        conn.putrequest("POST", "/jobs")
+        if length is not None:
+            conn.putheader("Content-Length", length)
+        conn.endheaders()
+        resp = conn.getresponse()
+        assert resp.status == 400
+        assert "Content-Length" in json.loads(resp.read())["Error"]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("method, path", [("GET", "/nowhere"), ("GET", "/jobs/0123456789ab"),
+                                          ("GET", "/jobs/0123456789ab/results"), ("POST", "/nowhere")])
+def test_unknown_path_is_404(server, method, path):
+    status, body = _request(server, method, path, b"{}" if method == "POST" else None)
+    assert status == 404 and "Error" in body
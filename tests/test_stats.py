@@ -0,0 +1,36 @@
+"""Similarity levels and running statistics (lib/stats.py)."""
+
+import random
+import statistics
+
+import pytest
+
+from lib.stats import STATS_METRICS, MetricStats, get_diff_category
+
+
+@pytest.mark.parametrize("d, level", [
+    (0.0, "identical"), (0.0999, "identical"), (0.10, "negligible"), (0.4999, "negligible"),
+    (0.50, "slight"), (1.50, "moderate"), (2.9999, "moderate"), (3.00, "high"), (6.00, "extreme"),
+    (60.0, "extreme"),
+])
+def test_diff_category_bounds(d, level):
+    assert get_diff_category(d, 0.0) == level
+    assert get_diff_category(0.0, -d) == level
+    assert get_diff_category(-d, d / 2) == level
+
+
+def test_metric_stats_any_order():
+    rnd = random.Random(3)
+    rows = [{k: round(rnd.uniform(-40.0, 0.0), 1) for k in STATS_METRICS} for _ in range(200)]
+    rows[5]["LRA"] = None
+    forward, backward = MetricStats(STATS_METRICS), MetricStats(STATS_METRICS)
+    for m in rows:
+        forward.push(m)
+    for m in reversed(rows):
+        backward.push(m)
+    a, b = forward.get_stats(), backward.get_stats()
+    for k in STATS_METRICS:
+        values = [m[k] for m in rows if m[k] is not None]
+        assert a[k]["mean"] == pytest.approx(statistics.fmean(values))
+        assert a[k]["std"] == pytest.approx(b[k]["std"])
+        assert a[k]["median"] == b[k]["median"] == pytest.approx(statistics.median(values), abs=0.001)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Wall time of the loudness measurement on video containers, before/after the audio-only path.
+
+"before" is the original command (video demuxed, possibly decoded); "after" is the
+current ffmpeg_utils.new_analysis_command(). Usage:
+
+    python tools/benchmarks/bench_audio_only.py [--workdir DIR] [--duration S] [--size WxH] [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from corpus import make_media
+from lib.ffmpeg_utils import new_analysis_command
+
+CONTAINERS = (".mkv", ".mov", ".mp4", ".m4v")
+
+
+def legacy_command(path: str) -> list:
+    return [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", path,
+        "-filter_complex",
+        "[0:a]asplit=2[a1][a2];"
+        "[a1]ebur128=peak=true[out1];"
+        "[a2]volumedetect[out2]",
+        "-map", "[out1]", "-f", "null", "-",
+        "-map", "[out2]", "-f", "null", "-",
+    ]
+
+
+def time_command(cmd: list, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workdir", help="where to generate the test files (default: a temp dir)")
+    parser.add_argument("--duration", type=float, default=60.0, help="media duration in seconds")
+    parser.add_argument("--size", default="1920x1080", help="video frame size")
+    parser.add_argument("--runs", type=int, default=3, help="runs per command (median is reported)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loudscan-bench-")
+    print(f"Corpus: {workdir}")
+    print(f"{'container':<10} {'size MB':>8} {'before s':>9} {'after s':>9} {'speedup':>8}")
+    for ext in CONTAINERS:
+        path = make_media(
+            os.path.join(workdir, f"video_{args.size}_{int(args.duration)}s{ext}"),
+            "sine=frequency=1000", args.duration, video_size=args.size,
+        )
+        # Warm the page cache so both commands read from memory.
+        time_command(new_analysis_command(path), 1)
+        before = time_command(legacy_command(path), args.runs)
+        after = time_command(new_analysis_command(path), args.runs)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"{ext:<10} {size_mb:>8.1f} {before:>9.3f} {after:>9.3f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
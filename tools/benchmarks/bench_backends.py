@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Throughput and accuracy of the numpy backend against the ffmpeg filter backend.
+
+Each test signal is measured with both backends; the table shows wall time,
+realtime factor and the per-metric difference (numpy - ffmpeg). Signals with a
+known integrated loudness also report each backend's error. Usage:
+
+    python tools/benchmarks/bench_backends.py [--workdir DIR] [--duration S] [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from corpus import make_media
+from lib.ffmpeg_utils import get_loudness_from_file
+
+METRICS = ("LUFS_I", "LUFS_M", "LUFS_S", "TruePeak_dBTP", "LRA", "Peak_dBFS", "RMS_dBFS")
+
+# (name, lavfi source, expected LUFS_I or None)
+SIGNALS = (
+    # EBU Tech 3341 style: a 1 kHz sine peaking at -23 dBFS on both channels reads -23 LUFS;
+    # on a single channel, a -20 dBFS sine reads -23.01 LUFS.
+    ("sine_1k_-23dBFS_stereo", "aevalsrc=0.0707946*sin(2*PI*1000*t)|0.0707946*sin(2*PI*1000*t):s=48000", -23.0),
+    ("sine_1k_-20dBFS_mono", "aevalsrc=0.1*sin(2*PI*1000*t):s=48000", -23.01),
+    ("noise_pink_stereo", "anoisesrc=color=pink:amplitude=0.2:seed=1:sample_rate=48000,"
+                          "aformat=channel_layouts=stereo", None),
+    ("noise_white_5.1", "anoisesrc=amplitude=0.1:seed=2:sample_rate=48000,"
+                        "aformat=channel_layouts=5.1", None),
+    ("sine_clipped_44k1", "sine=frequency=997:sample_rate=44100,volume=20dB,alimiter=limit=1", None),
+)
+
+
+def measure(path: str, backend: str, runs: int):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        res = get_loudness_from_file(path, backend)
+        times.append(time.perf_counter() - t0)
+    return res, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workdir", help="where to generate the test files (default: a temp dir)")
+    parser.add_argument("--duration", type=float, default=120.0, help="signal duration in seconds")
+    parser.add_argument("--runs", type=int, default=3, help="runs per backend (median is reported)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loudscan-bench-")
+    print(f"Corpus: {workdir}\n")
+    for name, src, expected in SIGNALS:
+        path = make_media(os.path.join(workdir, f"{name}_{int(args.duration)}s.wav"), src, args.duration)
+        # Warm-up run (page cache, numpy filter design).
+        get_loudness_from_file(path, "numpy")
+        ref, t_ref = measure(path, "ffmpeg", args.runs)
+        res, t_np = measure(path, "numpy", args.runs)
+
+        print(f"{name}")
+        print(f"  time     ffmpeg {t_ref:7.3f} s ({args.duration / t_ref:7.1f}x realtime)"
+              f"   numpy {t_np:7.3f} s ({args.duration / t_np:7.1f}x realtime)")
+        diffs = []
+        for k in METRICS:
+            if ref.get(k) is None or res.get(k) is None:
+                diffs.append(f"{k}=n/a")
+            else:
+                diffs.append(f"{k}={res[k] - ref[k]:+.2f}")
+        print("  delta    " + "  ".join(diffs))
+        if expected is not None:
+            print(f"  LUFS_I   expected {expected:.2f}   ffmpeg {ref['LUFS_I'] - expected:+.2f}"
+                  f"   numpy {res['LUFS_I'] - expected:+.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Cold-start time of LoudScan: process launch to first ffmpeg launch, from source or a build.
+
+Runs LoudScan headless on a one-file folder with LOUDSCAN_STARTUP_TRACE=1 and reads
+the start-up milestones it prints on stderr; times are wall-clock milliseconds since
+the process was spawned (median over --runs). Usage:
+
+    python tools/benchmarks/bench_startup.py [--exe dist/LoudScan-...] [--runs N]
+
+Without --exe the source tree is timed (`python src/__main__.py`); pass the binary
+built from loudscan.spec to time the PyInstaller build (bootloader unpacking included).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus import ROOT, make_media
+
+EVENTS = ("args-parsed", "first-ffmpeg", "exit")
+
+
+def run_once(cmd, env) -> dict:
+    t0 = time.time()
+    r = subprocess.run(cmd, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    t_exit = time.time()
+    if r.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{r.stderr}")
+    ms = {"exit": (t_exit - t0) * 1000.0}
+    for line in r.stderr.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0] == "startup-trace":
+            ms.setdefault(parts[1], (float(parts[2]) - t0) * 1000.0)
+    return ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--exe", help="LoudScan executable to time (default: the source tree)")
+    parser.add_argument("--runs", type=int, default=10, help="runs (median is reported)")
+    parser.add_argument("--workdir", help="where to generate the test file (default: a temp dir)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loudscan-bench-")
+    media = os.path.join(workdir, "media")
+    make_media(os.path.join(media, "tone.wav"), "sine=frequency=1000:sample_rate=48000", 1.0)
+
+    base = [args.exe] if args.exe else [sys.executable, os.path.join(ROOT, "src", "__main__.py")]
+    # A fresh cache file per run would time SQLite creation; one warm cache times the common case.
+    cmd = base + [media, "-o", os.path.join(workdir, "out"), "-j", "1",
+                  "--cache", os.path.join(workdir, "cache.sqlite3")]
+    env = dict(os.environ, LOUDSCAN_STARTUP_TRACE="1")
+
+    run_once(cmd, env)  # warm-up: page cache, cache file
+    samples = [run_once(cmd, env) for _ in range(args.runs)]
+
+    print(f"Command: {' '.join(cmd)}")
+    print(f"Runs   : {args.runs}\n")
+    for event in EVENTS:
+        values = [s[event] for s in samples if event in s]
+        if values:
+            print(f"  {event:<14} median {statistics.median(values):8.1f} ms   "
+                  f"min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
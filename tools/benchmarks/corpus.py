@@ -0,0 +1,42 @@
+"""Deterministic synthetic media for the benchmarks, generated with ffmpeg lavfi sources."""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# Audio codec per container for the generated files.
+AUDIO_CODECS = {
+    ".wav": ["-c:a", "pcm_s16le"],
+    ".flac": ["-c:a", "flac"],
+    ".mp3": ["-c:a", "libmp3lame", "-b:a", "192k"],
+    ".m4a": ["-c:a", "aac", "-b:a", "192k"],
+    ".mp4": ["-c:a", "aac", "-b:a", "192k"],
+    ".mov": ["-c:a", "aac", "-b:a", "192k"],
+    ".m4v": ["-c:a", "aac", "-b:a", "192k"],
+    ".mkv": ["-c:a", "aac", "-b:a", "192k"],
+    ".ogg": ["-c:a", "libvorbis", "-q:a", "5"],
+}
+
+
+def make_media(path: str, audio_src: str, duration: float, video_size: str = None, overwrite: bool = False) -> str:
+    """Render `audio_src` (a lavfi audio graph) for `duration` seconds into `path`.
+
+    With `video_size` (e.g. "1920x1080"), a testsrc2 video track is muxed in as well.
+    Existing files are kept unless `overwrite` is set, so a corpus is built once.
+    """
+    if os.path.exists(path) and not overwrite:
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-v", "error", "-y"]
+    if video_size:
+        cmd += ["-f", "lavfi", "-i", f"testsrc2=size={video_size}:rate=25:duration={duration}"]
+    cmd += ["-f", "lavfi", "-t", str(duration), "-i", audio_src]
+    if video_size:
+        cmd += ["-map", "0:v", "-map", "1:a", "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18"]
+    cmd += AUDIO_CODECS.get(ext, []) + ["-shortest", path]
+    subprocess.run(cmd, check=True)
+    return path
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Reproducible benchmark suite: per-stage timings and accuracy checks on a synthetic corpus.
+
+The corpus is generated with ffmpeg lavfi sources (sine tones of known loudness, pink
+noise, silence, hard-clipped tones) over several durations and containers, and is
+deterministic: same profile, same files. Each pipeline stage is timed on its own:
+
+    discovery     lib.discovery.scan_media_files
+    measure       lib.engine.analyse_files (get_loudness_from_file on every file, no cache)
+    report_data   lib.report.new_sound_report_data
+    csv_write     lib.report.write_csv_rows (combined layout)
+    html_render   lib.report.new_sound_report_html
+    measure_sampled  lib.engine.analyse_files with --sample's default windows (ffmpeg backend)
+
+The sampled run is validated against the full one: on every file long enough to be
+sampled, LUFS_I must fall within the reported bound, and the peaks and momentary /
+short-term maxima must not read higher (the long-form profile has files long enough,
+and signals that do not join seamlessly at the cuts). Results go to a JSON file;
+--compare prints the per-stage ratio against an earlier run, so two commits can be
+compared on the same corpus. Usage:
+
+    python tools/benchmarks/run_suite.py [--profile quick|standard|many-files] [--out FILE]
+                                         [--compare OLD.json] [--jobs N] [--backend B]
+
+Exits with status 1 when an accuracy or sampling check fails.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from corpus import ROOT, make_media
+from lib.discovery import scan_media_files
+from lib.engine import analyse_files, get_default_jobs
+from lib.ffmpeg_utils import BACKENDS, get_ffmpeg_version
+from lib.report import CSV_FIELDS, new_sound_report_data, new_sound_report_html, write_csv_rows
+from lib.sampling import DEFAULT_SAMPLE_SECONDS, DEFAULT_SAMPLE_WINDOWS
+
+# durations (s), containers, copies of each (signal, duration, container) with varied level
+PROFILES = {
+    "quick": {"durations": (5, 30), "containers": (".wav", ".flac", ".m4a"), "copies": 1},
+    "standard": {"durations": (10, 60, 300), "containers": (".wav", ".flac", ".mp3", ".m4a", ".mkv"), "copies": 2},
+    "many-files": {"durations": (3,), "containers": (".wav", ".m4a"), "copies": 60},
+    # Long enough for --sample, with signals whose level moves over time.
+    "long-form": {"durations": (1200,), "containers": (".flac", ".m4a"), "copies": 1, "varying": True},
+}
+
+# Tolerances of the accuracy checks: lossy codecs shift levels slightly.
+LOSSLESS = {".wav", ".flac"}
+LUFS_TOLERANCE = {"lossless": 0.1, "lossy": 0.5}
+PEAK_TOLERANCE = 0.1
+# Added to the sampled LUFS_I bound: both measurements are logged to 0.1 LU.
+SAMPLE_TOLERANCE = 0.1
+# Sampled values that must not read above the full measurement (+ PEAK_TOLERANCE).
+SAMPLE_MAXIMA = ("TruePeak_dBTP", "Peak_dBFS", "LUFS_M", "LUFS_S")
+
+
+def get_signals(copy: int, varying: bool = False):
+    """(name, lavfi source, expectations) for one copy; the level steps down 2 dB per copy.
+
+    Expectations map a metric to its exact value; sines use EBU Tech 3341 levels
+    (a stereo 1 kHz sine peaking at L dBFS reads L LUFS). `varying` adds a slowly
+    modulated tone, speech-like pink noise bursts and two signals for the sampling
+    checks, as a 1 kHz sine cut on the 1 ms grid of the window starts joins
+    seamlessly: a tone whose phase jumps at the cuts (true peak) and short tone
+    pulses that two windows can join into a longer one (momentary maximum).
+    """
+    level = -18.0 - 2.0 * (copy % 8)
+    amp = 10.0 ** (level / 20.0)
+    sine = f"{amp:.6f}*sin(2*PI*1000*t)"
+    signals = (
+        (f"sine1k_{-level:g}dB", f"aevalsrc={sine}|{sine}:s=48000", {"LUFS_I": level}),
+        (f"pink_seed{copy}", f"anoisesrc=color=pink:amplitude={amp * 2:.6f}:seed={copy + 1}:sample_rate=48000,"
+                             "aformat=channel_layouts=stereo", {}),
+        ("silence", "anullsrc=channel_layout=stereo:sample_rate=48000", {}),
+        (f"clipped_{copy}", f"aevalsrc=clip({1.5 + 0.1 * copy:.2f}*sin(2*PI*997*t)\\,-1\\,1):s=44100",
+         {"Peak_dBFS": 0.0}),
+    )
+    if not varying:
+        return signals
+    swell = f"{amp:.6f}*(1+0.8*sin(2*PI*t/173))*sin(2*PI*440*t)"
+    # Half a cycle over 100 s (the window spacing at 1200 s), 6 dB down every other 150 s.
+    steps = f"{amp:.6f}*if(lt(mod(t\\,300)\\,150)\\,1\\,0.5)*sin(2*PI*1234.505*t)"
+    # 0.2 s out of every 0.7 s, 20 dB up: no 0.4 s momentary block holds more than one.
+    pulses = f"{amp:.6f}*if(lt(mod(t\\,0.7)\\,0.2)\\,1\\,0.1)*sin(2*PI*1234.5*t)"
+    return signals + (
+        (f"tone_steps_{copy}", f"aevalsrc={steps}|{steps}:s=48000", {}),
+        (f"pulses_{copy}", f"aevalsrc={pulses}|{pulses}:s=48000", {}),
+        (f"swell_{copy}", f"aevalsrc={swell}|{swell}:s=48000", {}),
+        (f"bursts_{copy}", f"anoisesrc=color=pink:amplitude={amp * 2:.6f}:seed={copy + 7}:sample_rate=48000,"
+                           "aformat=channel_layouts=stereo,volume='if(lt(mod(t,40),25),1,0.1)':eval=frame", {}),
+    )
+
+
+def build_corpus(workdir: str, profile: dict):
+    """Generate (or reuse) the corpus; returns ({path: expectations}, {path: duration})."""
+    expected = {}
+    durations = {}
+    combos = itertools.product(range(profile["copies"]), profile["durations"], profile["containers"])
+    for copy, duration, ext in combos:
+        for name, src, checks in get_signals(copy, profile.get("varying", False)):
+            path = os.path.join(workdir, f"{int(duration)}s", ext.lstrip("."), f"{name}_{copy:03d}{ext}")
+            make_media(path, src, duration)
+            expected[path] = checks
+            durations[path] = float(duration)
+    return expected, durations
+
+
+def time_stage(fn, runs: int):
+    """(last result, [seconds per run])."""
+    times = []
+    result = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, times
+
+
+def check_accuracy(metrics: list, expected: dict, workdir: str) -> list:
+    checks = []
+    for m in metrics:
+        lossless = os.path.splitext(m["Path"])[1].lower() in LOSSLESS
+        for key, want in expected.get(m["Path"], {}).items():
+            if key == "Peak_dBFS" and not lossless:
+                continue  # lossy encoders overshoot a clipped waveform
+            tol = PEAK_TOLERANCE if key == "Peak_dBFS" else LUFS_TOLERANCE["lossless" if lossless else "lossy"]
+            got = m.get(key)
+            checks.append({
+                "File": os.path.relpath(m["Path"], workdir),
+                "Metric": key,
+                "Expected": want,
+                "Measured": got,
+                "Tolerance": tol,
+                "Ok": got is not None and abs(got - want) <= tol,
+            })
+    return checks
+
+
+def check_sampling(full: list, sampled: list, workdir: str) -> list:
+    """One check per file the sampled run estimated: its LUFS_I within LUFS_I_Bound
+    (+ SAMPLE_TOLERANCE) of the full measurement, its peaks and LUFS_M / LUFS_S
+    maxima not above the full ones."""
+    checks = []
+    for f, s in zip(full, sampled):
+        if not s.get("Approximate") or f.get("LUFS_I") is None:
+            continue
+        bound = (s["LUFS_I_Bound"] or 0.0) + SAMPLE_TOLERANCE
+        peaks_ok = all(s[k] is None or f[k] is None or s[k] <= f[k] + PEAK_TOLERANCE
+                       for k in SAMPLE_MAXIMA)  # None: silence
+        checks.append({
+            "File": os.path.relpath(f["Path"], workdir),
+            "Full": f["LUFS_I"],
+            "Sampled": s["LUFS_I"],
+            "Bound": s["LUFS_I_Bound"],
+            **{f"Full{k}": f[k] for k in SAMPLE_MAXIMA},
+            **{f"Sampled{k}": s[k] for k in SAMPLE_MAXIMA},
+            "Speedup": f["WallSeconds"] / s["WallSeconds"],
+            "Ok": abs(s["LUFS_I"] - f["LUFS_I"]) <= bound and peaks_ok,
+        })
+    return checks
+
+
+def get_git_commit() -> str:
+    try:
+        r = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+        return r.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def _summary(times: list) -> dict:
+    return {"median_s": statistics.median(times), "min_s": min(times), "runs_s": times}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="corpus size (default: %(default)s)")
+    parser.add_argument("--workdir", help="corpus location, reused between runs (default: loudscan-suite-<profile> in the temp dir)")
+    parser.add_argument("--out", help="JSON results file (default: bench_<profile>_<commit>.json in the workdir)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print stage ratios against an earlier results file")
+    parser.add_argument("--jobs", type=int, default=get_default_jobs(), help="measurement workers (default: CPU count)")
+    parser.add_argument("--backend", choices=BACKENDS, default="ffmpeg", help="measurement backend (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=5, help="runs of the cheap stages; measure runs once (median is reported)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), f"loudscan-suite-{args.profile}")
+    print(f"Corpus: {workdir} (profile {args.profile})")
+    expected, durations = build_corpus(workdir, profile)
+
+    stages = {}
+    stats, times = time_stage(lambda: scan_media_files([workdir]), args.runs)
+    files = list(stats)
+    stages["discovery"] = _summary(times)
+
+    metrics, times = time_stage(lambda: analyse_files(files, jobs=args.jobs, backend=args.backend, stats=stats), 1)
+    stages["measure"] = _summary(times)
+
+    report, times = time_stage(lambda: new_sound_report_data(metrics, pair_selection="all"), args.runs)
+    stages["report_data"] = _summary(times)
+
+    csv_path = os.path.join(tempfile.mkdtemp(prefix="loudscan-suite-out-"), "report.csv")
+    _, times = time_stage(
+        lambda: write_csv_rows(csv_path, CSV_FIELDS, itertools.chain(report["FilesEnriched"], report["Pairs"])),
+        args.runs,
+    )
+    stages["csv_write"] = _summary(times)
+
+    with open(os.path.join(ROOT, "res", "reference_models.json"), encoding="utf-8") as f:
+        reference_models = json.load(f)
+    html, times = time_stage(
+        lambda: new_sound_report_html(workdir, report, csv_path[:-4] + ".html", reference_models), args.runs,
+    )
+    stages["html_render"] = _summary(times)
+
+    accuracy = check_accuracy(metrics, expected, workdir)
+    sampling = []
+    if args.backend == "ffmpeg":
+        sample = (DEFAULT_SAMPLE_WINDOWS, DEFAULT_SAMPLE_SECONDS)
+        sampled, times = time_stage(lambda: analyse_files(files, jobs=args.jobs, sample=sample), 1)
+        stages["measure_sampled"] = _summary(times)
+        sampling = check_sampling(metrics, sampled, workdir)
+    audio_seconds = sum(durations.get(p, 0.0) for p in files)
+    results = {
+        "Meta": {
+            "Commit": get_git_commit(),
+            "Date": datetime.now().isoformat(timespec="seconds"),
+            "Python": sys.version.split()[0],
+            "Platform": platform.platform(),
+            "Ffmpeg": get_ffmpeg_version(),
+            "Profile": args.profile,
+            "Jobs": args.jobs,
+            "Backend": args.backend,
+        },
+        "Corpus": {
+            "Files": len(files),
+            "Bytes": sum(os.path.getsize(p) for p in files),
+            "AudioSeconds": audio_seconds,
+            "RealtimeFactor": audio_seconds / stages["measure"]["median_s"],
+            "Errors": sum(1 for m in metrics if m.get("Error")),
+            "HtmlBytes": len(html.encode("utf-8")),
+            "CsvBytes": os.path.getsize(csv_path),
+        },
+        "Stages": stages,
+        "Accuracy": accuracy,
+        "Sampling": {
+            "Windows": DEFAULT_SAMPLE_WINDOWS,
+            "WindowSeconds": DEFAULT_SAMPLE_SECONDS,
+            "MedianSpeedup": statistics.median(c["Speedup"] for c in sampling) if sampling else None,
+            "Checks": sampling,
+        },
+    }
+
+    out = args.out or os.path.join(workdir, f"bench_{args.profile}_{results['Meta']['Commit']}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    old = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"Compared with {args.compare} (commit {old['Meta'].get('Commit')})")
+
+    print(f"\n{len(files)} files, {results['Corpus']['Bytes'] / 1e6:.1f} MB, {audio_seconds / 60:.1f} min of audio, "
+          f"{args.jobs} job(s): {results['Corpus']['RealtimeFactor']:.0f}x realtime\n")
+    print(f"{'stage':<16} {'median s':>10} {'min s':>10}" + (f" {'vs old':>8}" if old else ""))
+    for name, st in stages.items():
+        line = f"{name:<16} {st['median_s']:>10.4f} {st['min_s']:>10.4f}"
+        if old and name in old.get("Stages", {}):
+            line += f" {st['median_s'] / old['Stages'][name]['median_s']:>7.2f}x"
+        print(line)
+
+    failed = [c for c in accuracy if not c["Ok"]]
+    print(f"\nAccuracy: {len(accuracy) - len(failed)}/{len(accuracy)} checks passed")
+    for c in failed:
+        print(f"  FAIL {c['File']} {c['Metric']}: expected {c['Expected']:.2f}, measured {c['Measured']}")
+
+    failed_sampling = [c for c in sampling if not c["Ok"]]
+    if sampling:
+        print(f"Sampling: {len(sampling) - len(failed_sampling)}/{len(sampling)} sampled files within bound, "
+              f"median speedup {results['Sampling']['MedianSpeedup']:.1f}x")
+    elif args.backend == "ffmpeg":
+        print("Sampling: no file long enough to sample (see --profile long-form)")
+    for c in failed_sampling:
+        maxima = ", ".join(f"{k} {c['Full' + k]} vs {c['Sampled' + k]}" for k in SAMPLE_MAXIMA)
+        print(f"  FAIL {c['File']}: full {c['Full']:.1f} LUFS, sampled {c['Sampled']:.1f} "
+              f"+/- {c['Bound'] or 0:.1f}; {maxima}")
+    print(f"Results: {out}")
+    sys.exit(1 if failed or failed_sampling else 0)
+
+
+if __name__ == "__main__":
+    main()